@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+批量请求 pick 提取吞吐基准
+
+本地 HTTP 服务返回一个较大的商品列表页，用 cfspider.batch 抓取并提取字段，
+对比 pick 在请求线程中执行（extract_workers=0）与在进程池中执行
+（extract_workers=1..N）时的 pages/s。网络开销很小，结果主要反映解析能否
+随 CPU 核心数扩展。
+
+用法:
+    python bench_extract.py
+    python bench_extract.py --pages 400 --items 300 --concurrency 32
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, '.')
+
+import cfspider
+
+
+PICK = {
+    "title": "h1",
+    "first_price": (".item .price", "text", float),
+    "next": ("a.next", "href"),
+    "count": ".summary .count",
+}
+
+
+def build_page(items):
+    """生成一个约 items * 300 字节的列表页"""
+    rows = ''.join(
+        f'<div class="item" id="i{i}"><h2><a href="/p/{i}">商品 {i}</a></h2>'
+        f'<span class="price">{i * 1.5:.2f}</span><p class="desc">'
+        f'{"描述文本 " * 12}</p><ul><li>a</li><li>b</li><li>c</li></ul></div>'
+        for i in range(items)
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>列表</title></head><body>'
+        f'<h1>商品列表</h1><div class="list">{rows}</div>'
+        f'<div class="summary">共 <span class="count">{items}</span> 件</div>'
+        '<a class="next" href="/page/2">下一页</a></body></html>'
+    ).encode('utf-8')
+
+
+def start_server(body):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(urls, concurrency, extract_workers):
+    start = time.perf_counter()
+    results = cfspider.batch(
+        urls, pick=PICK, concurrency=concurrency, progress=False,
+        keep_response=False, extract_workers=extract_workers,
+    )
+    elapsed = time.perf_counter() - start
+    failed = len(results.failed)
+    if failed:
+        print(f"  警告: {failed} 个请求失败，例如 {results.failed[0].error}")
+    return len(urls) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量请求 pick 提取吞吐基准')
+    parser.add_argument('--pages', type=int, default=300, help='每轮请求的页面数')
+    parser.add_argument('--items', type=int, default=300, help='每页商品数（控制页面大小）')
+    parser.add_argument('--concurrency', type=int, default=32, help='请求并发数')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1,
+                        help='最多测试的提取进程数（默认 CPU 核心数）')
+    args = parser.parse_args()
+
+    body = build_page(args.items)
+    server = start_server(body)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    urls = [f'{base}/page/{i}' for i in range(args.pages)]
+
+    print(f"页面大小: {len(body) / 1024:.0f} KB, 页面数: {args.pages}, "
+          f"并发: {args.concurrency}, CPU 核心: {os.cpu_count()}")
+    print("-" * 52)
+    print(f"{'提取方式':20}{'pages/s':>12}{'相对线程内':>14}")
+
+    run(urls[:args.concurrency], args.concurrency, 0)  # 预热连接池和解析器
+    baseline = run(urls, args.concurrency, 0)
+    print(f"{'请求线程内':20}{baseline:>12.1f}{1.0:>13.1f}x")
+
+    # 1、2、4 ... 个进程，最后一档为 --max-workers
+    counts = sorted({args.max_workers} | {2 ** k for k in range(8) if 2 ** k < args.max_workers})
+    for workers in counts:
+        rate = run(urls, args.concurrency, workers)
+        print(f"{f'进程池 x{workers}':20}{rate:>12.1f}{rate / baseline:>13.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+CSS 提取引擎基准：lxml + cssselect 对比 BeautifulSoup
+
+对同一批页面分别用 parser="lxml" 与 parser="bs4" 执行 pick，
+报告每页平均耗时（解析 + 选择器 + 取文本）以及两种引擎结果不一致的页面数。
+
+默认使用 bench_extract 生成的商品列表页；--corpus 指定一个目录时，
+改为读取其中所有 *.html 文件（保存下来的真实页面），并用一组通用规则提取。
+
+用法:
+    python bench_parser.py
+    python bench_parser.py --items 1000 --pages 50
+    python bench_parser.py --corpus ./saved_pages --limit 500
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from cfspider.extract import Extractor, PARSERS
+from bench_extract import PICK, build_page
+
+
+# 真实页面使用的通用规则
+CORPUS_PICK = {
+    "title": "title",
+    "h1": "h1",
+    "links": ("a[href]", "href"),
+    "description": ('meta[name="description"]', "content"),
+    "paragraphs": "p",
+    "headings": "h2, h3",
+}
+
+
+def load_corpus(directory, limit):
+    """读取目录下（递归）的 *.html 文件"""
+    files = sorted(glob.glob(os.path.join(directory, '**', '*.html'), recursive=True))
+    if limit:
+        files = files[:limit]
+    pages = []
+    for path in files:
+        with open(path, 'rb') as f:
+            pages.append(f.read().decode('utf-8', errors='replace'))
+    return pages
+
+
+def pick_all(extractor, rules):
+    """按规则提取；元组规则的第二项为属性名，字符串规则提取全部文本"""
+    data = {}
+    for name, rule in rules.items():
+        if isinstance(rule, tuple):
+            data[name] = extractor.css_all(rule[0], attr=rule[1])
+        else:
+            data[name] = extractor.css_all(rule)
+    return data
+
+
+def run(pages, parser, extract):
+    results = []
+    start = time.perf_counter()
+    for content in pages:
+        results.append(extract(Extractor(content, parser=parser)))
+    elapsed = time.perf_counter() - start
+    return elapsed / len(pages), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CSS 提取引擎基准（lxml 对比 bs4）')
+    parser.add_argument('--corpus', help='保存的 HTML 页面目录（递归读取 *.html）')
+    parser.add_argument('--limit', type=int, default=0, help='最多读取的页面数（0 表示不限）')
+    parser.add_argument('--pages', type=int, default=30, help='生成页面的数量（未指定 --corpus 时）')
+    parser.add_argument('--items', type=int, default=300, help='生成页面的商品数（控制页面大小）')
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = load_corpus(args.corpus, args.limit)
+        if not pages:
+            sys.exit(f"目录中没有 *.html 文件: {args.corpus}")
+        extract = lambda e: pick_all(e, CORPUS_PICK)
+        source = f"{args.corpus}（{len(pages)} 个页面）"
+    else:
+        pages = [build_page(args.items).decode('utf-8')] * args.pages
+        extract = lambda e: e.pick(**PICK)
+        source = f"生成页面 x{args.pages}"
+
+    size = sum(len(p) for p in pages) / len(pages)
+    print(f"页面: {source}, 平均大小: {size / 1024:.0f} KB")
+    print("-" * 46)
+    print(f"{'引擎':12}{'ms/page':>12}{'pages/s':>12}{'加速':>8}")
+
+    run(pages[:3], 'lxml', extract)  # 预热选择器编译缓存
+    timings = {}
+    outputs = {}
+    for name in PARSERS:
+        timings[name], outputs[name] = run(pages, name, extract)
+    baseline = timings['bs4']
+    for name in PARSERS:
+        per_page = timings[name]
+        print(f"{name:12}{per_page * 1000:>12.2f}{1 / per_page:>12.1f}{baseline / per_page:>7.1f}x")
+
+    mismatched = sum(1 for a, b in zip(outputs['lxml'], outputs['bs4']) if a != b)
+    print("-" * 46)
+    print(f"结果不一致的页面: {mismatched} / {len(pages)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+WebSocket 帧编解码微基准
+
+对比 VLESS 隧道旧实现（逐字节列表推导掩码 + 小块 recv + data += chunk）
+与 cfspider.ws_frame（recv_into 缓冲读取 + 整块掩码 + sendmsg）的吞吐。
+结果按 CPU 时间计算，即单核 MB/s。
+
+用法:
+    python bench_ws_frame.py
+    python bench_ws_frame.py --frame 16384 --size 64
+"""
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, '.')
+
+from cfspider import ws_frame
+
+
+# ========== 旧实现（与重构前的 VlessClient 相同） ==========
+
+def legacy_send_frame(sock, data):
+    frame = bytes([0x82])
+    length = len(data)
+    if length <= 125:
+        frame += bytes([0x80 | length])
+    elif length <= 65535:
+        frame += bytes([0x80 | 126])
+        frame += struct.pack('>H', length)
+    else:
+        frame += bytes([0x80 | 127])
+        frame += struct.pack('>Q', length)
+    mask = os.urandom(4)
+    frame += mask
+    masked_data = bytes([data[i] ^ mask[i % 4] for i in range(len(data))])
+    frame += masked_data
+    sock.sendall(frame)
+
+
+def legacy_recv_frame(sock):
+    header = sock.recv(2)
+    if len(header) < 2:
+        return None
+    masked = (header[1] & 0x80) != 0
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', sock.recv(2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', sock.recv(8))[0]
+    if masked:
+        mask = sock.recv(4)
+    data = b''
+    while len(data) < length:
+        chunk = sock.recv(min(length - len(data), 8192))
+        if not chunk:
+            break
+        data += chunk
+    if masked:
+        data = bytes([data[i] ^ mask[i % 4] for i in range(len(data))])
+    return data
+
+
+def new_send_frame(sock, data):
+    ws_frame.send_frame(sock, data)
+
+
+# ========== 测量 ==========
+
+def _drain(sock):
+    """持续读空 socket（发送端基准的接收方）"""
+    buf = bytearray(1 << 20)
+    try:
+        while sock.recv_into(buf):
+            pass
+    except OSError:
+        pass
+
+
+def bench_send(send_func, payload, count):
+    """测量发送端（编码 + 掩码 + 写）的单核吞吐"""
+    a, b = socket.socketpair()
+    t = threading.Thread(target=_drain, args=(b,), daemon=True)
+    t.start()
+    cpu = time.thread_time()
+    for _ in range(count):
+        send_func(a, payload)
+    cpu = time.thread_time() - cpu
+    a.close()
+    t.join()
+    b.close()
+    return len(payload) * count / cpu / 1e6
+
+
+def _feed(sock, blob):
+    try:
+        sock.sendall(blob)
+    finally:
+        sock.shutdown(socket.SHUT_WR)
+
+
+def bench_recv(mode, payload, count):
+    """测量接收端（读帧头 + 读负载 + 解掩码）的单核吞吐"""
+    # 预先编码好带掩码的帧流，接收端需要完整解掩码
+    frame = b''.join(ws_frame.encode_frame(payload))
+    blob = frame * count
+
+    a, b = socket.socketpair()
+    t = threading.Thread(target=_feed, args=(a, blob), daemon=True)
+    t.start()
+    cpu = time.thread_time()
+    received = 0
+    if mode == 'legacy':
+        while True:
+            data = legacy_recv_frame(b)
+            if not data:
+                break
+            received += len(data)
+    else:
+        reader = ws_frame.FrameReader(b)
+        while True:
+            data = reader.read_message()
+            if data is None:
+                break
+            received += len(data)
+    cpu = time.thread_time() - cpu
+    t.join()
+    a.close()
+    b.close()
+    return received / cpu / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WebSocket 帧编解码微基准')
+    parser.add_argument('--frame', type=int, default=16384, help='单帧负载大小（字节）')
+    parser.add_argument('--size', type=int, default=64, help='新实现测试数据量（MB）')
+    parser.add_argument('--legacy-size', type=int, default=4, help='旧实现测试数据量（MB）')
+    args = parser.parse_args()
+
+    payload = os.urandom(args.frame)
+    new_count = max(1, args.size * 1024 * 1024 // args.frame)
+    legacy_count = max(1, args.legacy_size * 1024 * 1024 // args.frame)
+
+    numpy_state = "on" if ws_frame._get_numpy() is not None else "off"
+    print(f"帧大小: {args.frame} 字节, NumPy 路径: {numpy_state}")
+    print("-" * 52)
+    print(f"{'':12}{'旧实现 MB/s/核':>18}{'新实现 MB/s/核':>18}{'倍数':>8}")
+
+    old = bench_send(legacy_send_frame, payload, legacy_count)
+    new = bench_send(new_send_frame, payload, new_count)
+    print(f"{'发送':12}{old:>18.1f}{new:>18.1f}{new / old:>7.1f}x")
+
+    old = bench_recv('legacy', payload, legacy_count)
+    new = bench_recv('new', payload, new_count)
+    print(f"{'接收':12}{old:>18.1f}{new:>18.1f}{new / old:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -72,9 +72,11 @@ UUID 使用说明：
 
 from .api import (
     get, post, put, delete, head, options, patch, request,
-    clear_map_records, get_map_collector, stop_vless_proxies
+    clear_map_records, get_map_collector, stop_vless_proxies, vless_proxy_stats
 )
 from .session import Session
+from .discovery import configure_discovery_cache, clear_discovery_cache
+from .transport import configure_transports, close_transports
 from .cli import install_browser
 
 # IP 地图可视化
@@ -88,7 +90,13 @@ from .ip_map import (
 from .mirror import mirror, MirrorResult, WebMirror
 
 # 批量请求
-from .batch import batch, abatch, BatchResult, BatchItem
+from .batch import batch, abatch, batch_iter, abatch_iter, BatchResult, BatchItem
+from .retry import RetryPolicy
+from .body_store import BodyStore
+from .dedup import URLDeduper, canonicalize_url
+from .metrics import BatchStats, Histogram
+from .distributed import WorkQueue, QueueServer, QueueClient, run_worker
+from .extract import compile_rules, ExtractionPlan, StreamExtraction
 
 # 数据导出
 from .export import export
@@ -103,6 +111,9 @@ from .proxy_server import (
     TwoProxyServer
 )
 
+# 多 Workers 负载均衡（cf_proxies 传入列表时自动使用）
+from .balancer import WorkersBalancer, get_balancer
+
 # Workers 管理器（自动创建和管理 Workers）
 from .workers_manager import (
     make_workers,
@@ -120,10 +131,12 @@ from .ai_browser import AIBrowser, AIBrowserSync, CrawlResult, ExecuteResult, PR
 # 异步 API（基于 httpx）
 from .async_api import (
     aget, apost, aput, adelete, ahead, aoptions, apatch,
-    arequest, astream,
+    arequest, astream, apick,
     AsyncCFSpiderResponse, AsyncStreamResponse
 )
 from .async_session import AsyncSession
+from .async_transport import aclose_all, configure_async_clients
+from .vless_transport import AsyncVlessTransport
 
 # TLS 指纹模拟 API（基于 curl_cffi）
 from .impersonate import (
@@ -258,12 +271,14 @@ __version__ = "1.9.0"
 __all__ = [
     # 同步 API (requests)
     "get", "post", "put", "delete", "head", "options", "patch", "request",
-    "Session", "Browser", "install_browser", "parse_vless_link", "stop_vless_proxies",
+    "Session", "Browser", "install_browser", "parse_vless_link", "stop_vless_proxies", "vless_proxy_stats",
+    "configure_discovery_cache", "clear_discovery_cache",
+    "configure_transports", "close_transports",
     "CFSpiderError", "BrowserNotInstalledError", "PlaywrightNotInstalledError",
     # 异步 API (httpx)
     "aget", "apost", "aput", "adelete", "ahead", "aoptions", "apatch",
-    "arequest", "astream",
-    "AsyncSession", "AsyncCFSpiderResponse", "AsyncStreamResponse",
+    "arequest", "astream", "apick", "aclose_all", "configure_async_clients",
+    "AsyncSession", "AsyncCFSpiderResponse", "AsyncStreamResponse", "AsyncVlessTransport",
     # TLS 指纹模拟 API (curl_cffi)
     "impersonate_get", "impersonate_post", "impersonate_put",
     "impersonate_delete", "impersonate_head", "impersonate_options",
@@ -283,13 +298,13 @@ __all__ = [
     # 网页镜像
     "mirror", "MirrorResult", "WebMirror",
     # 批量请求
-    "batch", "abatch", "BatchResult", "BatchItem",
+    "batch", "abatch", "batch_iter", "abatch_iter", "BatchResult", "BatchItem", "RetryPolicy", "BodyStore", "URLDeduper", "canonicalize_url", "BatchStats", "Histogram", "WorkQueue", "QueueServer", "QueueClient", "run_worker", "compile_rules", "ExtractionPlan", "StreamExtraction",
     # 数据导出
     "export",
     # 本地代理服务器（双层代理）
     "generate_vless_link", "start_proxy_server", "TwoProxyServer",
     # Workers 管理器
-    "make_workers", "list_workers", "delete_workers", "WorkersManager",
+    "make_workers", "list_workers", "delete_workers", "WorkersManager", "WorkersBalancer", "get_balancer",
     # 数据处理
     "DataFrame", "read", "read_csv", "read_json", "read_excel",
     # 人类行为模拟浏览器
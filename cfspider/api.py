@@ -16,6 +16,7 @@ from typing import Optional, Any
 
 # 延迟导入 IP 地图模块
 from . import ip_map
+from .balancer import get_balancer, is_multi
 
 # 延迟导入 httpx，仅在需要 HTTP/2 时使用
 _httpx = None
@@ -72,6 +73,8 @@ class CFSpiderResponse:
         cookies: 响应 Cookie
         url (str): 最终请求的 URL（跟随重定向后）
         encoding (str): 响应编码
+        parser (str): find / css / pick 使用的 CSS 选择器引擎，
+                      "lxml"（默认）或 "bs4"（与旧版本结果逐字一致）
     
     Methods:
         json(**kwargs): 将响应解析为 JSON
@@ -133,10 +136,15 @@ class CFSpiderResponse:
         """响应编码"""
         return self._response.encoding
     
+    # 手动设置的编码，优先于响应头和 <meta charset>
+    _encoding_override = None
+    
     @encoding.setter
     def encoding(self, value: str):
-        """设置响应编码"""
+        """设置响应编码（之后的数据提取按新编码重新解析）"""
         self._response.encoding = value
+        self._encoding_override = value
+        self._extractor = None
     
     def json(self, **kwargs) -> Any:
         """
@@ -164,13 +172,19 @@ class CFSpiderResponse:
     
     # ========== 数据提取方法 ==========
     
+    # CSS 选择器引擎："lxml"、"bs4"，None 表示使用 extract.DEFAULT_PARSER（lxml）
+    parser = None
+    
     def _get_extractor(self):
-        """获取数据提取器（延迟初始化）"""
-        if not hasattr(self, '_extractor') or self._extractor is None:
-            from .extract import Extractor
+        """获取数据提取器（延迟初始化，修改 parser 后重新创建）"""
+        extractor = getattr(self, '_extractor', None)
+        if extractor is None or (self.parser is not None and extractor.parser != self.parser):
+            from .extract import Extractor, _response_encoding
             content_type = "json" if self._is_json_response() else "html"
-            self._extractor = Extractor(self.text, content_type)
-        return self._extractor
+            # 原始字节直接交给 lxml，不经过 .text 解码
+            extractor = self._extractor = Extractor(
+                self.content, content_type, self.parser, _response_encoding(self))
+        return extractor
     
     def _is_json_response(self) -> bool:
         """判断是否是 JSON 响应"""
@@ -396,6 +410,8 @@ def request(method, url, cf_proxies=None, uuid=None, http2=False, impersonate=No
         cf_proxies: CFspider Workers 地址（可选）
             如 "https://cfspider.violetqqcom.workers.dev"
             不填写时直接请求，不使用代理
+            也可以是多个地址 / WorkersManager 组成的列表，请求按延迟和错误率
+            加权分配到各节点，故障节点自动熔断（参见 cfspider.balancer）
         
         uuid: VLESS UUID（可选）
             不填写会自动从 Workers 获取
@@ -410,6 +426,10 @@ def request(method, url, cf_proxies=None, uuid=None, http2=False, impersonate=No
             用于无法直连第二层代理时，通过 Workers 作为跳板
             流程: 本地 → Workers (VLESS) → 第二层代理 → 目标网站
         
+        vless_engine: VLESS 本地代理引擎（可选，通过 kwargs 传入）
+            - 'thread'（默认）: 每连接线程，隧道来自预热池
+            - 'asyncio': 单事件循环承载所有连接，转发带背压
+        
         http2: 是否启用 HTTP/2 协议（默认 False）
         
         impersonate: TLS 指纹模拟（可选）
@@ -468,6 +488,27 @@ def request(method, url, cf_proxies=None, uuid=None, http2=False, impersonate=No
     # 移除不支持的旧版参数（保持向后兼容）
     kwargs.pop("token", None)
     
+    # 多个 Workers 节点：由均衡器选择本次请求的节点
+    if is_multi(cf_proxies):
+        balancer = get_balancer(cf_proxies)
+        endpoint = balancer.acquire()
+        start = time.monotonic()
+        status = None
+        try:
+            # 列表中的 WorkersManager 使用自己的地址和 UUID，传入的 uuid 只用于地址节点
+            target, target_uuid = _unwrap_workers_manager(
+                endpoint.target, uuid if isinstance(endpoint.target, str) else None)
+            response = request(
+                method, url, cf_proxies=target, uuid=target_uuid, http2=http2,
+                impersonate=impersonate, map_output=map_output, map_file=map_file,
+                stealth=stealth, stealth_browser=stealth_browser, delay=delay,
+                static_ip=static_ip, two_proxy=two_proxy, **kwargs
+            )
+            status = response.status_code
+            return response
+        finally:
+            balancer.release(endpoint, time.monotonic() - start, error=status is None, status=status)
+    
     # 应用随机延迟
     if delay:
         from .stealth import random_delay
@@ -475,6 +516,8 @@ def request(method, url, cf_proxies=None, uuid=None, http2=False, impersonate=No
     
     # 如果指定了 cf_proxies，自动检测 Workers 类型
     if cf_proxies:
+        cf_proxies, uuid = _unwrap_workers_manager(cf_proxies, uuid)
+        
         # 检测是否为爬楼梯 Workers（HTTP 代理模式）
         workers_type = _detect_workers_type(cf_proxies)
         
@@ -518,58 +561,34 @@ def request(method, url, cf_proxies=None, uuid=None, http2=False, impersonate=No
     # 记录请求开始时间
     start_time = time.time()
     
-    # 如果指定了 impersonate，使用 curl_cffi
-    if impersonate:
-        curl_requests = _get_curl_cffi()
-        response = curl_requests.request(
-            method,
-            url,
-            params=params,
-            headers=headers,
-            data=data,
-            json=json_data,
-            cookies=cookies,
-            timeout=timeout,
-            impersonate=impersonate,
-            **kwargs
-        )
-        resp = CFSpiderResponse(response)
-        _handle_map_output(resp, url, start_time, map_output, map_file)
-        return resp
+    # 使用共享连接池客户端（复用 keep-alive 连接）
+    response = _pooled_request(
+        method, url, http2=http2, impersonate=impersonate,
+        params=params, headers=headers, data=data, json=json_data,
+        cookies=cookies, timeout=timeout, **kwargs
+    )
+    resp = CFSpiderResponse(response)
+    _handle_map_output(resp, url, start_time, map_output, map_file)
+    return resp
+
+
+def _pooled_request(method, url, http2=False, impersonate=None, proxy=None, **kwargs):
+    """
+    通过共享连接池客户端发送请求
     
-    # 如果启用 HTTP/2，使用 httpx
-    if http2:
-        httpx = _get_httpx()
-        with httpx.Client(http2=True, timeout=timeout) as client:
-            response = client.request(
-            method,
-            url,
-            params=params,
-            headers=headers,
-            data=data,
-            json=json_data,
-            cookies=cookies,
-            **kwargs
-        )
-            resp = CFSpiderResponse(response)
-            _handle_map_output(resp, url, start_time, map_output, map_file)
-            return resp
+    - impersonate: curl_cffi（按指纹区分会话）
+    - http2: httpx HTTP/2 客户端
+    - 其他: requests
+    """
+    from .transport import get_transport_registry
     
-    # 默认使用 requests
-    resp = requests.request(
-        method,
-        url,
-        params=params,
-        headers=headers,
-        data=data,
-        json=json_data,
-        cookies=cookies,
-        timeout=timeout,
-        **kwargs
-    )
-    response = CFSpiderResponse(resp)
-    _handle_map_output(response, url, start_time, map_output, map_file)
-    return response
+    registry = get_transport_registry()
+    if impersonate:
+        return registry.request('curl_cffi', method, url, proxy=proxy,
+                                fingerprint=impersonate, **kwargs)
+    if http2:
+        return registry.request('httpx-h2', method, url, proxy=proxy, **kwargs)
+    return registry.request('requests', method, url, proxy=proxy, **kwargs)
 
 
 def _handle_map_output(response, url, start_time, map_output, map_file):
@@ -594,20 +613,61 @@ def _handle_map_output(response, url, start_time, map_output, map_file):
     ip_map.generate_map_html(output_file=map_file)
 
 
+def _unwrap_workers_manager(cf_proxies, uuid=None):
+    """
+    WorkersManager 对象转换为 (Workers 地址, UUID)，其他 cf_proxies 原样返回
+    
+    传入了 uuid 时优先使用传入的 uuid。
+    """
+    if hasattr(cf_proxies, 'url') and hasattr(cf_proxies, 'uuid'):
+        workers_manager = cf_proxies
+        if not uuid and workers_manager.uuid:
+            uuid = workers_manager.uuid
+        cf_proxies = workers_manager.url
+        if not cf_proxies:
+            raise ValueError("WorkersManager 未成功创建 Workers，请检查 API Token 和 Account ID")
+    return cf_proxies, uuid
+
+
+def _workers_host(cf_proxies):
+    """从 Workers 地址中解析 host"""
+    parsed = urlparse(cf_proxies)
+    if parsed.scheme:
+        return parsed.netloc or parsed.path.split('/')[0]
+    return cf_proxies.split('/')[0]
+
+
 def _detect_workers_type(cf_proxies):
     """
     自动检测 Workers 类型
     
-    通过访问 /health 端点来判断是爬楼梯 Workers（HTTP代理）还是 VLESS Workers
+    通过访问 /health 端点来判断是爬楼梯 Workers（HTTP代理）还是 VLESS Workers。
+    结果按 Workers host 缓存（参见 discovery.DiscoveryCache）。
     
     Returns:
         'http': 爬楼梯 Workers（HTTP 代理模式）
         'vless': VLESS Workers
     """
+    from .discovery import get_discovery_cache
+    
+    return get_discovery_cache().get(
+        _workers_host(cf_proxies), 'type',
+        lambda: _probe_workers_type(cf_proxies)
+    )
+
+
+def _probe_workers_type(cf_proxies):
+    """
+    探测 Workers 类型
+    
+    Returns:
+        (workers_type, definitive)：探测请求出错时 definitive 为 False
+    """
     # 解析地址
     if not cf_proxies.startswith('http'):
         cf_proxies = f'https://{cf_proxies}'
     cf_proxies = cf_proxies.rstrip('/')
+    definitive = True
     
     try:
         # 尝试访问 /health 端点（爬楼梯 Workers 特有）
@@ -615,7 +675,9 @@ def _detect_workers_type(cf_proxies):
         if response.status_code == 200:
             data = response.json()
             if 'status' in data and data.get('status') == 'ok':
-                return 'http'
+                return 'http', True
+    except requests.RequestException:
+        definitive = False
     except:
         pass
     
@@ -625,12 +687,14 @@ def _detect_workers_type(cf_proxies):
         if response.status_code == 400:  # Missing url parameter
             data = response.json()
             if 'error' in data and 'url' in data.get('error', '').lower():
-                return 'http'
+                return 'http', True
+    except requests.RequestException:
+        definitive = False
     except:
         pass
     
     # 默认使用 VLESS
-    return 'vless'
+    return 'vless', definitive
 
 
 def _request_http_proxy(method, url, http_proxy,
@@ -715,9 +779,9 @@ def _request_http_proxy(method, url, http_proxy,
     if token:
         proxy_headers['Authorization'] = f'Bearer {token}'
     
-    # 发送代理请求
-    import json
-    response = requests.post(
+    # 发送代理请求（复用到 Workers 的 keep-alive 连接）
+    response = _pooled_request(
+        'POST',
         proxy_url,
         json=proxy_body,
         headers=proxy_headers,
@@ -731,17 +795,12 @@ def _request_http_proxy(method, url, http_proxy,
     return resp
 
 
-# VLESS 本地代理缓存
-_vless_proxy_cache = {}
-
-# Workers 配置缓存
-_workers_config_cache = {}
-
-
 def _get_workers_config(cf_proxies):
     """
     从 Workers 获取配置（UUID、new_ip 等）
     
+    结果按 Workers host 缓存（参见 discovery.DiscoveryCache）。
+    
     返回:
         dict: {
             'uuid': str,
@@ -750,46 +809,52 @@ def _get_workers_config(cf_proxies):
             ...
         }
     """
-    # 解析 Workers 地址
-    parsed = urlparse(cf_proxies)
-    if parsed.scheme:
-        host = parsed.netloc or parsed.path.split('/')[0]
-    else:
-        host = cf_proxies.split('/')[0]
+    from .discovery import get_discovery_cache
     
-    # 检查缓存
-    if host in _workers_config_cache:
-        return _workers_config_cache[host]
+    host = _workers_host(cf_proxies)
+    config = get_discovery_cache().get(host, 'config', lambda: _fetch_workers_config(host))
+    # 返回副本，避免调用方修改缓存
+    return dict(config) if config else None
+
+
+def _fetch_workers_config(host):
+    """
+    依次尝试 /api/config、/api/uuid、首页 HTML 获取 Workers 配置
+    
+    Returns:
+        (config, definitive)：探测请求出错时 definitive 为 False
+    """
+    workers_url = f"https://{host}"
+    definitive = True
     
     # 尝试从 Workers API 获取配置
     try:
-        workers_url = f"https://{host}"
         resp = requests.get(f"{workers_url}/api/config", timeout=10)
         if resp.status_code == 200:
             config = resp.json()
             config['host'] = host
-            _workers_config_cache[host] = config
-            return config
+            return config, True
+    except requests.RequestException:
+        definitive = False
     except:
         pass
     
     # 尝试从 /api/uuid 获取（兼容旧版本）
     try:
-        workers_url = f"https://{host}"
         resp = requests.get(f"{workers_url}/api/uuid", timeout=10)
         if resp.status_code == 200:
             config = resp.json()
             config['host'] = host
             if 'new_ip' not in config:
                 config['new_ip'] = True  # 默认启用
-            _workers_config_cache[host] = config
-            return config
+            return config, True
+    except requests.RequestException:
+        definitive = False
     except:
         pass
     
     # 如果获取失败，尝试从首页 HTML 解析 UUID
     try:
-        workers_url = f"https://{host}"
         resp = requests.get(workers_url, timeout=10)
         if resp.status_code == 200:
             import re
@@ -800,58 +865,32 @@ def _get_workers_config(cf_proxies):
                     'host': host,
                     'new_ip': True  # 默认启用
                 }
-                _workers_config_cache[host] = config
-                return config
+                return config, True
+    except requests.RequestException:
+        definitive = False
     except:
         pass
     
-    return None
+    return None, definitive
 
 
-def _request_vless(method, url, cf_proxies, uuid=None,
-                   http2=False, impersonate=None,
-                   map_output=False, map_file="cfspider_map.html",
-                   stealth=False, stealth_browser='chrome',
-                   static_ip=False, two_proxy=None, **kwargs):
+def _resolve_vless_target(cf_proxies, uuid=None, two_proxy=None):
     """
-    使用 VLESS 协议发送请求
-    
-    通过 CFspider Workers 的 VLESS 协议代理请求，
-    完全隐藏 Cloudflare 特征（CF-Ray、CF-Worker 等头）。
+    解析 VLESS 连接参数（同步、异步 VLESS 请求共用）
     
     Args:
-        method: HTTP 方法
-        url: 目标 URL
         cf_proxies: Workers 地址，支持字符串或 WorkersManager 对象
-        uuid: VLESS UUID（可选，不填则自动获取）
-        static_ip: 是否使用固定 IP（默认 False）
-            - False: 每次请求获取新的出口 IP（适合大规模采集）
-            - True: 保持使用同一个 IP（适合需要会话一致性的场景）
-        two_proxy: 第二层代理（可选）
-            格式: "host:port:user:pass"
-            流程: 本地 → Workers (VLESS) → 第二层代理 → 目标网站
-        其他参数与 request() 相同
-    """
-    from .vless_client import LocalVlessProxy
-    import uuid as uuid_mod
+        uuid: VLESS UUID（可选，不填则从 Workers 配置获取）
+        two_proxy: 第二层代理（可选，不填则使用 Workers 配置的双层代理）
     
+    Returns:
+        (vless_url, uuid, two_proxy)
+    """
     # 支持 WorkersManager 对象
-    workers_manager = None
-    if hasattr(cf_proxies, 'url') and hasattr(cf_proxies, 'uuid'):
-        # cf_proxies 是 WorkersManager 对象
-        workers_manager = cf_proxies
-        if not uuid and workers_manager.uuid:
-            uuid = workers_manager.uuid
-        cf_proxies = workers_manager.url
-        if not cf_proxies:
-            raise ValueError("WorkersManager 未成功创建 Workers，请检查 API Token 和 Account ID")
+    cf_proxies, uuid = _unwrap_workers_manager(cf_proxies, uuid)
     
     # 解析 Workers 地址获取 host
-    parsed = urlparse(cf_proxies)
-    if parsed.scheme:
-        host = parsed.netloc or parsed.path.split('/')[0]
-    else:
-        host = cf_proxies.split('/')[0]
+    host = _workers_host(cf_proxies)
     
     # 尝试从 Workers 获取配置
     config = _get_workers_config(cf_proxies)
@@ -895,26 +934,69 @@ def _request_vless(method, url, cf_proxies, uuid=None,
     
     # 构建 VLESS WebSocket URL: wss://host/uuid
     vless_url = f"wss://{host}/{uuid}"
+    return vless_url, uuid, two_proxy
+
+
+def _request_vless(method, url, cf_proxies, uuid=None,
+                   http2=False, impersonate=None,
+                   map_output=False, map_file="cfspider_map.html",
+                   stealth=False, stealth_browser='chrome',
+                   static_ip=False, two_proxy=None, **kwargs):
+    """
+    使用 VLESS 协议发送请求
     
-    # 根据 static_ip 参数决定是否复用连接
-    if static_ip:
-        # 固定 IP 模式：复用同一个连接
-        cache_key = f"{host}:{uuid}:{two_proxy or ''}"
-        if cache_key in _vless_proxy_cache:
-            proxy = _vless_proxy_cache[cache_key]
-            port = proxy.port
-        else:
-            proxy = LocalVlessProxy(vless_url, uuid, two_proxy=two_proxy)
-            port = proxy.start()
-            _vless_proxy_cache[cache_key] = proxy
-    else:
-        # 动态 IP 模式：每次创建新连接
-        proxy = LocalVlessProxy(vless_url, uuid, two_proxy=two_proxy)
-        port = proxy.start()
+    通过 CFspider Workers 的 VLESS 协议代理请求，
+    完全隐藏 Cloudflare 特征（CF-Ray、CF-Worker 等头）。
+    
+    Args:
+        method: HTTP 方法
+        url: 目标 URL
+        cf_proxies: Workers 地址，支持字符串或 WorkersManager 对象
+        uuid: VLESS UUID（可选，不填则自动获取）
+        static_ip: 是否使用固定 IP（默认 False）
+            - False: 每次请求获取新的出口 IP（适合大规模采集）
+            - True: 保持使用同一个 IP（适合需要会话一致性的场景）
+        two_proxy: 第二层代理（可选）
+            格式: "host:port:user:pass"
+            流程: 本地 → Workers (VLESS) → 第二层代理 → 目标网站
+        vless_engine: 本地代理引擎（可选，通过 kwargs 传入）
+            - 'thread'（默认）: 每连接线程，隧道来自预热池
+            - 'asyncio': 单事件循环承载所有连接
+        其他参数与 request() 相同
+    """
+    from .vless_manager import get_proxy_manager
     
-    # 构建本地代理 URL
-    local_proxy = f"http://127.0.0.1:{port}"
+    vless_engine = kwargs.pop('vless_engine', None)
     
+    vless_url, uuid, two_proxy = _resolve_vless_target(cf_proxies, uuid, two_proxy)
+    
+    # 本地代理由管理器复用：
+    # - 动态 IP 模式：共用本地监听端口，但每个请求新建上游隧道（每次新出口 IP）
+    # - 固定 IP 模式：缓存的代理按 LRU / 空闲超时淘汰
+    manager = get_proxy_manager()
+    proxy = manager.acquire(vless_url, uuid, two_proxy=two_proxy,
+                            static_ip=static_ip, engine=vless_engine)
+    try:
+        return _send_via_local_proxy(
+            method, url, proxy.proxy_url, http2=http2, impersonate=impersonate,
+            map_output=map_output, map_file=map_file,
+            stealth=stealth, stealth_browser=stealth_browser,
+            pooled=static_ip, **kwargs
+        )
+    finally:
+        manager.release(proxy)
+
+
+def _send_via_local_proxy(method, url, local_proxy, http2=False, impersonate=None,
+                          map_output=False, map_file="cfspider_map.html",
+                          stealth=False, stealth_browser='chrome', pooled=False, **kwargs):
+    """
+    通过本地 VLESS 代理发送请求
+    
+    Args:
+        pooled: 是否使用共享连接池客户端。仅用于固定 IP 模式：
+                动态 IP 模式下复用 keep-alive 的 CONNECT 隧道会固定出口 IP
+    """
     # 记录请求开始时间
     start_time = time.time()
     
@@ -935,6 +1017,16 @@ def _request_vless(method, url, cf_proxies, uuid=None,
     cookies = kwargs.pop("cookies", None)
     timeout = kwargs.pop("timeout", 30)
     
+    if pooled:
+        response = _pooled_request(
+            method, url, http2=http2, impersonate=impersonate, proxy=local_proxy,
+            params=params, headers=headers, data=data, json=json_data,
+            cookies=cookies, timeout=timeout, **kwargs
+        )
+        resp = CFSpiderResponse(response)
+        _handle_map_output(resp, url, start_time, map_output, map_file)
+        return resp
+    
     proxies = {
         "http": local_proxy,
         "https": local_proxy
@@ -1000,7 +1092,7 @@ def stop_vless_proxies():
     """
     停止所有 VLESS 本地代理
     
-    在程序结束时调用，释放资源。
+    进程退出时会自动调用（atexit），也可手动调用提前释放资源。
     
     Example:
         >>> import cfspider
@@ -1012,12 +1104,32 @@ def stop_vless_proxies():
         >>> # 程序结束时清理
         >>> cfspider.stop_vless_proxies()
     """
-    for key, proxy in list(_vless_proxy_cache.items()):
-        try:
-            proxy.stop()
-        except:
-            pass
-    _vless_proxy_cache.clear()
+    from .vless_client import close_tunnel_pools
+    from .vless_manager import get_proxy_manager
+    
+    get_proxy_manager().close()
+    close_tunnel_pools()
+
+
+def vless_proxy_stats():
+    """
+    获取 VLESS 本地代理统计
+    
+    Returns:
+        dict: listeners（本地监听端口数）、static / dynamic（固定 / 动态 IP 代理数）、
+              in_use、connections（活动连接数）、threads（进程存活线程数）、
+              created、evicted，以及 tunnel_pools（各 Workers 的预热隧道池统计）
+    
+    Example:
+        >>> import cfspider
+        >>> print(cfspider.vless_proxy_stats()["listeners"])
+    """
+    from .vless_client import tunnel_pool_stats
+    from .vless_manager import get_proxy_manager
+    
+    stats = get_proxy_manager().stats()
+    stats['tunnel_pools'] = tunnel_pool_stats()
+    return stats
 
 
 def get(url, cf_proxies=None, uuid=None, http2=False, impersonate=None,
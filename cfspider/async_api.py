@@ -6,6 +6,7 @@ CFspider 异步 API 模块
 - HTTP/2 协议支持
 - 流式响应（大文件下载）
 - 并发请求控制
+- 共享客户端：同一事件循环内的调用复用连接（参见 async_transport）
 
 使用前需要安装 httpx：
     pip install httpx[http2]
@@ -30,11 +31,16 @@ CFspider 异步 API 模块
     - 同步请求 10 个 URL：约 10 秒（串行）
     - 异步请求 10 个 URL：约 1 秒（并发）
 """
+import time
+
 import httpx
 from urllib.parse import urlencode, quote
 from typing import Optional, Dict, Any, AsyncIterator
 from contextlib import asynccontextmanager
 
+from .async_transport import get_async_client_pool
+from .balancer import get_balancer, is_multi
+
 
 class AsyncCFSpiderResponse:
     """
@@ -51,6 +57,7 @@ class AsyncCFSpiderResponse:
         status_code (int): HTTP 状态码
         headers: 响应头
         http_version (str): HTTP 版本（HTTP/1.1 或 HTTP/2）
+        parser (str): CSS 选择器引擎，"lxml"（默认）或 "bs4"
     
     Methods:
         json(): 解析 JSON
@@ -110,13 +117,19 @@ class AsyncCFSpiderResponse:
     
     # ========== 数据提取方法 ==========
     
+    # CSS 选择器引擎："lxml"、"bs4"，None 表示使用 extract.DEFAULT_PARSER（lxml）
+    parser = None
+    
     def _get_extractor(self):
-        """获取数据提取器（延迟初始化）"""
-        if not hasattr(self, '_extractor') or self._extractor is None:
-            from .extract import Extractor
+        """获取数据提取器（延迟初始化，修改 parser 后重新创建）"""
+        extractor = getattr(self, '_extractor', None)
+        if extractor is None or (self.parser is not None and extractor.parser != self.parser):
+            from .extract import Extractor, _response_encoding
             content_type = "json" if self._is_json_response() else "html"
-            self._extractor = Extractor(self.text, content_type)
-        return self._extractor
+            # 原始字节直接交给 lxml，不经过 .text 解码
+            extractor = self._extractor = Extractor(
+                self.content, content_type, self.parser, _response_encoding(self))
+        return extractor
     
     def _is_json_response(self) -> bool:
         """判断是否是 JSON 响应"""
@@ -242,6 +255,22 @@ class AsyncStreamResponse:
         await self._response.aclose()
 
 
+def _is_vless(cf_proxies, cf_workers, uuid) -> bool:
+    """是否走 VLESS 传输（传入 uuid 或 WorkersManager 对象时）"""
+    if not cf_proxies or not cf_workers:
+        return False
+    return bool(uuid) or (hasattr(cf_proxies, 'url') and hasattr(cf_proxies, 'uuid'))
+
+
+async def _vless_client(cf_proxies, uuid, two_proxy, http2, timeout, **client_kwargs) -> httpx.AsyncClient:
+    """创建走 VLESS 隧道的 httpx.AsyncClient（隧道运行在当前事件循环中）"""
+    from .vless_transport import resolve_vless_transport
+    transport = await resolve_vless_transport(cf_proxies, uuid, two_proxy, http2=http2)
+    return httpx.AsyncClient(
+        transport=transport, http2=http2, timeout=timeout, trust_env=False, **client_kwargs
+    )
+
+
 async def arequest(
     method: str,
     url: str,
@@ -252,9 +281,10 @@ async def arequest(
     **kwargs
 ) -> AsyncCFSpiderResponse:
     """
-    发送异步 HTTP 请求（无需 UUID）
+    发送异步 HTTP 请求
     
-    使用 /proxy API 路由，无需提供 UUID。
+    默认使用 /proxy API 路由，无需提供 UUID；
+    传入 uuid（或 WorkersManager 对象）时改走 VLESS 隧道。
     
     Args:
         method: HTTP 方法
@@ -262,9 +292,15 @@ async def arequest(
         cf_proxies: Workers 代理地址（选填，无需 UUID）
                     - 当 cf_workers=True 时，填写 CFspider Workers 地址
                     - 当 cf_workers=False 时，填写普通代理地址
+                    - 也可以是多个 Workers 地址 / WorkersManager 组成的列表，
+                      请求按延迟和错误率加权分配，故障节点自动熔断
         cf_workers: 是否使用 CFspider Workers API（默认 True）
         http2: 是否启用 HTTP/2（默认 True）
         **kwargs: 其他参数
+            - uuid: VLESS UUID（选填）。传入后使用原生 asyncio VLESS 传输：
+              隧道直接运行在当前事件循环中，不需要辅助线程和本地监听端口，
+              响应中没有 Cloudflare 特征头
+            - two_proxy: 第二层代理 "host:port:user:pass"（VLESS 模式下支持 HTTPS）
     
     Returns:
         AsyncCFSpiderResponse: 异步响应对象
@@ -272,17 +308,39 @@ async def arequest(
     Example:
         # 无需 UUID
         response = await cfspider.aget("https://httpbin.org/ip", cf_proxies="https://your-workers.dev")
+        
+        # VLESS 隧道
+        response = await cfspider.aget("https://httpbin.org/ip", cf_proxies="https://your-workers.dev", uuid="your-uuid")
     """
+    # 多个 Workers 节点：由均衡器选择本次请求的节点
+    if is_multi(cf_proxies):
+        balancer = get_balancer(cf_proxies)
+        endpoint = balancer.acquire()
+        start = time.monotonic()
+        status = None
+        try:
+            response = await arequest(
+                method, url, cf_proxies=endpoint.target, cf_workers=cf_workers,
+                http2=http2, token=token, **kwargs
+            )
+            status = response.status_code
+            return response
+        finally:
+            balancer.release(endpoint, time.monotonic() - start, error=status is None, status=status)
+    
     params = kwargs.pop("params", None)
     headers = kwargs.pop("headers", {})
     data = kwargs.pop("data", None)
     json_data = kwargs.pop("json", None)
     cookies = kwargs.pop("cookies", None)
     timeout = kwargs.pop("timeout", 30)
+    uuid = kwargs.pop("uuid", None)
+    two_proxy = kwargs.pop("two_proxy", None)
     
-    # 如果没有指定 cf_proxies，直接请求
-    if not cf_proxies:
-        async with httpx.AsyncClient(http2=http2, timeout=timeout) as client:
+    # VLESS 隧道：请求直接发往目标站点
+    if _is_vless(cf_proxies, cf_workers, uuid):
+        client = await _vless_client(cf_proxies, uuid, two_proxy, http2, timeout)
+        async with client:
             response = await client.request(
                 method,
                 url,
@@ -295,24 +353,39 @@ async def arequest(
             )
             return AsyncCFSpiderResponse(response)
     
+    # 如果没有指定 cf_proxies，直接请求
+    if not cf_proxies:
+        client = await get_async_client_pool().get(http2, timeout=timeout)
+        response = await client.request(
+            method,
+            url,
+            params=params,
+            headers=headers,
+            data=data,
+            json=json_data,
+            cookies=cookies,
+            **kwargs
+        )
+        return AsyncCFSpiderResponse(response)
+    
     # cf_workers=False：使用普通代理
     if not cf_workers:
         proxy_url = cf_proxies
         if not proxy_url.startswith(('http://', 'https://', 'socks5://')):
             proxy_url = f"http://{proxy_url}"
         
-        async with httpx.AsyncClient(http2=http2, timeout=timeout, proxy=proxy_url) as client:
-            response = await client.request(
-                method,
-                url,
-                params=params,
-                headers=headers,
-                data=data,
-                json=json_data,
-                cookies=cookies,
-                **kwargs
-            )
-            return AsyncCFSpiderResponse(response)
+        client = await get_async_client_pool().get(http2, proxy_url, timeout)
+        response = await client.request(
+            method,
+            url,
+            params=params,
+            headers=headers,
+            data=data,
+            json=json_data,
+            cookies=cookies,
+            **kwargs
+        )
+        return AsyncCFSpiderResponse(response)
     
     # cf_workers=True：使用 CFspider Workers API 代理
     cf_proxies = cf_proxies.rstrip("/")
@@ -337,14 +410,14 @@ async def arequest(
         cookie_str = "; ".join([f"{k}={v}" for k, v in cookies.items()])
         request_headers["X-CFSpider-Header-Cookie"] = cookie_str
     
-    async with httpx.AsyncClient(http2=http2, timeout=timeout) as client:
-        response = await client.post(
-            proxy_url,
-            headers=request_headers,
-            data=data,
-            json=json_data,
-            **kwargs
-        )
+    client = await get_async_client_pool().get(http2, timeout=timeout)
+    response = await client.post(
+        proxy_url,
+        headers=request_headers,
+        data=data,
+        json=json_data,
+        **kwargs
+    )
     
     cf_colo = response.headers.get("X-CF-Colo")
     cf_ray = response.headers.get("CF-Ray")
@@ -371,7 +444,7 @@ async def astream(
         cf_proxies: 代理地址（选填）
         cf_workers: 是否使用 CFspider Workers API（默认 True）
         http2: 是否启用 HTTP/2（默认 True）
-        **kwargs: 其他参数
+        **kwargs: 其他参数（uuid、two_proxy 与 arequest() 相同）
     
     Yields:
         AsyncStreamResponse: 流式响应对象
@@ -381,16 +454,36 @@ async def astream(
             async for chunk in response.aiter_bytes():
                 process(chunk)
     """
+    # 多个 Workers 节点：节点在整个流式响应期间计为在途
+    if is_multi(cf_proxies):
+        balancer = get_balancer(cf_proxies)
+        endpoint = balancer.acquire()
+        start = time.monotonic()
+        status = None
+        try:
+            async with astream(
+                method, url, cf_proxies=endpoint.target, cf_workers=cf_workers,
+                http2=http2, token=token, **kwargs
+            ) as response:
+                status = response.status_code
+                yield response
+        finally:
+            balancer.release(endpoint, time.monotonic() - start, error=status is None, status=status)
+        return
+    
     params = kwargs.pop("params", None)
     headers = kwargs.pop("headers", {})
     data = kwargs.pop("data", None)
     json_data = kwargs.pop("json", None)
     cookies = kwargs.pop("cookies", None)
     timeout = kwargs.pop("timeout", 30)
+    uuid = kwargs.pop("uuid", None)
+    two_proxy = kwargs.pop("two_proxy", None)
     
-    # 如果没有指定 cf_proxies，直接请求
-    if not cf_proxies:
-        async with httpx.AsyncClient(http2=http2, timeout=timeout) as client:
+    # VLESS 隧道：请求直接发往目标站点
+    if _is_vless(cf_proxies, cf_workers, uuid):
+        client = await _vless_client(cf_proxies, uuid, two_proxy, http2, timeout)
+        async with client:
             async with client.stream(
                 method,
                 url,
@@ -404,24 +497,40 @@ async def astream(
                 yield AsyncStreamResponse(response)
         return
     
+    # 如果没有指定 cf_proxies，直接请求
+    if not cf_proxies:
+        client = await get_async_client_pool().get(http2, timeout=timeout)
+        async with client.stream(
+            method,
+            url,
+            params=params,
+            headers=headers,
+            data=data,
+            json=json_data,
+            cookies=cookies,
+            **kwargs
+        ) as response:
+            yield AsyncStreamResponse(response)
+        return
+    
     # cf_workers=False：使用普通代理
     if not cf_workers:
         proxy_url = cf_proxies
         if not proxy_url.startswith(('http://', 'https://', 'socks5://')):
             proxy_url = f"http://{proxy_url}"
         
-        async with httpx.AsyncClient(http2=http2, timeout=timeout, proxy=proxy_url) as client:
-            async with client.stream(
-                method,
-                url,
-                params=params,
-                headers=headers,
-                data=data,
-                json=json_data,
-                cookies=cookies,
-                **kwargs
-            ) as response:
-                yield AsyncStreamResponse(response)
+        client = await get_async_client_pool().get(http2, proxy_url, timeout)
+        async with client.stream(
+            method,
+            url,
+            params=params,
+            headers=headers,
+            data=data,
+            json=json_data,
+            cookies=cookies,
+            **kwargs
+        ) as response:
+            yield AsyncStreamResponse(response)
         return
     
     # cf_workers=True：使用 CFspider Workers API 代理
@@ -447,18 +556,18 @@ async def astream(
         cookie_str = "; ".join([f"{k}={v}" for k, v in cookies.items()])
         request_headers["X-CFSpider-Header-Cookie"] = cookie_str
     
-    async with httpx.AsyncClient(http2=http2, timeout=timeout) as client:
-        async with client.stream(
-            "POST",
-            proxy_endpoint,
-            headers=request_headers,
-            data=data,
-            json=json_data,
-            **kwargs
-        ) as response:
-            cf_colo = response.headers.get("X-CF-Colo")
-            cf_ray = response.headers.get("CF-Ray")
-            yield AsyncStreamResponse(response, cf_colo=cf_colo, cf_ray=cf_ray)
+    client = await get_async_client_pool().get(http2, timeout=timeout)
+    async with client.stream(
+        "POST",
+        proxy_endpoint,
+        headers=request_headers,
+        data=data,
+        json=json_data,
+        **kwargs
+    ) as response:
+        cf_colo = response.headers.get("X-CF-Colo")
+        cf_ray = response.headers.get("CF-Ray")
+        yield AsyncStreamResponse(response, cf_colo=cf_colo, cf_ray=cf_ray)
 
 
 # 便捷方法
@@ -496,3 +605,65 @@ async def apatch(url: str, cf_proxies: Optional[str] = None, cf_workers: bool =
     """异步 PATCH 请求"""
     return await arequest("PATCH", url, cf_proxies=cf_proxies, cf_workers=cf_workers, http2=http2, **kwargs)
 
+
+
+async def _stream_pick(response: AsyncStreamResponse, plan, abort: bool = True,
+                       chunk_size: Optional[int] = None):
+    """
+    边下载边执行提取计划
+    
+    Returns:
+        (ExtractResult, 已读取的字节数)
+    """
+    from .extract import StreamExtraction, _charset_from_content_type
+    
+    content_type = response.headers.get("content-type", "")
+    extraction = StreamExtraction(
+        plan,
+        encoding=_charset_from_content_type(content_type),
+        content_type="json" if "application/json" in content_type.lower() else "html",
+    )
+    chunks = response.aiter_bytes(chunk_size)
+    try:
+        async for chunk in chunks:
+            if extraction.feed(chunk):
+                break
+        if not abort:
+            # 读完剩余内容（不解析），连接可以放回连接池复用
+            async for _ in chunks:
+                pass
+    finally:
+        await chunks.aclose()
+    return extraction.close(), extraction.bytes_read
+
+
+async def apick(url: str, rules, cf_proxies: Optional[str] = None, abort: bool = True,
+                chunk_size: Optional[int] = None, **kwargs):
+    """
+    流式请求并提取数据：边下载边解析，所有字段确定后停止
+    
+    适合只需要页面开头几个字段的超大页面（如带巨大内联脚本的列表页），
+    节省带宽和解析时间。字段规则格式同 pick / compile_rules。
+    
+    Args:
+        url: 目标 URL
+        rules: 提取规则字典，或 compile_rules() 编译后的 ExtractionPlan
+        cf_proxies: 代理地址（选填）
+        abort: 字段确定后是否中止下载（默认 True，连接会被关闭）；
+               False 时继续读完响应（不再解析），连接可以复用
+        chunk_size: 读取的分块大小（默认按网络到达的数据块）
+        **kwargs: 传给 astream() 的其他参数（headers、timeout、token 等）
+        
+    Returns:
+        ExtractResult 字典（带 url）
+        
+    Example:
+        >>> data = await cfspider.apick("https://example.com/huge", {"title": "title", "h1": "h1"})
+    """
+    from .extract import compile_rules
+    
+    plan = compile_rules(rules)
+    async with astream("GET", url, cf_proxies=cf_proxies, **kwargs) as response:
+        result, _ = await _stream_pick(response, plan, abort, chunk_size)
+    result.url = url
+    return result
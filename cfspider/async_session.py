@@ -8,20 +8,20 @@ from urllib.parse import urlencode, quote
 from typing import Optional, Dict, Any, AsyncIterator
 from contextlib import asynccontextmanager
 
-from .async_api import AsyncCFSpiderResponse, AsyncStreamResponse
+from .async_api import AsyncCFSpiderResponse, AsyncStreamResponse, _is_vless, _vless_client
 
 
 class AsyncSession:
     """
-    异步会话类（无需 UUID）
+    异步会话类
     
     提供可复用的 httpx.AsyncClient，支持 HTTP/2 和连接池。
-    使用 /proxy API 路由，无需提供 UUID。
+    默认使用 /proxy API 路由，无需提供 UUID；传入 uuid 时使用 VLESS 隧道。
     
     Note:
         - 基础使用：无需 UUID，直接使用
         - 双层代理 HTTP：支持 two_proxy 参数
-        - 双层代理 HTTPS：请使用 cfspider.get() + uuid + two_proxy
+        - 双层代理 HTTPS：传入 uuid + two_proxy（VLESS 模式）
     
     Example:
         # 无需 UUID
@@ -32,6 +32,10 @@ class AsyncSession:
         # 双层代理 (仅支持 HTTP)
         async with cfspider.AsyncSession(cf_proxies="...", two_proxy="host:port:user:pass") as session:
             r = await session.get("http://httpbin.org/ip")  # 注意是 http://
+        
+        # VLESS 隧道（keep-alive 连接上复用隧道，支持 HTTPS 双层代理）
+        async with cfspider.AsyncSession(cf_proxies="...", uuid="your-uuid") as session:
+            r = await session.get("https://httpbin.org/ip")
     """
     
     def __init__(
@@ -43,14 +47,14 @@ class AsyncSession:
         headers: Optional[Dict[str, str]] = None,
         cookies: Optional[Dict[str, str]] = None,
         token: Optional[str] = None,
-        uuid: Optional[str] = None,  # 无需填写，仅保留兼容性
+        uuid: Optional[str] = None,
         two_proxy: Optional[str] = None,
         **kwargs
     ):
         """
-        初始化异步会话（无需 UUID）
+        初始化异步会话
         
-        使用 Workers 的 /proxy API，无需提供 UUID 即可使用。
+        默认使用 Workers 的 /proxy API，无需提供 UUID 即可使用。
         
         Args:
             cf_proxies: Workers 地址，如 "https://your-workers.dev"
@@ -60,13 +64,11 @@ class AsyncSession:
             headers: 默认请求头
             cookies: 默认 Cookies
             token: 保留参数（当前未使用，预留给未来的访问控制功能）
-            uuid: 保留参数，无需填写（AsyncSession 使用 /proxy API，不需要 UUID）
-            two_proxy: 双层代理地址，格式 host:port:user:pass（仅支持 HTTP 请求）
+            uuid: VLESS UUID（选填）。传入后会话使用原生 asyncio VLESS 传输，
+                  请求经 VLESS 隧道直接发往目标站点（cf_proxies 也可以是 WorkersManager）
+            two_proxy: 双层代理地址，格式 host:port:user:pass
+                       （/proxy API 模式仅支持 HTTP 请求，VLESS 模式支持 HTTPS）
             **kwargs: 传递给 httpx.AsyncClient 的其他参数
-        
-        Note:
-            双层代理仅支持 HTTP 请求。如需 HTTPS 双层代理，请使用：
-            cfspider.get(..., uuid="your-uuid", two_proxy="...")
         """
         self.cf_proxies = cf_proxies
         self.cf_workers = cf_workers
@@ -79,6 +81,7 @@ class AsyncSession:
         self.two_proxy = two_proxy
         self._client_kwargs = kwargs
         self._client: Optional[httpx.AsyncClient] = None
+        self._vless = _is_vless(cf_proxies, cf_workers, uuid)
     
     async def __aenter__(self) -> "AsyncSession":
         """进入异步上下文"""
@@ -91,7 +94,12 @@ class AsyncSession:
     
     async def _ensure_client(self) -> None:
         """确保客户端已创建"""
-        if self._client is None:
+        if self._client is None and self._vless:
+            self._client = await _vless_client(
+                self.cf_proxies, self.uuid, self.two_proxy, self.http2, self.timeout,
+                headers=self.headers, cookies=self.cookies, **self._client_kwargs
+            )
+        elif self._client is None:
             # 处理代理
             proxy = None
             if self.cf_proxies and not self.cf_workers:
@@ -143,8 +151,10 @@ class AsyncSession:
         # 合并 headers
         merged_headers = {**self.headers, **headers}
         
-        # 如果没有 cf_proxies 或不使用 Workers API，直接请求
-        if not self.cf_proxies or not self.cf_workers:
+        # VLESS 模式、没有 cf_proxies 或不使用 Workers API 时，直接请求
+        if self._vless or not self.cf_proxies or not self.cf_workers:
+            kwargs.pop('uuid', None)
+            kwargs.pop('two_proxy', None)
             response = await self._client.request(
                 method,
                 url,
@@ -234,8 +244,10 @@ class AsyncSession:
         
         merged_headers = {**self.headers, **headers}
         
-        # 如果没有 cf_proxies 或不使用 Workers API，直接请求
-        if not self.cf_proxies or not self.cf_workers:
+        # VLESS 模式、没有 cf_proxies 或不使用 Workers API 时，直接请求
+        if self._vless or not self.cf_proxies or not self.cf_workers:
+            kwargs.pop('uuid', None)
+            kwargs.pop('two_proxy', None)
             async with self._client.stream(
                 method,
                 url,
@@ -0,0 +1,220 @@
+"""
+CFspider 异步共享客户端池
+
+模块级 aget() / arequest() / astream() 不再每次新建 httpx.AsyncClient，
+而是复用当前事件循环中的长期存活客户端：
+- 按事件循环分别缓存（httpx.AsyncClient 不能跨事件循环使用）
+- 同一循环内按 (http2, 代理 URL, 超时配置) 区分客户端，
+  asyncio.gather(*[aget(u) for u in urls]) 共用连接，HTTP/2 下多路复用到同一个 Worker
+- 连接池大小（httpx.Limits）可配置
+- 事件循环结束时（asyncio.run 退出前）自动关闭该循环的客户端，也可调用 aclose_all()
+
+与同步模块级调用一样，调用之间不保留 Cookie。
+
+Example:
+    >>> import asyncio, httpx, cfspider
+    >>> cfspider.configure_async_clients(limits=httpx.Limits(max_connections=200))
+    >>> async def main():
+    ...     urls = ["https://httpbin.org/get"] * 20
+    ...     await asyncio.gather(*[cfspider.aget(u, cf_proxies="...") for u in urls])
+    ...     await cfspider.aclose_all()
+    >>> asyncio.run(main())
+"""
+
+import asyncio
+import threading
+import weakref
+from http import cookiejar
+
+import httpx
+
+from .transport import _BlockAllCookies
+
+# 默认连接池配置
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+
+
+def _timeout_key(timeout):
+    """把超时配置转换为可哈希的键"""
+    if isinstance(timeout, httpx.Timeout):
+        return (timeout.connect, timeout.read, timeout.write, timeout.pool)
+    return timeout
+
+
+async def _loop_sentinel(pool, loop_ref):
+    """
+    挂在事件循环上的异步生成器
+
+    asyncio.run() 结束前会调用 loop.shutdown_asyncgens()，
+    借此在循环关闭之前关闭该循环的所有客户端。
+    只持有循环的弱引用，未经 shutdown_asyncgens 就被丢弃的循环仍可回收。
+    """
+    try:
+        yield
+    finally:
+        loop = loop_ref()
+        if loop is not None:
+            await pool._aclose_loop(loop)
+
+
+def _keep_on_loop(loop, sentinel):
+    """
+    由事件循环持有哨兵生成器，返回生成器的引用
+
+    生成器首次迭代后会经 ag_finalizer 强引用循环，放进以循环为键的
+    WeakKeyDictionary 的值里会让条目永远不被回收；挂到循环对象上后池里只留弱引用。
+    不支持任意属性的循环（如 uvloop）退回为直接持有。
+    """
+    try:
+        loop.__dict__.setdefault('_cfspider_sentinels', set()).add(sentinel)
+    except AttributeError:
+        return lambda: sentinel
+    return weakref.ref(sentinel)
+
+
+class AsyncClientPool:
+    """按事件循环缓存的 httpx.AsyncClient 池"""
+
+    def __init__(self, limits=None):
+        """
+        初始化客户端池
+
+        Args:
+            limits: httpx.Limits 连接池配置（每个客户端）
+        """
+        self.limits = limits or DEFAULT_LIMITS
+
+        self._lock = threading.Lock()
+        # loop -> {'clients': {key: client}, 'sentinel': 异步生成器的引用}
+        self._loops = weakref.WeakKeyDictionary()
+
+        # 统计计数
+        self.created = 0
+        self.closed = 0
+
+    async def get(self, http2=True, proxy=None, timeout=30):
+        """
+        获取当前事件循环中的共享客户端
+
+        Args:
+            http2: 是否启用 HTTP/2
+            proxy: 代理 URL（可选）
+            timeout: 超时配置（数字或 httpx.Timeout）
+
+        Returns:
+            httpx.AsyncClient（不要关闭，由池统一管理）
+        """
+        loop = asyncio.get_running_loop()
+        key = (bool(http2), proxy or None, _timeout_key(timeout))
+
+        with self._lock:
+            state = self._loops.get(loop)
+            if state is None:
+                state = {'clients': {}, 'sentinel': None}
+                self._loops[loop] = state
+            client = state['clients'].get(key)
+            if client is not None and not client.is_closed:
+                return client
+
+            client = httpx.AsyncClient(
+                http2=http2, proxy=proxy, timeout=timeout, limits=self.limits,
+                cookies=cookiejar.CookieJar(policy=_BlockAllCookies()),
+            )
+            state['clients'][key] = client
+            self.created += 1
+            sentinel = state['sentinel'] is None
+            if sentinel:
+                agen = _loop_sentinel(self, weakref.ref(loop))
+                state['sentinel'] = _keep_on_loop(loop, agen)
+
+        if sentinel:
+            # 首次迭代把生成器登记到事件循环（shutdown_asyncgens 时收尾）
+            await agen.__anext__()
+        return client
+
+    async def _aclose_loop(self, loop):
+        """关闭指定事件循环的所有客户端"""
+        with self._lock:
+            state = self._loops.pop(loop, None)
+        if state is None:
+            return
+        clients = list(state['clients'].values())
+        self.closed += len(clients)
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+    async def aclose(self):
+        """
+        关闭当前事件循环的所有客户端
+
+        其他事件循环的客户端在各自循环结束时关闭。
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+        await self._aclose_loop(loop)
+        if state is not None and state['sentinel'] is not None:
+            sentinel = state['sentinel']()
+            if sentinel is not None:
+                # 客户端已关闭，提前结束哨兵生成器
+                getattr(loop, '__dict__', {}).get('_cfspider_sentinels', set()).discard(sentinel)
+                await sentinel.aclose()
+
+    def stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: loops（持有客户端的事件循环数）、clients、created、closed
+        """
+        with self._lock:
+            states = list(self._loops.values())
+        return {
+            'loops': len(states),
+            'clients': sum(len(s['clients']) for s in states),
+            'created': self.created,
+            'closed': self.closed,
+        }
+
+
+_pool = AsyncClientPool()
+
+
+def get_async_client_pool():
+    """获取全局异步客户端池"""
+    return _pool
+
+
+def configure_async_clients(limits=None):
+    """
+    配置模块级异步请求使用的客户端池
+
+    新配置只对之后创建的客户端生效；已创建的客户端在所属事件循环结束
+    或调用 aclose_all() 时关闭。
+
+    Args:
+        limits: httpx.Limits，默认 max_connections=100、max_keepalive_connections=20、
+                keepalive_expiry=60
+
+    Example:
+        >>> import httpx, cfspider
+        >>> cfspider.configure_async_clients(limits=httpx.Limits(max_connections=500))
+    """
+    global _pool
+    _pool = AsyncClientPool(limits=limits)
+    return _pool
+
+
+async def aclose_all():
+    """
+    关闭当前事件循环中模块级异步请求的共享客户端
+
+    asyncio.run() 退出时会自动关闭，手动管理事件循环时可显式调用。
+
+    Example:
+        >>> await cfspider.aclose_all()
+    """
+    await _pool.aclose()
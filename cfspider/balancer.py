@@ -0,0 +1,245 @@
+"""
+CFspider 多 Workers 负载均衡
+
+cf_proxies 可以是多个 Workers 地址和 / 或 WorkersManager 对象组成的列表，
+请求按加权最少在途请求数（weighted least-outstanding-requests）分配到各节点：
+- 权重来自实测延迟（EWMA）和错误率（EWMA），慢的、出错多的节点分到的请求少
+- 熔断：连续失败 failure_threshold 次的节点被摘除，冷却 cooldown 秒后
+  放行一个探测请求，成功则恢复，失败则继续摘除（冷却时间翻倍，不超过 max_cooldown）
+- 所有节点都被摘除时仍选择最早被摘除的节点，请求不会直接失败
+- 每个节点的计数（在途、请求、成功、失败、延迟、熔断状态）可随时通过 stats() 读取
+
+同一个列表（内容相同）在进程内共享同一个均衡器，计数在多次调用之间累计；
+最多缓存 MAX_BALANCERS 个不同列表的均衡器，超出时淘汰最久未使用的。
+
+Example:
+    >>> import cfspider
+    >>> workers = ["https://a.workers.dev", "https://b.workers.dev", cfspider.make_workers(...)]
+    >>> results = cfspider.batch(urls, cf_proxies=workers, concurrency=50)
+    >>> for row in cfspider.get_balancer(workers).stats():
+    ...     print(row["endpoint"], row["requests"], row["latency"], row["state"])
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+# 计为节点失败的状态码（Workers 限流 / 网关错误）
+DEFAULT_FAILURE_STATUSES = (429, 502, 503, 504)
+
+# 没有延迟样本时假定的延迟（秒）
+_DEFAULT_LATENCY = 1.0
+
+# get_balancer() 最多缓存的均衡器数（按列表内容区分）
+MAX_BALANCERS = 64
+
+
+class Endpoint:
+    """单个 Workers 节点的状态和计数"""
+
+    __slots__ = (
+        'target', 'outstanding', 'requests', 'successes', 'failures',
+        'consecutive_failures', 'latency', 'error_rate', 'state', 'opened_at',
+        'cooldown', 'ejections',
+    )
+
+    def __init__(self, target):
+        self.target = target  # 传给请求函数的 cf_proxies（地址或 WorkersManager）
+        self.outstanding = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None     # 延迟 EWMA（秒）
+        self.error_rate = 0.0   # 错误率 EWMA
+        # 'closed'（正常）、'open'（已摘除）、'half_open'（探测中）
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.ejections = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'endpoint': self.target if isinstance(self.target, str) else str(self.target),
+            'state': self.state,
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'successes': self.successes,
+            'failures': self.failures,
+            'latency': round(self.latency, 4) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 4),
+            'ejections': self.ejections,
+        }
+
+
+class WorkersBalancer:
+    """
+    多 Workers 节点的均衡器（线程安全，可在同步和异步代码中共用）
+
+    通常不需要直接创建：cf_proxies 传入列表时会自动使用；
+    也可以创建后作为 cf_proxies 传入，以便自定义熔断参数。
+    """
+
+    def __init__(self, endpoints: Sequence, failure_threshold: int = 5,
+                 cooldown: float = 10.0, max_cooldown: float = 300.0,
+                 alpha: float = 0.2, failure_statuses: Sequence[int] = DEFAULT_FAILURE_STATUSES):
+        """
+        初始化均衡器
+
+        Args:
+            endpoints: Workers 地址和 / 或 WorkersManager 对象
+            failure_threshold: 连续失败多少次后摘除节点
+            cooldown: 摘除后多少秒放行探测请求
+            max_cooldown: 探测连续失败时冷却时间的上限（秒）
+            alpha: 延迟 / 错误率 EWMA 的平滑系数
+            failure_statuses: 计为节点失败的 HTTP 状态码
+        """
+        endpoints = [_normalize(e) for e in endpoints]
+        if not endpoints:
+            raise ValueError("cf_proxies 列表不能为空")
+        self.endpoints: List[Endpoint] = [Endpoint(e) for e in endpoints]
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.alpha = alpha
+        self.failure_statuses = frozenset(failure_statuses or ())
+        self._lock = threading.Lock()
+
+    def _score(self, ep: Endpoint, default_latency: float) -> float:
+        """节点得分，越小越优先：(在途 + 1) / 权重，权重 = 1 / (延迟 * 错误惩罚)"""
+        latency = ep.latency if ep.latency is not None else default_latency
+        penalty = 1.0 / max(0.05, 1.0 - ep.error_rate)
+        return (ep.outstanding + 1) * latency * penalty
+
+    def acquire(self, now: float = None) -> Endpoint:
+        """
+        选择一个节点（调用方在请求结束后必须调用 release()）
+
+        Returns:
+            Endpoint，endpoint.target 即本次请求使用的 cf_proxies
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            candidates = []
+            for ep in self.endpoints:
+                if ep.state == 'closed':
+                    candidates.append(ep)
+                elif ep.state == 'open' and now - ep.opened_at >= ep.cooldown:
+                    # 冷却结束：只放行一个探测请求
+                    ep.state = 'half_open'
+                    chosen = ep
+                    break
+            else:
+                chosen = None
+                if candidates:
+                    known = [ep.latency for ep in candidates if ep.latency is not None]
+                    default_latency = sum(known) / len(known) if known else _DEFAULT_LATENCY
+                    scored = [(self._score(ep, default_latency), ep) for ep in candidates]
+                    best = min(score for score, _ in scored)
+                    chosen = random.choice([ep for score, ep in scored if score == best])
+                else:
+                    # 全部被摘除：选择最早摘除的节点，而不是直接失败
+                    chosen = min(self.endpoints, key=lambda ep: ep.opened_at)
+            chosen.outstanding += 1
+            chosen.requests += 1
+            return chosen
+
+    def release(self, ep: Endpoint, duration: float, error: bool = False,
+                status: int = None, now: float = None):
+        """
+        记录一次请求结果
+
+        Args:
+            ep: acquire() 返回的节点
+            duration: 请求耗时（秒）
+            error: 是否出现异常（连接失败、超时等）
+            status: HTTP 状态码
+        """
+        now = time.monotonic() if now is None else now
+        failed = error or (status is not None and status in self.failure_statuses)
+        with self._lock:
+            ep.outstanding -= 1
+            ep.error_rate += self.alpha * ((1.0 if failed else 0.0) - ep.error_rate)
+            if failed:
+                ep.failures += 1
+                ep.consecutive_failures += 1
+                if ep.state == 'half_open':
+                    # 探测失败：继续摘除，冷却时间翻倍
+                    self._open(ep, now, min(self.max_cooldown, ep.cooldown * 2 or self.base_cooldown))
+                elif ep.state == 'closed' and ep.consecutive_failures >= self.failure_threshold:
+                    self._open(ep, now, self.base_cooldown)
+                return
+            ep.successes += 1
+            ep.consecutive_failures = 0
+            if ep.latency is None:
+                ep.latency = duration
+            else:
+                ep.latency += self.alpha * (duration - ep.latency)
+            if ep.state != 'closed':
+                ep.state = 'closed'
+                ep.cooldown = 0.0
+
+    def _open(self, ep: Endpoint, now: float, cooldown: float):
+        ep.state = 'open'
+        ep.opened_at = now
+        ep.cooldown = cooldown
+        ep.ejections += 1
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """每个节点的计数"""
+        with self._lock:
+            return [ep.stats() for ep in self.endpoints]
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def __repr__(self):
+        healthy = sum(1 for ep in self.endpoints if ep.state == 'closed')
+        return f"WorkersBalancer({healthy}/{len(self.endpoints)} healthy)"
+
+
+def _normalize(endpoint):
+    """Workers 地址去掉结尾的 /（WorkersManager 对象原样保留）"""
+    if isinstance(endpoint, str):
+        return endpoint.rstrip('/')
+    return endpoint
+
+
+def is_multi(cf_proxies) -> bool:
+    """cf_proxies 是否为多个节点（列表 / 元组 / WorkersBalancer）"""
+    return isinstance(cf_proxies, (list, tuple, WorkersBalancer))
+
+
+_balancers: 'OrderedDict[tuple, WorkersBalancer]' = OrderedDict()
+_balancers_lock = threading.Lock()
+
+
+def get_balancer(cf_proxies) -> Optional[WorkersBalancer]:
+    """
+    获取 cf_proxies 列表对应的均衡器
+
+    内容相同的列表共享同一个均衡器（进程内，最多缓存 MAX_BALANCERS 个，LRU 淘汰）；
+    只有一个元素的列表同样返回均衡器，cf_proxies 不是列表 / 元组 / WorkersBalancer 时返回 None。
+
+    Example:
+        >>> workers = ["https://a.workers.dev", "https://b.workers.dev"]
+        >>> cfspider.get(url, cf_proxies=workers)
+        >>> print(cfspider.get_balancer(workers).stats())
+    """
+    if isinstance(cf_proxies, WorkersBalancer):
+        return cf_proxies
+    if not isinstance(cf_proxies, (list, tuple)):
+        return None
+    key = tuple(_normalize(e) for e in cf_proxies)
+    with _balancers_lock:
+        balancer = _balancers.get(key)
+        if balancer is None:
+            balancer = WorkersBalancer(key)
+            _balancers[key] = balancer
+            while len(_balancers) > MAX_BALANCERS:
+                _balancers.popitem(last=False)
+        else:
+            _balancers.move_to_end(key)
+        return balancer
@@ -16,13 +16,31 @@ Example:
     ...     concurrency=5
     ... )
     >>> results.save("output.csv")
+    >>> 
+    >>> # 超大 URL 列表：边请求边处理，内存占用不随列表长度增长
+    >>> for item in cfspider.batch_iter("urls.txt", pick={"title": "h1"}):
+    ...     print(item.url, item.data)
+    >>> 
+    >>> # 保留正文但不占内存：写入磁盘段文件，按需读取
+    >>> results = cfspider.batch(urls, store_bodies="disk")
+    >>> html = results[0].content
 """
 
+import functools
+import os
+import pickle
 import time
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, List, Dict, Optional, Callable, Union
-from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import count, islice
+from typing import Any, List, Dict, Optional, Callable, Union, Iterable, Iterator, AsyncIterator
+
+from .body_store import BodyStore
+from .checkpoint import open_checkpoint
+from .dedup import make_deduper
+from .metrics import BatchStats, PhaseTracer, response_timings
+from .extract import compile_rules, pick_content
+from .retry import RetryPolicy
+from .scheduler import HostScheduler, AdaptiveConcurrency
 
 # 延迟导入 tqdm
 _tqdm = None
@@ -41,29 +59,71 @@ def _get_tqdm():
     return _tqdm
 
 
-@dataclass
 class BatchItem:
     """
     批量请求的单个结果项
     
+    使用 __slots__，每项只保存状态、耗时、大小和提取结果；
+    响应对象默认在提取完成后释放（参见 batch() 的 store_bodies）。
+    
     Attributes:
         url: 请求的 URL
         data: 提取的数据（如果使用了 pick）
-        response: 原始响应对象
+        response: 原始响应对象（store_bodies="memory" 时保留）
         error: 错误信息（如果请求失败）
         duration: 请求耗时（秒）
+        status: HTTP 状态码（请求失败时为 None）
+        size: 响应正文字节数
+        timings: 分阶段耗时（秒），如 {"connect": 0.03, "tls": 0.05, "ttfb": 0.2, "body": 0.01}；
+                 只包含传输层能提供的阶段（参见 cfspider.metrics）
+        colo: Cloudflare 节点代码（经 Workers 代理时可用）
     """
-    url: str
-    data: Optional[Dict[str, Any]] = None
-    response: Any = None
-    error: Optional[str] = None
-    duration: float = 0.0
+    
+    __slots__ = ('url', 'data', 'response', 'error', 'duration', 'status', 'size',
+                 'timings', 'colo', '_body')
+    
+    def __init__(self, url: str, data: Optional[Dict[str, Any]] = None, response: Any = None,
+                 error: Optional[str] = None, duration: float = 0.0,
+                 status: Optional[int] = None, size: Optional[int] = None,
+                 timings: Optional[Dict[str, float]] = None, colo: Optional[str] = None):
+        self.url = url
+        self.data = data
+        self.response = response
+        self.error = error
+        self.duration = duration
+        self.status = status
+        self.size = size
+        self.timings = timings
+        self.colo = colo
+        self._body = None  # (BodyStore, 偏移, 长度)
     
     @property
     def success(self) -> bool:
         """请求是否成功"""
         return self.error is None
     
+    @property
+    def content(self) -> Optional[bytes]:
+        """
+        响应正文
+        
+        store_bodies="memory" 时来自 response；store_bodies="disk" 时从段文件按需读取；
+        正文已释放时为 None。
+        """
+        if self.response is not None:
+            return self.response.content
+        if self._body is not None:
+            store, offset, length = self._body
+            return store.read(offset, length)
+        return None
+    
+    def __eq__(self, other):
+        if not isinstance(other, BatchItem):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__[:-1])
+    
+    __hash__ = None
+    
     def __repr__(self):
         if self.success:
             return f"BatchItem(url={self.url!r}, data={self.data})"
@@ -93,11 +153,29 @@ class BatchResult:
     """
     
     def __init__(self, items: List[BatchItem] = None):
-        self._items: List[BatchItem] = items or []
+        self._items: List[BatchItem] = []
+        # 成功 / 失败列表和总耗时随 append() 增量维护，不重复扫描
+        self._successful: List[BatchItem] = []
+        self._failed: List[BatchItem] = []
+        self._total_duration = 0.0
+        # 使用检查点续跑时，跳过的已完成 URL 数
+        self.skipped = 0
+        # 去重跳过的重复 URL 数（dedup=True 时）
+        self.duplicates = 0
+        # 自适应并发的统计（adaptive=True 时）
+        self.concurrency: Optional[Dict[str, Any]] = None
+        # store_bodies="disk" 时的正文段文件
+        self.bodies: Optional[BodyStore] = None
+        # 分阶段耗时直方图、吞吐时间线和按节点的统计
+        self.stats: Optional[BatchStats] = None
+        for item in items or []:
+            self.append(item)
     
     def append(self, item: BatchItem):
         """添加结果项"""
         self._items.append(item)
+        (self._successful if item.success else self._failed).append(item)
+        self._total_duration += item.duration
     
     def __iter__(self):
         return iter(self._items)
@@ -110,20 +188,20 @@ class BatchResult:
     
     @property
     def successful(self) -> List[BatchItem]:
-        """获取成功的结果"""
-        return [item for item in self._items if item.success]
+        """获取成功的结果（返回副本，修改它不影响 summary() 等统计）"""
+        return list(self._successful)
     
     @property
     def failed(self) -> List[BatchItem]:
-        """获取失败的结果"""
-        return [item for item in self._items if not item.success]
+        """获取失败的结果（返回副本）"""
+        return list(self._failed)
     
     @property
     def success_rate(self) -> float:
         """成功率"""
         if not self._items:
             return 0.0
-        return len(self.successful) / len(self._items)
+        return len(self._successful) / len(self._items)
     
     def to_list(self) -> List[Dict[str, Any]]:
         """转换为字典列表"""
@@ -177,26 +255,481 @@ class BatchResult:
     
     def summary(self) -> Dict[str, Any]:
         """获取结果摘要"""
-        total_duration = sum(item.duration for item in self._items)
-        return {
+        total_duration = self._total_duration
+        summary = {
             "total": len(self._items),
-            "successful": len(self.successful),
-            "failed": len(self.failed),
+            "successful": len(self._successful),
+            "failed": len(self._failed),
             "success_rate": f"{self.success_rate:.1%}",
             "total_duration": f"{total_duration:.2f}s",
             "avg_duration": f"{total_duration / len(self._items):.2f}s" if self._items else "0s",
+            "skipped": self.skipped,
+            "duplicates": self.duplicates,
         }
+        if self.concurrency:
+            summary["concurrency_limit"] = self.concurrency["limit"]
+            summary["concurrency_range"] = f"{self.concurrency['low']}-{self.concurrency['peak']}"
+        if self.stats is not None and self.stats.requests:
+            latency = self.stats.phases.get("total")
+            summary["requests_per_sec"] = f"{self.stats.requests / self.stats.elapsed:.1f}"
+            summary["bytes_per_sec"] = f"{self.stats.bytes / self.stats.elapsed:.0f}"
+            if latency is not None:
+                summary["latency_p50"] = f"{latency.percentile(50):.3f}s"
+                summary["latency_p99"] = f"{latency.percentile(99):.3f}s"
+        return summary
+    
+    def close(self):
+        """关闭正文段文件（store_bodies="disk" 且未指定 body_file 时删除临时文件）"""
+        if self.bodies is not None:
+            self.bodies.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
     
     def __repr__(self):
-        return f"BatchResult({len(self.successful)} successful, {len(self.failed)} failed)"
+        return f"BatchResult({len(self._successful)} successful, {len(self._failed)} failed)"
+
+
+# 默认在途任务上限 = concurrency * DEFAULT_PREFETCH
+DEFAULT_PREFETCH = 2
+
+
+def _iter_urls(urls) -> Iterator[str]:
+    """
+    逐个产出 URL
+    
+    文件路径按行惰性读取（跳过空行和 # 注释），不会一次性载入内存。
+    """
+    if isinstance(urls, str):
+        with open(urls, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+    else:
+        yield from urls
+
+
+def _total(urls) -> Optional[int]:
+    """URL 总数（未知时返回 None，用于进度条）"""
+    if isinstance(urls, str) or not hasattr(urls, '__len__'):
+        return None
+    return len(urls)
+
+
+def _close_source(source, url_iter, cp, owned_cp):
+    """关闭 URL 来源，提交（或关闭）检查点"""
+    for it in (source, url_iter):
+        if it is not None and hasattr(it, 'close'):
+            it.close()
+    if cp is not None:
+        if owned_cp:
+            cp.close()
+        else:
+            cp.flush()
+
+
+def _adaptive_controller(adaptive, concurrency, min_concurrency, max_concurrency):
+    """把 adaptive 参数转换为 AdaptiveConcurrency（未启用时返回 None）"""
+    if isinstance(adaptive, AdaptiveConcurrency):
+        return adaptive
+    if adaptive:
+        return AdaptiveConcurrency(concurrency, min_concurrency, max_concurrency)
+    return None
+
+
+def _attempt_proxies(policy: Optional[RetryPolicy], failures: int, cf_proxies):
+    """本次尝试使用的 cf_proxies（失败次数达到 switch_after 后换节点）"""
+    if policy is None:
+        return cf_proxies
+    return policy.proxy_for(failures, cf_proxies)
+
+
+def _attempt_kwargs(kwargs: Dict[str, Any], proxies, cf_proxies) -> Dict[str, Any]:
+    """换用备用节点时去掉调用方的 uuid（它属于主节点，备用节点的 UUID 自动获取，与 Session 一致）"""
+    if proxies == cf_proxies or 'uuid' not in kwargs:
+        return kwargs
+    return {k: v for k, v in kwargs.items() if k != 'uuid'}
+
+
+def _requeue(scheduler: HostScheduler, attempts: Dict[int, Any], job, item: BatchItem,
+             retry_delay: Optional[float]) -> bool:
+    """
+    处理一次尝试的结果
+    
+    需要重试时把任务延后放回调度器（等待期间不占用并发），返回 True；
+    否则清理重试状态，把 duration 改为从首次尝试开始计算，返回 False。
+    
+    job 为 (序号, URL)：重试状态按序号记录，输入中重复的 URL 各自计算重试次数。
+    """
+    seq, url = job
+    if retry_delay is not None:
+        failures, started = attempts.get(seq, (0, time.time() - item.duration))
+        attempts[seq] = (failures + 1, started)
+        scheduler.push(url, delay=retry_delay, task=job)
+        return True
+    state = attempts.pop(seq, None)
+    if state is not None:
+        item.duration = time.time() - state[1]
+    return False
+
+
+def _extraction_pool(extract_workers, pick) -> Optional[ProcessPoolExecutor]:
+    """
+    创建 pick 提取阶段的进程池（未启用或没有 pick 规则时返回 None）
+    
+    Args:
+        extract_workers: 进程数；True 表示使用全部 CPU 核心
+        pick: pick 规则（需要能 pickle 传给子进程）
+    """
+    if not extract_workers or not pick:
+        return None
+    try:
+        pickle.dumps(pick)
+    except Exception as e:
+        raise ValueError(
+            "使用 extract_workers 时 pick 规则必须可以 pickle，"
+            "转换函数请使用内置函数或模块顶层定义的函数（不能是 lambda）"
+        ) from e
+    if extract_workers is True:
+        extract_workers = os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=int(extract_workers))
+
+
+def _trace_extensions(extensions: Optional[Dict[str, Any]], tracer: PhaseTracer) -> Dict[str, Any]:
+    """在 httpx 请求扩展中加入分阶段计时（调用方自带 trace 时保留调用方的）"""
+    if not extensions:
+        return {'trace': tracer}
+    if 'trace' in extensions:
+        return extensions
+    return {**extensions, 'trace': tracer}
+
+
+def _response_payload(response):
+    """交给提取进程的响应数据：(原始字节, 声明的编码, 内容类型)"""
+    from .extract import _response_encoding
+    content_type = response.headers.get("content-type", "")
+    return (
+        response.content,
+        _response_encoding(response),
+        "json" if "application/json" in content_type.lower() else "html",
+    )
+
+
+def _finish_extraction(item: BatchItem, data, error: Optional[BaseException],
+                       on_success: Callable, on_error: Callable) -> BatchItem:
+    """进程池提取完成后，在消费线程中填充结果并执行回调"""
+    from .extract import ExtractResult
+    try:
+        if error is not None:
+            raise error
+        item.data = ExtractResult(data, url=item.url)
+        if on_success:
+            on_success(item.url, item.response, item.data)
+    except Exception as e:
+        item.error = str(e)
+        if on_error:
+            on_error(item.url, e)
+    return item
+
+
+def _body_store(store_bodies, body_file=None) -> Optional[BodyStore]:
+    """把 store_bodies 参数转换为 BodyStore（不写磁盘时返回 None）"""
+    if isinstance(store_bodies, BodyStore):
+        return store_bodies
+    if store_bodies == "disk":
+        return BodyStore(body_file)
+    if store_bodies not in (None, False, "memory"):
+        raise ValueError(f"store_bodies 只能是 None、'memory' 或 'disk'，而不是 {store_bodies!r}")
+    return None
+
+
+def _release_body(item: BatchItem, store: Optional[BodyStore], keep_response: bool):
+    """URL 处理完成：记录正文大小，按配置写入段文件，并释放响应"""
+    response = item.response
+    if response is None:
+        return
+    content = getattr(response, 'content', None)
+    if content is not None:
+        item.size = len(content)
+        if store is not None:
+            item._body = (store,) + store.append(item.url, content)
+    if not keep_response:
+        item.response = None
+
+
+def _merge_checkpoint(result: BatchResult, cp) -> BatchResult:
+    """把本次运行因已完成而跳过的 URL 的旧结果并入本次结果"""
+    seen = {item.url for item in result}
+    for item in cp.items(cp.skipped_urls):
+        if item.url not in seen:
+            result.append(item)
+    result.skipped = cp.skipped
+    return result
+
+
+def batch_iter(
+    urls: Union[Iterable[str], str],
+    pick: Dict[str, Any] = None,
+    concurrency: int = 5,
+    delay: float = 0.0,
+    retry: Union[int, RetryPolicy] = 0,
+    timeout: float = 30.0,
+    cf_proxies: str = None,
+    token: str = None,
+    impersonate: str = None,
+    stealth: bool = False,
+    stealth_browser: str = None,
+    headers: Dict[str, str] = None,
+    on_success: Callable = None,
+    on_error: Callable = None,
+    progress: bool = False,
+    prefetch: int = DEFAULT_PREFETCH,
+    keep_response: bool = False,
+    store_bodies=None,
+    body_file: str = None,
+    checkpoint=None,
+    resume: bool = True,
+    host_rate: float = None,
+    host_burst: float = 1,
+    host_concurrency: int = None,
+    host_limits: Dict[str, Dict[str, Any]] = None,
+    adaptive=False,
+    min_concurrency: int = 1,
+    max_concurrency: int = None,
+    extract_workers=None,
+    dedup=False,
+    stats: BatchStats = None,
+    **kwargs
+) -> Iterator[BatchItem]:
+    """
+    流式批量请求，按完成顺序逐个产出结果
+    
+    URL 从可迭代对象或文件中按需读取，同时在途的任务不超过
+    concurrency * prefetch 个，适合数百万 URL 的列表。
+    
+    Args:
+        urls: URL 可迭代对象（列表、生成器等）或文件路径
+        prefetch: 在途任务上限倍数（在途任务数 = concurrency * prefetch）
+        keep_response: 是否在结果中保留 response（等同于 store_bodies="memory"）
+        store_bodies: 正文保存方式：
+                      - None（默认）：pick 和 on_success 之后释放响应，只保留
+                        状态、耗时、大小和提取结果，内存占用不随 URL 数量增长
+                      - "memory"：保留 response 对象
+                      - "disk"：正文追加写入段文件（body_file，默认临时文件），
+                        item.content 通过 mmap 按需读取；也可以传入 BodyStore 对象
+        body_file: store_bodies="disk" 时的段文件路径
+        checkpoint: SQLite 检查点文件路径或 BatchCheckpoint 对象（可选），
+                    记录每个 URL 的状态、耗时、错误和提取结果
+        resume: 使用检查点时是否跳过已成功的 URL（False 则清空检查点重来）
+        host_rate: 每个 host 每秒最多请求数（令牌桶，默认不限）
+        host_burst: 每个 host 允许的突发请求数
+        host_concurrency: 每个 host 的并发上限（默认不限）
+        host_limits: 指定 host 的单独限制，如 {"example.com": {"rate": 1, "concurrency": 2}}
+        adaptive: 是否自适应调整并发（AIMD），也可传入 AdaptiveConcurrency 对象；
+                  concurrency 作为初始值，根据延迟分位数和 429 / 错误比例增减
+        min_concurrency: 自适应并发的下限
+        max_concurrency: 自适应并发的上限（默认 concurrency * 4）
+        dedup: 是否跳过重复 URL（规范化后用 Bloom 过滤器判重），也可以传入
+               URLDeduper 对象或参数字典，如 {"error_rate": 0.0001, "path": "seen.bloom"}
+        extract_workers: pick 提取使用的进程数（True 表示全部 CPU 核心，默认不启用）；
+                         启用后请求线程只下载原始字节，HTML 解析在进程池中进行，
+                         不再与网络 I/O 争抢 GIL。on_success 在提取完成后调用
+        stats: cfspider.BatchStats 对象（可选），每产出一个结果就记录其分阶段耗时、
+               字节数和 cf_colo，用于查看延迟分布和吞吐
+        其他参数与 batch() 相同（progress 默认关闭）
+    
+    Note:
+        请求由按 host 轮询的调度器派发（参见 scheduler.HostScheduler）：
+        受限的站点排队等待，其他站点的 URL 照常以全局并发发送。
+        delay 为全局的请求开始间隔。
+        需要重试的 URL（429 / 5xx / 网络错误，见 retry.RetryPolicy）按退避时间
+        放回调度器，等待期间不占用并发；只产出每个 URL 的最终结果。
+        
+    Yields:
+        BatchItem（按完成顺序，不保证与输入顺序一致）
+        
+    Example:
+        >>> for item in cfspider.batch_iter("urls.txt", pick={"title": "h1"},
+        ...                                 concurrency=20):
+        ...     writer.writerow([item.url, item.data and item.data.get("title")])
+    """
+    from . import api
+    
+    policy = RetryPolicy.from_retry(retry)
+    budget = policy.new_budget() if policy else None
+    # 规则只编译一次，每个页面只执行查询（进程池中每个子进程各编译一次）
+    pick = compile_rules(pick) if pick else None
+    extractor = _extraction_pool(extract_workers, pick)
+    store = _body_store(store_bodies, body_file)
+    keep_response = keep_response or store_bodies == "memory"
+    
+    def process_url(url: str, failures: int = 0):
+        """
+        处理单个 URL（单次尝试）
+        
+        Returns:
+            (BatchItem, retry_delay)：retry_delay 不为 None 时表示需要在该秒数后重试
+        """
+        start_time = time.time()
+        item = BatchItem(url=url)
+        proxies = _attempt_proxies(policy, failures, cf_proxies)
+        
+        try:
+            response = api.get(
+                url,
+                cf_proxies=proxies,
+                token=token,
+                impersonate=impersonate,
+                stealth=stealth,
+                stealth_browser=stealth_browser,
+                headers=headers,
+                timeout=timeout,
+                **_attempt_kwargs(kwargs, proxies, cf_proxies)
+            )
+            item.status = getattr(response, 'status_code', None)
+            item.duration = time.time() - start_time
+            item.timings = response_timings(response, item.duration)
+            item.colo = getattr(response, 'cf_colo', None)
+            
+            if policy is not None and policy.should_retry(failures + 1, budget, response=response):
+                return item, policy.backoff(failures + 1, response)
+            
+            item.response = response
+            if extractor is not None:
+                # 数据提取和成功回调在进程池阶段完成
+                return item, None
+            
+            # 数据提取
+            if pick:
+                item.data = pick.run(response)
+            
+            # 成功回调
+            if on_success:
+                on_success(url, response, item.data)
+            
+            return item, None
+            
+        except Exception as e:
+            item.response = None
+            item.error = str(e)
+            item.duration = time.time() - start_time
+            
+            if (item.status is None and policy is not None
+                    and policy.should_retry(failures + 1, budget, error=e)):
+                return item, policy.backoff(failures + 1)
+            
+            # 错误回调
+            if on_error:
+                on_error(url, e)
+            
+            return item, None
+    
+    controller = _adaptive_controller(adaptive, concurrency, min_concurrency, max_concurrency)
+    workers = controller.max_limit if controller else concurrency
+    tqdm = _get_tqdm()
+    bar = tqdm(total=_total(urls), desc="Fetching") if progress and tqdm else None
+    max_in_flight = max(1, workers * prefetch)
+    cp, owned_cp = open_checkpoint(checkpoint, resume) if checkpoint is not None else (None, False)
+    url_iter = _iter_urls(urls)
+    deduper = make_deduper(dedup)
+    unique = deduper.filter(url_iter) if deduper is not None else url_iter
+    source = cp.pending(unique) if cp is not None and resume else unique
+    scheduler = HostScheduler(rate=host_rate, burst=host_burst, concurrency=host_concurrency,
+                              host_limits=host_limits, delay=delay)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    running = {}
+    extracting = {}  # 提取中的 future -> BatchItem
+    attempts = {}  # 等待重试的任务序号 -> (已失败次数, 首次开始时间)
+    jobs = count()
+    exhausted = False
+    
+    try:
+        while True:
+            # 补充排队 URL，排队 + 运行中的任务不超过在途上限
+            if not exhausted:
+                want = max_in_flight - len(scheduler) - len(running) - len(extracting)
+                pulled = 0
+                for url in islice(source, want):
+                    scheduler.push(url, task=(next(jobs), url))
+                    pulled += 1
+                exhausted = pulled < want
+            
+            # 按 host 轮询派发
+            wait_time = None
+            limit = controller.current if controller else concurrency
+            while len(running) < limit:
+                job, wait_time = scheduler.pop()
+                if job is None:
+                    break
+                failures = attempts[job[0]][0] if job[0] in attempts else 0
+                running[executor.submit(process_url, job[1], failures)] = job
+            
+            if not running and not extracting:
+                if exhausted and not len(scheduler):
+                    break
+                # 所有排队的 host 都在等令牌
+                time.sleep(wait_time or 0)
+                continue
+            
+            done, _ = wait(running.keys() | extracting.keys(), timeout=wait_time,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in extracting:
+                    item = extracting.pop(future)
+                    error = future.exception()
+                    _finish_extraction(item, None if error else future.result(), error,
+                                       on_success, on_error)
+                else:
+                    job = running.pop(future)
+                    url = job[1]
+                    scheduler.release(url)
+                    try:
+                        item, retry_delay = future.result()
+                    except Exception as e:
+                        item, retry_delay = BatchItem(url=url, error=str(e)), None
+                    if controller is not None:
+                        controller.observe(item.duration, item.status, not item.success)
+                    if _requeue(scheduler, attempts, job, item, retry_delay):
+                        continue
+                    if extractor is not None and item.response is not None:
+                        # 第二阶段：在进程池中解析 HTML，只取回提取结果
+                        payload = _response_payload(item.response)
+                        extracting[extractor.submit(pick_content, *payload, pick)] = item
+                        continue
+                _release_body(item, store, keep_response)
+                if stats is not None:
+                    stats.record(item)
+                if cp is not None:
+                    cp.record(item)
+                if bar is not None:
+                    if controller is not None:
+                        bar.set_postfix(limit=controller.current, refresh=False)
+                    bar.update(1)
+                yield item
+    finally:
+        # 提前结束迭代时，取消尚未开始的任务
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=True)
+        if extractor is not None:
+            extractor.shutdown(wait=True, cancel_futures=True)
+        _close_source(source, url_iter, cp, owned_cp)
+        if bar is not None:
+            bar.close()
+        if stats is not None:
+            stats.finish()
 
 
 def batch(
-    urls: Union[List[str], str],
+    urls: Union[Iterable[str], str],
     pick: Dict[str, Any] = None,
     concurrency: int = 5,
     delay: float = 0.0,
-    retry: int = 0,
+    retry: Union[int, RetryPolicy] = 0,
     timeout: float = 30.0,
     cf_proxies: str = None,
     token: str = None,
@@ -213,13 +746,16 @@ def batch(
     批量请求多个 URL
     
     Args:
-        urls: URL 列表或文件路径
-        pick: 数据提取规则（字典），如 {"title": "h1", "price": ".price"}
+        urls: URL 列表（或任意可迭代对象）或文件路径
+        pick: 数据提取规则（字典，如 {"title": "h1", "price": ".price"}）
+              或 compile_rules() 编译后的 ExtractionPlan；字典规则会自动编译一次
         concurrency: 并发数
-        delay: 请求间隔（秒）
-        retry: 失败重试次数
+        delay: 全局请求间隔（秒，两次请求开始之间）
+        retry: 失败重试次数，或 cfspider.RetryPolicy（可重试的状态码 / 异常、
+               退避、重试预算、换节点）；整数 N 等价于 RetryPolicy(max_retries=N)
         timeout: 超时时间（秒）
-        cf_proxies: Cloudflare Workers 代理地址
+        cf_proxies: Cloudflare Workers 代理地址；也可以是多个地址 / WorkersManager
+                    组成的列表，请求按延迟和错误率加权分配（参见 cfspider.get_balancer）
         token: 保留参数（当前未使用）
         impersonate: TLS 指纹模拟
         stealth: 是否启用隐身模式
@@ -228,10 +764,23 @@ def batch(
         on_success: 成功回调函数 (url, response, data) -> None
         on_error: 错误回调函数 (url, error) -> None
         progress: 是否显示进度条
-        **kwargs: 传递给 cfspider.get 的其他参数
+        **kwargs: 传递给 cfspider.get 的其他参数，以及 batch_iter() 的
+                  prefetch、store_bodies、body_file、checkpoint、resume、
+                  host_rate、host_burst、host_concurrency、host_limits（按站点限速）、
+                  adaptive、min_concurrency、max_concurrency（自适应并发）、
+                  extract_workers（在进程池中执行 pick）、dedup（跳过重复 URL）、
+                  stats（BatchStats 对象，默认自动创建）
         
     Returns:
-        BatchResult 对象
+        BatchResult 对象（使用 checkpoint 续跑时，也包含之前运行完成的结果，
+        这些结果没有 response）。默认不保留响应正文，需要时传入
+        store_bodies="memory" 或 store_bodies="disk"（用完后调用 results.close()）
+        
+    Note:
+        所有结果都保存在内存中。URL 数量很大时请使用 batch_iter()。
+        传入 checkpoint="run.db" 后，中断的任务再次运行时会跳过已完成的 URL。
+        results.stats 为分阶段耗时直方图（p50 / p90 / p99 / max）、吞吐时间线和
+        按 cf_colo 的统计，可用 results.stats.to_json("stats.json") 导出。
         
     Example:
         >>> results = cfspider.batch(
@@ -242,102 +791,330 @@ def batch(
         ... )
         >>> results.save("output.csv")
     """
-    from . import api
-    
-    # 如果是文件路径，读取 URL 列表
-    if isinstance(urls, str):
-        with open(urls, 'r', encoding='utf-8') as f:
-            urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    checkpoint = kwargs.pop('checkpoint', None)
+    resume = kwargs.pop('resume', True)
+    cp, owned_cp = open_checkpoint(checkpoint, resume) if checkpoint is not None else (None, False)
+    controller = _adaptive_controller(
+        kwargs.pop('adaptive', False), concurrency,
+        kwargs.pop('min_concurrency', 1), kwargs.pop('max_concurrency', None),
+    )
+    store_bodies = kwargs.pop('store_bodies', None)
+    store = _body_store(store_bodies, kwargs.pop('body_file', None))
+    deduper = make_deduper(kwargs.pop('dedup', False))
+    stats = kwargs.pop('stats', None) or BatchStats()
     
     result = BatchResult()
-    lock = threading.Lock()
-    last_request_time = [0.0]  # 用列表以便在闭包中修改
-    
-    def process_url(url: str) -> BatchItem:
-        """处理单个 URL"""
-        # 应用请求延迟
-        if delay > 0:
-            with lock:
-                elapsed = time.time() - last_request_time[0]
-                if elapsed < delay:
-                    time.sleep(delay - elapsed)
-                last_request_time[0] = time.time()
-        
+    result.bodies = store
+    result.stats = stats
+    try:
+        for item in batch_iter(
+            urls, pick=pick, concurrency=concurrency, delay=delay, retry=retry,
+            timeout=timeout, cf_proxies=cf_proxies, token=token, impersonate=impersonate,
+            stealth=stealth, stealth_browser=stealth_browser, headers=headers,
+            on_success=on_success, on_error=on_error, progress=progress,
+            checkpoint=cp, adaptive=controller, store_bodies=store or store_bodies,
+            dedup=deduper, stats=stats, **kwargs
+        ):
+            result.append(item)
+        if cp is not None:
+            _merge_checkpoint(result, cp)
+        if controller is not None:
+            result.concurrency = controller.stats()
+        if deduper is not None:
+            result.duplicates = deduper.skipped
+    finally:
+        if owned_cp:
+            cp.close()
+    return result
+
+
+async def abatch_iter(
+    urls: Union[Iterable[str], str],
+    pick: Dict[str, Any] = None,
+    concurrency: int = 10,
+    delay: float = 0.0,
+    retry: Union[int, RetryPolicy] = 0,
+    timeout: float = 30.0,
+    cf_proxies: str = None,
+    token: str = None,
+    impersonate: str = None,
+    stealth: bool = False,
+    stealth_browser: str = None,
+    headers: Dict[str, str] = None,
+    on_success: Callable = None,
+    on_error: Callable = None,
+    progress: bool = False,
+    prefetch: int = DEFAULT_PREFETCH,
+    keep_response: bool = False,
+    store_bodies=None,
+    body_file: str = None,
+    checkpoint=None,
+    resume: bool = True,
+    host_rate: float = None,
+    host_burst: float = 1,
+    host_concurrency: int = None,
+    host_limits: Dict[str, Dict[str, Any]] = None,
+    adaptive=False,
+    min_concurrency: int = 1,
+    max_concurrency: int = None,
+    extract_workers=None,
+    dedup=False,
+    stats: BatchStats = None,
+    stream_pick: bool = False,
+    **kwargs
+) -> AsyncIterator[BatchItem]:
+    """
+    异步流式批量请求，按完成顺序逐个产出结果
+    
+    参数与 batch_iter() 相同；urls 还可以是异步可迭代对象。
+    异步请求基于 httpx，不支持 impersonate（会被忽略）。
+    
+    stream_pick=True 时边下载边执行 pick，所有字段确定后中止下载
+    （参见 extract.StreamExtraction）；不保留响应和正文（keep_response、
+    store_bodies 无效），size 为实际读取的字节数，不能与 extract_workers 同时使用。
+    
+    Example:
+        >>> async for item in cfspider.abatch_iter("urls.txt", pick={"title": "h1"},
+        ...                                        concurrency=50):
+        ...     print(item.url, item.data)
+    """
+    import asyncio
+    from . import async_api
+    
+    # httpx 不支持 impersonate；隐身模式直接合并浏览器请求头
+    request_headers = headers
+    if stealth:
+        from .stealth import get_stealth_headers
+        request_headers = get_stealth_headers(stealth_browser or 'chrome', headers)
+    
+    policy = RetryPolicy.from_retry(retry)
+    budget = policy.new_budget() if policy else None
+    # 规则只编译一次，每个页面只执行查询（进程池中每个子进程各编译一次）
+    pick = compile_rules(pick) if pick else None
+    stream_pick = bool(stream_pick and pick)
+    if stream_pick and extract_workers:
+        raise ValueError("stream_pick 不能与 extract_workers 同时使用")
+    extractor = _extraction_pool(extract_workers, pick)
+    store = _body_store(store_bodies, body_file)
+    keep_response = keep_response or store_bodies == "memory"
+    extensions = kwargs.pop('extensions', None)
+    
+    async def process_url(url: str, failures: int = 0):
+        """处理单个 URL（单次尝试，返回值与 batch_iter 中相同）"""
         start_time = time.time()
         item = BatchItem(url=url)
+        tracer = PhaseTracer()
+        proxies = _attempt_proxies(policy, failures, cf_proxies)
         
-        for attempt in range(retry + 1):
-            try:
-                response = api.get(
-                    url,
-                    cf_proxies=cf_proxies,
-                    token=token,
-                    impersonate=impersonate,
-                    stealth=stealth,
-                    stealth_browser=stealth_browser,
-                    headers=headers,
-                    timeout=timeout,
-                    **kwargs
-                )
-                
-                item.response = response
-                item.duration = time.time() - start_time
-                
-                # 数据提取
-                if pick:
-                    item.data = response.pick(**pick)
-                
-                # 成功回调
-                if on_success:
-                    on_success(url, response, item.data)
-                
-                return item
-                
-            except Exception as e:
-                if attempt < retry:
-                    time.sleep(1)  # 重试前等待
-                    continue
-                
-                item.error = str(e)
-                item.duration = time.time() - start_time
-                
-                # 错误回调
-                if on_error:
-                    on_error(url, e)
-                
-                return item
+        request_kwargs = dict(
+            cf_proxies=proxies,
+            token=token,
+            headers=request_headers,
+            timeout=timeout,
+            extensions=_trace_extensions(extensions, tracer),
+            **_attempt_kwargs(kwargs, proxies, cf_proxies)
+        )
         
-        return item
+        try:
+            if stream_pick:
+                return await stream_url(url, failures, item, tracer, start_time, request_kwargs)
+            
+            response = await async_api.aget(url, **request_kwargs)
+            item.status = getattr(response, 'status_code', None)
+            item.duration = time.time() - start_time
+            item.timings = tracer.timings or None
+            item.colo = getattr(response, 'cf_colo', None)
+            
+            if policy is not None and policy.should_retry(failures + 1, budget, response=response):
+                return item, policy.backoff(failures + 1, response)
+            
+            item.response = response
+            if extractor is not None:
+                # 数据提取和成功回调在进程池阶段完成
+                return item, None
+            
+            # 数据提取
+            if pick:
+                item.data = pick.run(response)
+            
+            # 成功回调
+            if on_success:
+                on_success(url, response, item.data)
+            
+            return item, None
+            
+        except Exception as e:
+            item.response = None
+            item.error = str(e)
+            item.duration = time.time() - start_time
+            
+            if (item.status is None and policy is not None
+                    and policy.should_retry(failures + 1, budget, error=e)):
+                return item, policy.backoff(failures + 1)
+            
+            # 错误回调
+            if on_error:
+                on_error(url, e)
+            
+            return item, None
     
-    # 使用线程池并发请求
-    tqdm = _get_tqdm()
+    async def stream_url(url, failures, item, tracer, start_time, request_kwargs):
+        """stream_pick 模式：边下载边提取，字段确定后中止下载"""
+        async with async_api.astream("GET", url, **request_kwargs) as response:
+            item.status = response.status_code
+            item.colo = response.cf_colo
+            if policy is not None and policy.should_retry(failures + 1, budget, response=response):
+                item.duration = time.time() - start_time
+                return item, policy.backoff(failures + 1, response)
+            item.data, item.size = await async_api._stream_pick(response, pick)
+        item.data.url = url
+        item.duration = time.time() - start_time
+        item.timings = tracer.timings or None
+        
+        if on_success:
+            on_success(url, response, item.data)
+        return item, None
     
-    with ThreadPoolExecutor(max_workers=concurrency) as executor:
-        futures = {executor.submit(process_url, url): url for url in urls}
+    # URL 来源：异步可迭代对象、普通可迭代对象或文件
+    deduper = make_deduper(dedup)
+    if hasattr(urls, '__aiter__'):
+        async_urls = urls.__aiter__()
+        url_iter = unique = None
         
-        if progress and tqdm:
-            # 使用 tqdm 显示进度
-            iterator = tqdm(as_completed(futures), total=len(urls), desc="Fetching")
-        else:
-            iterator = as_completed(futures)
+        async def next_url():
+            while True:
+                try:
+                    url = await async_urls.__anext__()
+                except StopAsyncIteration:
+                    return None
+                if deduper is None or not deduper.seen(url):
+                    return url
+    else:
+        url_iter = _iter_urls(urls)
+        unique = deduper.filter(url_iter) if deduper is not None else url_iter
         
-        for future in iterator:
-            try:
-                item = future.result()
-                result.append(item)
-            except Exception as e:
-                url = futures[future]
-                result.append(BatchItem(url=url, error=str(e)))
+        async def next_url():
+            return next(source, None)
     
-    return result
+    cp, owned_cp = open_checkpoint(checkpoint, resume) if checkpoint is not None else (None, False)
+    if cp is not None and resume:
+        if url_iter is None:
+            # 异步来源逐个检查
+            raw_next_url = next_url
+            
+            async def next_url():
+                while True:
+                    url = await raw_next_url()
+                    if url is None or not cp.is_done(url):
+                        return url
+                    cp.skip(url)
+            source = None
+        else:
+            source = cp.pending(unique)
+    else:
+        source = unique
+    
+    controller = _adaptive_controller(adaptive, concurrency, min_concurrency, max_concurrency)
+    workers = controller.max_limit if controller else concurrency
+    tqdm = _get_tqdm()
+    bar = tqdm(total=_total(urls), desc="Fetching") if progress and tqdm else None
+    max_in_flight = max(1, workers * prefetch)
+    scheduler = HostScheduler(rate=host_rate, burst=host_burst, concurrency=host_concurrency,
+                              host_limits=host_limits, delay=delay)
+    running = {}
+    extracting = {}  # 提取中的 future -> BatchItem
+    attempts = {}  # 等待重试的任务序号 -> (已失败次数, 首次开始时间)
+    jobs = count()
+    exhausted = False
+    loop = asyncio.get_running_loop()
+    
+    try:
+        while True:
+            # 补充排队 URL，排队 + 运行中的任务不超过在途上限
+            while (not exhausted
+                   and len(scheduler) + len(running) + len(extracting) < max_in_flight):
+                url = await next_url()
+                if url is None:
+                    exhausted = True
+                    break
+                scheduler.push(url, task=(next(jobs), url))
+            
+            # 按 host 轮询派发
+            wait_time = None
+            limit = controller.current if controller else concurrency
+            while len(running) < limit:
+                job, wait_time = scheduler.pop()
+                if job is None:
+                    break
+                failures = attempts[job[0]][0] if job[0] in attempts else 0
+                running[asyncio.ensure_future(process_url(job[1], failures))] = job
+            
+            if not running and not extracting:
+                if exhausted and not len(scheduler):
+                    break
+                # 所有排队的 host 都在等令牌
+                await asyncio.sleep(wait_time or 0)
+                continue
+            
+            done, _ = await asyncio.wait(running.keys() | extracting.keys(), timeout=wait_time,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task in extracting:
+                    item = extracting.pop(task)
+                    error = task.exception()
+                    _finish_extraction(item, None if error else task.result(), error,
+                                       on_success, on_error)
+                else:
+                    job = running.pop(task)
+                    url = job[1]
+                    scheduler.release(url)
+                    try:
+                        item, retry_delay = task.result()
+                    except Exception as e:
+                        item, retry_delay = BatchItem(url=url, error=str(e)), None
+                    if controller is not None:
+                        controller.observe(item.duration, item.status, not item.success)
+                    if _requeue(scheduler, attempts, job, item, retry_delay):
+                        continue
+                    if extractor is not None and item.response is not None:
+                        # 第二阶段：在进程池中解析 HTML，只取回提取结果
+                        payload = _response_payload(item.response)
+                        future = loop.run_in_executor(extractor, pick_content, *payload, pick)
+                        extracting[future] = item
+                        continue
+                _release_body(item, store, keep_response)
+                if stats is not None:
+                    stats.record(item)
+                if cp is not None:
+                    cp.record(item)
+                if bar is not None:
+                    if controller is not None:
+                        bar.set_postfix(limit=controller.current, refresh=False)
+                    bar.update(1)
+                yield item
+    finally:
+        # 提前结束迭代时，取消在途任务
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        if extractor is not None:
+            # 等待提取进程退出可能需要较长时间，放到线程中，不阻塞事件循环
+            await loop.run_in_executor(
+                None, functools.partial(extractor.shutdown, wait=True, cancel_futures=True))
+        _close_source(source, url_iter, cp, owned_cp)
+        if bar is not None:
+            bar.close()
+        if stats is not None:
+            stats.finish()
 
 
 async def abatch(
-    urls: Union[List[str], str],
+    urls: Union[Iterable[str], str],
     pick: Dict[str, Any] = None,
     concurrency: int = 10,
     delay: float = 0.0,
-    retry: int = 0,
+    retry: Union[int, RetryPolicy] = 0,
     timeout: float = 30.0,
     cf_proxies: str = None,
     token: str = None,
@@ -353,7 +1130,8 @@ async def abatch(
     """
     异步批量请求多个 URL
     
-    参数与 batch() 相同，但使用异步方式执行。
+    参数与 batch() 相同（包括 checkpoint、resume），但使用异步方式执行。
+    所有结果都保存在内存中，URL 数量很大时请使用 abatch_iter()。
     
     Example:
         >>> results = await cfspider.abatch(
@@ -362,90 +1140,38 @@ async def abatch(
         ...     concurrency=20
         ... )
     """
-    import asyncio
-    from . import async_api
-    
-    # 如果是文件路径，读取 URL 列表
-    if isinstance(urls, str):
-        with open(urls, 'r', encoding='utf-8') as f:
-            urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    checkpoint = kwargs.pop('checkpoint', None)
+    resume = kwargs.pop('resume', True)
+    cp, owned_cp = open_checkpoint(checkpoint, resume) if checkpoint is not None else (None, False)
+    controller = _adaptive_controller(
+        kwargs.pop('adaptive', False), concurrency,
+        kwargs.pop('min_concurrency', 1), kwargs.pop('max_concurrency', None),
+    )
+    store_bodies = kwargs.pop('store_bodies', None)
+    store = _body_store(store_bodies, kwargs.pop('body_file', None))
+    deduper = make_deduper(kwargs.pop('dedup', False))
+    stats = kwargs.pop('stats', None) or BatchStats()
     
     result = BatchResult()
-    semaphore = asyncio.Semaphore(concurrency)
-    last_request_time = [0.0]
-    
-    async def process_url(url: str) -> BatchItem:
-        """处理单个 URL"""
-        async with semaphore:
-            # 应用请求延迟
-            if delay > 0:
-                elapsed = time.time() - last_request_time[0]
-                if elapsed < delay:
-                    await asyncio.sleep(delay - elapsed)
-                last_request_time[0] = time.time()
-            
-            start_time = time.time()
-            item = BatchItem(url=url)
-            
-            for attempt in range(retry + 1):
-                try:
-                    response = await async_api.aget(
-                        url,
-                        cf_proxies=cf_proxies,
-                        token=token,
-                        impersonate=impersonate,
-                        stealth=stealth,
-                        stealth_browser=stealth_browser,
-                        headers=headers,
-                        timeout=timeout,
-                        **kwargs
-                    )
-                    
-                    item.response = response
-                    item.duration = time.time() - start_time
-                    
-                    # 数据提取
-                    if pick:
-                        item.data = response.pick(**pick)
-                    
-                    # 成功回调
-                    if on_success:
-                        on_success(url, response, item.data)
-                    
-                    return item
-                    
-                except Exception as e:
-                    if attempt < retry:
-                        await asyncio.sleep(1)
-                        continue
-                    
-                    item.error = str(e)
-                    item.duration = time.time() - start_time
-                    
-                    # 错误回调
-                    if on_error:
-                        on_error(url, e)
-                    
-                    return item
-            
-            return item
-    
-    # 并发执行所有请求
-    tqdm = _get_tqdm()
-    tasks = [process_url(url) for url in urls]
-    
-    if progress and tqdm:
-        # 使用 tqdm 显示进度
-        for coro in tqdm(asyncio.as_completed(tasks), total=len(urls), desc="Fetching"):
-            item = await coro
+    result.bodies = store
+    result.stats = stats
+    try:
+        async for item in abatch_iter(
+            urls, pick=pick, concurrency=concurrency, delay=delay, retry=retry,
+            timeout=timeout, cf_proxies=cf_proxies, token=token, impersonate=impersonate,
+            stealth=stealth, stealth_browser=stealth_browser, headers=headers,
+            on_success=on_success, on_error=on_error, progress=progress,
+            checkpoint=cp, adaptive=controller, store_bodies=store or store_bodies,
+            dedup=deduper, stats=stats, **kwargs
+        ):
             result.append(item)
-    else:
-        items = await asyncio.gather(*tasks, return_exceptions=True)
-        for item in items:
-            if isinstance(item, Exception):
-                result.append(BatchItem(url="", error=str(item)))
-            else:
-                result.append(item)
-    
+        if cp is not None:
+            _merge_checkpoint(result, cp)
+        if controller is not None:
+            result.concurrency = controller.stats()
+        if deduper is not None:
+            result.duplicates = deduper.skipped
+    finally:
+        if owned_cp:
+            cp.close()
     return result
-
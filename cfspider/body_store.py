@@ -0,0 +1,138 @@
+"""
+CFspider 响应正文存储
+
+batch(store_bodies="disk") 把每个响应的正文追加写入一个段文件（segment），
+BatchItem 只保存 (偏移, 长度)，读取 item.content 时通过 mmap 按需取出，
+正文不常驻内存：
+- 段文件只追加写入；同名的 .idx 索引文件逐行记录 url、偏移和长度
+- 未指定路径时写入临时文件，close() 时删除
+- 读取时按需重新映射（文件在写入过程中增长）
+
+Example:
+    >>> results = cfspider.batch(urls, store_bodies="disk")
+    >>> html = results[0].content          # 从段文件中读取
+    >>> results.close()                    # 删除临时段文件
+    >>>
+    >>> # 指定路径时保留文件，之后可以重新打开
+    >>> results = cfspider.batch(urls, store_bodies="disk", body_file="bodies.seg")
+    >>> with BodyStore("bodies.seg") as store:
+    ...     for url, content in store.items():
+    ...         ...
+"""
+
+import mmap
+import os
+import tempfile
+import threading
+from typing import Iterator, Optional, Tuple
+
+
+class BodyStore:
+    """追加写入的正文段文件 + 偏移索引"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        初始化存储
+
+        Args:
+            path: 段文件路径（None 时使用临时文件，close() 时删除）；
+                  已存在的段文件会继续追加
+        """
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='cfspider_bodies_', suffix='.seg')
+            os.close(fd)
+            self.temporary = True
+        else:
+            path = os.path.expanduser(path)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.temporary = False
+        self.path = path
+        self.index_path = path + '.idx'
+
+        self._file = open(path, 'ab+')
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+        self._size = self._file.seek(0, os.SEEK_END)
+        self._dirty = False
+        self._map = None
+        self._lock = threading.Lock()
+
+    def append(self, url: str, content: bytes) -> Tuple[int, int]:
+        """
+        追加一个正文
+
+        Returns:
+            (偏移, 长度)
+        """
+        content = content or b''
+        with self._lock:
+            offset = self._size
+            self._file.write(content)
+            self._size += len(content)
+            self._dirty = True
+            self._index.write(f"{offset}\t{len(content)}\t{url}\n")
+        return offset, len(content)
+
+    def read(self, offset: int, length: int) -> bytes:
+        """读取 (偏移, 长度) 对应的正文"""
+        if length == 0:
+            return b''
+        with self._lock:
+            if self._dirty:
+                self._file.flush()
+                self._dirty = False
+            if self._map is None or offset + length > len(self._map):
+                # 文件增长后重新映射
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + length]
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        """按写入顺序遍历 (url, 正文)"""
+        with self._lock:
+            self._index.flush()
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                offset, length, url = line.rstrip('\n').split('\t', 2)
+                yield url, self.read(int(offset), int(length))
+
+    @property
+    def size(self) -> int:
+        """段文件大小（字节）"""
+        return self._size
+
+    def close(self):
+        """关闭文件（临时文件同时删除）"""
+        with self._lock:
+            if self._file is None:
+                return
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
+            self._index.close()
+            self._file = None
+        if self.temporary:
+            for path in (self.path, self.index_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
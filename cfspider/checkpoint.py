@@ -0,0 +1,239 @@
+"""
+CFspider 批量请求检查点
+
+把批量请求每个 URL 的状态、耗时、错误和 pick 提取结果记录到 SQLite，
+任务中断后重新运行时跳过已完成的 URL：
+- WAL 模式 + synchronous=NORMAL，写入不阻塞读取
+- 批量提交：攒够 commit_every 条或距上次提交超过 commit_interval 秒才提交一次，
+  检查点本身不成为吞吐瓶颈
+- 只有成功的 URL 算作已完成，失败的 URL 在下次运行时重试
+
+Example:
+    >>> import cfspider
+    >>> # 第一次运行被中断后，再次运行同一命令会从断点继续
+    >>> results = cfspider.batch("urls.txt", pick={"title": "h1"}, checkpoint="run.db")
+    >>>
+    >>> # 命令行
+    >>> # cfspider batch urls.txt --pick "title:h1" --checkpoint run.db --resume
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Iterator
+
+# 默认批量提交配置
+DEFAULT_COMMIT_EVERY = 500
+DEFAULT_COMMIT_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    url TEXT PRIMARY KEY,
+    success INTEGER NOT NULL,
+    data TEXT,
+    error TEXT,
+    duration REAL,
+    status INTEGER,
+    size INTEGER,
+    finished_at REAL
+)
+"""
+
+# 旧版本检查点缺少的列
+_ADDED_COLUMNS = (("status", "INTEGER"), ("size", "INTEGER"))
+
+
+class BatchCheckpoint:
+    """
+    SQLite 检查点存储
+
+    同一个检查点对象只能在一个线程中使用（batch_iter / abatch_iter 都在
+    消费结果的线程中读写检查点）。
+    """
+
+    def __init__(self, path: str, commit_every: int = DEFAULT_COMMIT_EVERY,
+                 commit_interval: float = DEFAULT_COMMIT_INTERVAL):
+        """
+        初始化检查点
+
+        Args:
+            path: SQLite 数据库文件路径
+            commit_every: 每多少条记录提交一次
+            commit_interval: 最长提交间隔（秒）
+        """
+        self.path = os.path.expanduser(path)
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+
+        self._conn = None
+        self._buffer = []
+        self._last_commit = time.time()
+
+        # 本次运行跳过的已完成 URL（及数量）
+        self.skipped = 0
+        self.skipped_urls = []
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时打开数据库"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(items)")}
+            for name, kind in _ADDED_COLUMNS:
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE items ADD COLUMN {name} {kind}")
+            self._conn.commit()
+        return self._conn
+
+    def reset(self):
+        """清空检查点（重新开始，不跳过任何 URL）"""
+        self._buffer.clear()
+        conn = self._connect()
+        conn.execute("DELETE FROM items")
+        conn.commit()
+
+    def is_done(self, url: str) -> bool:
+        """URL 是否已在之前的运行中成功完成"""
+        row = self._connect().execute(
+            "SELECT 1 FROM items WHERE url = ? AND success = 1", (url,)
+        ).fetchone()
+        return row is not None
+
+    def skip(self, url: str):
+        """记录本次运行跳过的已完成 URL（结束时只合并这些 URL 的旧结果）"""
+        self.skipped += 1
+        self.skipped_urls.append(url)
+    
+    def pending(self, urls) -> Iterator[str]:
+        """过滤掉已完成的 URL（惰性），并记录跳过的 URL"""
+        for url in urls:
+            if self.is_done(url):
+                self.skip(url)
+                continue
+            yield url
+
+    def record(self, item):
+        """
+        记录一个 BatchItem（缓冲，按批提交）
+
+        Args:
+            item: BatchItem
+        """
+        data = None
+        if item.data is not None:
+            data = json.dumps(dict(item.data), ensure_ascii=False, default=str)
+        self._buffer.append((
+            item.url, 1 if item.success else 0, data, item.error,
+            item.duration, item.status, item.size, time.time(),
+        ))
+        if (len(self._buffer) >= self.commit_every
+                or time.time() - self._last_commit >= self.commit_interval):
+            self.flush()
+
+    def flush(self):
+        """提交缓冲中的记录"""
+        self._last_commit = time.time()
+        if not self._buffer:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO items "
+                "(url, success, data, error, duration, status, size, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._buffer,
+            )
+        self._buffer.clear()
+
+    def items(self, urls=None):
+        """
+        读取记录
+
+        Args:
+            urls: 只读取这些 URL 的记录（按给定顺序，没有记录的跳过）；
+                  None 时按完成顺序读取全部记录
+
+        Yields:
+            BatchItem（response 为 None）
+        """
+        from .batch import BatchItem
+
+        self.flush()
+        conn = self._connect()
+        columns = "SELECT url, success, data, error, duration, status, size FROM items"
+        if urls is None:
+            rows = conn.execute(columns + " ORDER BY finished_at")
+        else:
+            rows = (conn.execute(columns + " WHERE url = ?", (url,)).fetchone() for url in urls)
+        for row in rows:
+            if row is None:
+                continue
+            url, success, data, error, duration, status, size = row
+            yield BatchItem(
+                url=url,
+                data=json.loads(data) if data else None,
+                error=error if not success else None,
+                duration=duration or 0.0,
+                status=status,
+                size=size,
+            )
+
+    def stats(self) -> dict:
+        """
+        获取统计信息
+
+        Returns:
+            dict: total、successful、failed、skipped（本次运行跳过数）
+        """
+        self.flush()
+        total, successful = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(success), 0) FROM items"
+        ).fetchone()
+        return {
+            'total': total,
+            'successful': successful,
+            'failed': total - successful,
+            'skipped': self.skipped,
+        }
+
+    def close(self):
+        """提交剩余记录并关闭数据库"""
+        if self._conn is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def open_checkpoint(checkpoint, resume: bool = True):
+    """
+    把 checkpoint 参数转换为 BatchCheckpoint
+
+    Args:
+        checkpoint: 数据库路径或 BatchCheckpoint 对象
+        resume: True 时保留已有记录（跳过已完成 URL），False 时清空重来
+
+    Returns:
+        (BatchCheckpoint, owned)：owned 为 True 表示由调用方负责关闭
+    """
+    if isinstance(checkpoint, BatchCheckpoint):
+        cp, owned = checkpoint, False
+    else:
+        cp, owned = BatchCheckpoint(checkpoint), True
+    if not resume:
+        cp.reset()
+    return cp, owned
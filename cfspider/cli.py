@@ -12,8 +12,10 @@ CFspider 命令行工具
     cfspider get https://example.com
     cfspider post https://api.example.com -d '{"key": "value"}'
     cfspider batch urls.txt --pick "title:h1" -o results.csv
+    cfspider batch urls.txt --checkpoint run.db --resume
 """
 
+import os
 import sys
 import subprocess
 import argparse
@@ -55,7 +57,7 @@ def cmd_get(args):
     try:
         response = api.get(
             args.url,
-            cf_proxies=args.proxy,
+            cf_proxies=_parse_proxies(args.proxy),
             token=args.token,
             impersonate=args.impersonate,
             stealth=args.stealth,
@@ -106,7 +108,7 @@ def cmd_post(args):
     try:
         response = api.post(
             args.url,
-            cf_proxies=args.proxy,
+            cf_proxies=_parse_proxies(args.proxy),
             token=args.token,
             impersonate=args.impersonate,
             stealth=args.stealth,
@@ -139,7 +141,7 @@ def cmd_head(args):
     try:
         response = api.head(
             args.url,
-            cf_proxies=args.proxy,
+            cf_proxies=_parse_proxies(args.proxy),
             token=args.token,
             impersonate=args.impersonate,
             stealth=args.stealth,
@@ -162,12 +164,56 @@ def cmd_head(args):
         sys.exit(1)
 
 
+DEFAULT_CHECKPOINT = 'cfspider_batch.db'
+
+# --coordinator / --worker 未指定 --queue 时使用的队列文件
+DEFAULT_QUEUE = 'cfspider_queue.db'
+
+
+def _parse_pick(rules):
+    """解析 --pick 规则（name:selector 或 name:selector@attr），编译为 ExtractionPlan"""
+    if not rules:
+        return None
+    from .extract import compile_rules
+    pick = {}
+    for rule in rules:
+        if ':' in rule:
+            # 选择器末尾的 @attr 由 compile_rules 拆分（XPath 中的 @ 保持原样）
+            name, selector = rule.split(':', 1)
+            pick[name] = selector
+    return compile_rules(pick)
+
+
+def _batch_options(args):
+    """batch 和 --worker 共用的请求参数"""
+    return dict(
+        concurrency=args.concurrency,
+        delay=args.delay,
+        retry=args.retry,
+        timeout=args.timeout,
+        cf_proxies=_parse_proxies(args.proxy),
+        token=args.token,
+        impersonate=args.impersonate,
+        stealth=args.stealth,
+        adaptive=args.adaptive,
+        max_concurrency=args.max_concurrency,
+        extract_workers=args.extract_workers,
+    )
+
+
 def cmd_batch(args):
     """执行批量请求"""
     from .batch import batch
     
+    pick = _parse_pick(args.pick)
+    if args.worker:
+        return _batch_worker(args, pick)
+    
     # 解析 URL 列表
-    if args.urls:
+    if len(args.urls) == 1 and os.path.isfile(args.urls[0]):
+        # 从文件按行读取（惰性读取，不一次性载入）
+        urls = args.urls[0]
+    elif args.urls:
         # 从命令行参数获取 URL
         urls = args.urls
     else:
@@ -175,70 +221,145 @@ def cmd_batch(args):
         print("错误: 必须提供 URL 列表或文件", file=sys.stderr)
         sys.exit(1)
     
-    # 解析 pick 规则
-    pick = None
-    if args.pick:
-        pick = {}
-        for rule in args.pick:
-            if ':' in rule:
-                name, selector = rule.split(':', 1)
-                # 检查是否有属性指定 (selector@attr)
-                if '@' in selector:
-                    sel, attr = selector.rsplit('@', 1)
-                    pick[name] = (sel, attr)
-                else:
-                    pick[name] = selector
+    if args.coordinator:
+        return _batch_coordinator(args, urls)
+    
+    checkpoint = args.checkpoint
+    if args.resume and not checkpoint:
+        checkpoint = DEFAULT_CHECKPOINT
     
     try:
         results = batch(
             urls=urls,
             pick=pick,
-            concurrency=args.concurrency,
-            delay=args.delay,
-            retry=args.retry,
-            timeout=args.timeout,
-            cf_proxies=args.proxy,
-            token=args.token,
-            impersonate=args.impersonate,
-            stealth=args.stealth,
             progress=not args.quiet,
+            checkpoint=checkpoint,
+            resume=args.resume,
+            dedup=args.dedup,
+            **_batch_options(args)
         )
-        
-        # 输出摘要
+        _output_batch(results, args)
+    except Exception as e:
+        print(f"批量请求失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _output_batch(results, args):
+    """输出批量请求的摘要和结果"""
+    # 输出摘要
+    if not args.quiet:
+        summary = results.summary()
+        print(f"\n完成: {summary['successful']}/{summary['total']} 成功 "
+              f"({summary['success_rate']}), 耗时 {summary['total_duration']}")
+        if 'concurrency_limit' in summary:
+            print(f"自适应并发: 当前 {summary['concurrency_limit']}，"
+                  f"范围 {summary['concurrency_range']}")
+        if summary['skipped']:
+            print(f"从检查点跳过 {summary['skipped']} 个已完成的 URL")
+        if summary['duplicates']:
+            print(f"去重跳过 {summary['duplicates']} 个重复的 URL")
+        if results.stats is not None and results.stats.requests:
+            print(results.stats.format())
+    
+    # 导出指标
+    if args.stats and results.stats is not None:
+        results.stats.to_json(args.stats)
         if not args.quiet:
-            summary = results.summary()
-            print(f"\n完成: {summary['successful']}/{summary['total']} 成功 "
-                  f"({summary['success_rate']}), 耗时 {summary['total_duration']}")
-        
-        # 保存结果
-        if args.output:
-            filepath = results.save(args.output)
+            print(f"指标已保存到: {args.stats}")
+    
+    # 保存结果
+    if args.output:
+        filepath = results.save(args.output)
+        if not args.quiet:
+            print(f"结果已保存到: {filepath}")
+    else:
+        # 输出到标准输出
+        print(json.dumps(results.to_list(), ensure_ascii=False, indent=2))
+
+
+def _batch_coordinator(args, urls):
+    """--coordinator：把 URL 写入队列，等待 worker 完成后输出合并的结果"""
+    from .batch import _get_tqdm
+    from .dedup import URLDeduper
+    from .distributed import WorkQueue, QueueServer, DEFAULT_PORT
+    
+    queue_path = args.queue or DEFAULT_QUEUE
+    server = None
+    try:
+        with WorkQueue(queue_path, lease_ttl=args.lease_ttl) as queue:
+            if args.dedup:
+                from .batch import _iter_urls
+                urls = URLDeduper().filter(_iter_urls(urls))
+            added = queue.add(urls)
+            address = queue.path
+            if args.listen:
+                host, _, port = args.listen.rpartition(':')
+                server = QueueServer(queue, host or '0.0.0.0', int(port or DEFAULT_PORT),
+                                     token=args.queue_token).start()
+                address = server.address
+            
+            stats = queue.stats()
+            bar = None
             if not args.quiet:
-                print(f"结果已保存到: {filepath}")
-        else:
-            # 输出到标准输出
-            print(json.dumps(results.to_list(), ensure_ascii=False, indent=2))
-        
+                print(f"队列 {queue.path}: 新增 {added} 个 URL，共 {stats['total']} 个，"
+                      f"已完成 {stats['done']} 个", file=sys.stderr)
+                print(f"启动 worker: cfspider batch --worker --queue {address}", file=sys.stderr)
+                tqdm = _get_tqdm()
+                bar = tqdm(total=stats['total'], initial=stats['done'], desc="Fetching") if tqdm else None
+            
+            def report(stats):
+                if bar is not None:
+                    bar.update(stats['done'] - bar.n)
+                    bar.set_postfix(workers=stats['workers'], refresh=False)
+            
+            try:
+                queue.wait(callback=report)
+            finally:
+                if bar is not None:
+                    bar.close()
+            results = queue.result()
+        _output_batch(results, args)
     except Exception as e:
         print(f"批量请求失败: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if server is not None:
+            server.stop()
+
+
+def _batch_worker(args, pick):
+    """--worker：从队列领取 URL 并提交结果，直到队列完成"""
+    from .distributed import run_worker
+    
+    queue = args.queue or DEFAULT_QUEUE
+    try:
+        counts = run_worker(
+            queue, pick=pick, queue_token=args.queue_token, lease_ttl=args.lease_ttl,
+            progress=not args.quiet, **_batch_options(args)
+        )
+    except KeyboardInterrupt:
+        print("\n已中断，未完成的租约已归还队列", file=sys.stderr)
+        sys.exit(130)
+    except Exception as e:
+        print(f"worker 失败: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not args.quiet:
+        print(f"\nworker {counts['worker']} 完成: 处理 {counts['processed']} 个 URL，"
+              f"成功 {counts['successful']}，失败 {counts['failed']}")
+
+
+def _parse_proxies(value):
+    """--proxy 参数：逗号分隔多个 Workers 地址时返回列表（负载均衡）"""
+    if value and ',' in value:
+        return [p.strip() for p in value.split(',') if p.strip()]
+    return value
 
 
 def _output_response(response, args):
     """输出响应结果"""
     # 数据提取
     if args.pick:
-        pick = {}
-        for rule in args.pick:
-            if ':' in rule:
-                name, selector = rule.split(':', 1)
-                if '@' in selector:
-                    sel, attr = selector.rsplit('@', 1)
-                    pick[name] = (sel, attr)
-                else:
-                    pick[name] = selector
-        
-        data = response.pick(**pick)
+        data = _parse_pick(args.pick).run(response)
         
         if args.output:
             data.save(args.output)
@@ -331,7 +452,7 @@ def main():
         p.add_argument('-H', '--header', action='append', metavar='HEADER',
                        help='请求头 (如 "User-Agent: Mozilla/5.0")')
         p.add_argument('--proxy', metavar='URL',
-                       help='Workers 代理地址')
+                       help='Workers 代理地址（多个地址用逗号分隔，自动负载均衡）')
         p.add_argument('--token', metavar='TOKEN',
                        help='鉴权 token')
         p.add_argument('--impersonate', metavar='BROWSER',
@@ -379,6 +500,33 @@ def main():
                               help='失败重试次数')
     batch_parser.add_argument('-q', '--quiet', action='store_true',
                               help='安静模式，不显示进度')
+    batch_parser.add_argument('--adaptive', action='store_true',
+                              help='根据延迟和 429/错误比例自动调整并发 (AIMD)')
+    batch_parser.add_argument('--max-concurrency', type=int, default=None,
+                              help='自适应并发的上限 (默认 并发数 x 4)')
+    batch_parser.add_argument('--dedup', action='store_true',
+                              help='跳过重复 URL（忽略 #片段、跟踪参数和查询参数顺序）')
+    batch_parser.add_argument('--extract-workers', type=int, default=None, metavar='N',
+                              help='在 N 个进程中执行 --pick 提取（多核解析，不阻塞请求线程）')
+    batch_parser.add_argument('--stats', metavar='FILE',
+                              help='导出分阶段耗时分布、吞吐和按节点统计 (JSON)')
+    batch_parser.add_argument('--coordinator', action='store_true',
+                              help='分布式模式：把 URL 写入 --queue 队列，等待 worker 完成后输出合并结果')
+    batch_parser.add_argument('--worker', action='store_true',
+                              help='分布式模式：从 --queue 领取 URL 并提交结果（可在多台机器上运行多个）')
+    batch_parser.add_argument('--queue', metavar='FILE|HOST:PORT',
+                              help=f'队列文件或协调者地址 (默认 {DEFAULT_QUEUE})')
+    batch_parser.add_argument('--listen', metavar='HOST:PORT',
+                              help='协调者监听 TCP 地址，供其他机器上的 worker 连接')
+    batch_parser.add_argument('--queue-token', metavar='TOKEN',
+                              help='协调者访问令牌（协调者和 worker 需一致）')
+    batch_parser.add_argument('--lease-ttl', type=float, default=60, metavar='SECONDS',
+                              help='租约时长，worker 崩溃后其 URL 在此时间后重新分配 (默认 60)')
+    batch_parser.add_argument('--checkpoint', metavar='FILE',
+                              help='SQLite 检查点文件，记录每个 URL 的进度')
+    batch_parser.add_argument('--resume', action='store_true',
+                              help=f'从检查点继续，跳过已完成的 URL '
+                                   f'(未指定 --checkpoint 时使用 {DEFAULT_CHECKPOINT})')
     add_common_args(batch_parser)
     
     # ===== vpn 命令 =====
@@ -462,6 +610,7 @@ CFspider - Cloudflare 代理 IP 池
     cfspider get https://httpbin.org/ip
     cfspider get https://example.com --pick "title:h1" -o data.json
     cfspider batch url1 url2 url3 --pick "title:h1" -o results.csv
+    cfspider batch urls.txt --checkpoint run.db --resume
     cfspider vpn start --workers-url https://your.workers.dev
 
 更多信息请访问: https://www.cfspider.com
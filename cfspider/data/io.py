@@ -22,8 +22,9 @@ def read(source: Any, pick: Dict[str, str] = None, **options) -> DataFrame:
             - 字典列表: [{"a": 1}, {"a": 2}]
             - pandas DataFrame
             - polars DataFrame
-        pick: 爬取时的数据提取规则
+        pick: 爬取时的数据提取规则（字典或 cfspider.compile_rules() 编译后的规则）
         **options: 其他选项
+            - dedup: URL 列表爬取时跳过重复 URL（True 或 URLDeduper 参数字典）
     
     Returns:
         DataFrame
@@ -234,19 +235,9 @@ def _read_url(url: str, pick: Dict[str, str] = None, **options) -> DataFrame:
             return DataFrame([{"url": url, "content": response.text}])
     
     # 使用提取规则
+    from ..extract import compile_rules
     row = {"url": url}
-    for name, selector in pick.items():
-        try:
-            if hasattr(response, "find"):
-                row[name] = response.find(selector)
-            else:
-                # 简单的 CSS 选择器支持
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, "html.parser")
-                elem = soup.select_one(selector)
-                row[name] = elem.get_text(strip=True) if elem else None
-        except:
-            row[name] = None
+    row.update(compile_rules(pick).run(response))
     
     return DataFrame([row])
 
@@ -264,6 +255,20 @@ def _read_urls(urls: List[str], pick: Dict[str, str] = None, **options) -> DataF
     concurrency = options.pop("concurrency", 5)
     delay = options.pop("delay", 0)
     progress = options.pop("progress", True)
+    dedup = options.pop("dedup", False)
+    
+    # 去重：规范化后用 Bloom 过滤器判重（参见 cfspider.dedup）
+    if dedup:
+        from ..dedup import make_deduper
+        deduper = make_deduper(dedup)
+        urls = list(deduper.filter(urls))
+        if progress and deduper.skipped:
+            print(f"跳过 {deduper.skipped} 个重复 URL")
+    
+    # 提取规则只编译一次
+    if pick:
+        from ..extract import compile_rules
+        pick = compile_rules(pick)
     
     results = []
     
@@ -292,17 +297,7 @@ def _read_urls(urls: List[str], pick: Dict[str, str] = None, **options) -> DataF
                     results.append({"url": url, "content": response.text})
             else:
                 row = {"url": url}
-                for name, selector in pick.items():
-                    try:
-                        if hasattr(response, "find"):
-                            row[name] = response.find(selector)
-                        else:
-                            from bs4 import BeautifulSoup
-                            soup = BeautifulSoup(response.text, "html.parser")
-                            elem = soup.select_one(selector)
-                            row[name] = elem.get_text(strip=True) if elem else None
-                    except:
-                        row[name] = None
+                row.update(pick.run(response))
                 results.append(row)
                 
         except Exception as e:
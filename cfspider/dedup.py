@@ -0,0 +1,311 @@
+"""
+CFspider URL 去重
+
+batch / abatch / cfspider.read 的 URL 去重阶段：
+- URL 规范化：协议和域名小写、去掉默认端口、去掉 #片段、去掉跟踪参数
+  （utm_*、gclid、fbclid 等）、查询参数排序，写法不同的同一页面只请求一次
+- Bloom 过滤器判重：按目标误判率计算位数和哈希次数，
+  误判率 0.1% 时每个 URL 约 1.8 字节，千万级 URL 也只需几十 MB
+- 容量不足时自动追加一层两倍容量、误判率减半的过滤器（scalable Bloom filter），
+  总误判率不超过设定值的两倍
+- 可以把位数组放到 mmap 文件中（path），不占用进程堆内存；文件在打开时清空，
+  只用于本次运行，不在多次运行之间共享
+
+误判（把新 URL 当成重复）的概率等于 error_rate，不会漏判重复。
+
+Example:
+    >>> import cfspider
+    >>> results = cfspider.batch(urls, dedup=True)
+    >>> print(results.summary()["duplicates"])
+    >>>
+    >>> # 千万级 URL：预估容量、指定误判率，位数组放到文件中
+    >>> dedup = cfspider.URLDeduper(capacity=50_000_000, error_rate=0.001, path="seen.bloom")
+    >>> for item in cfspider.batch_iter("urls.txt", dedup=dedup):
+    ...     ...
+"""
+
+import hashlib
+import math
+import mmap
+import os
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+# 默认去掉的跟踪参数（精确匹配，小写）
+DEFAULT_TRACKING_PARAMS = frozenset({
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'spm',
+})
+
+# 默认去掉的跟踪参数前缀
+DEFAULT_TRACKING_PREFIXES = ('utm_',)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str, strip_params: Iterable[str] = DEFAULT_TRACKING_PARAMS,
+                     strip_prefixes: Iterable[str] = DEFAULT_TRACKING_PREFIXES) -> str:
+    """
+    URL 规范化（用于判重，不用于请求）
+
+    查询参数按原始（未解码）形式排序和比较，处理速度约每秒数十万个 URL。
+
+    Args:
+        url: URL
+        strip_params: 要去掉的查询参数名（小写）
+        strip_prefixes: 要去掉的查询参数名前缀（小写）
+
+    Returns:
+        规范化后的 URL；无法解析时原样返回
+
+    Example:
+        >>> canonicalize_url("HTTPS://Example.com:443/a?b=2&a=1&utm_source=x#top")
+        'https://example.com/a?a=1&b=2'
+    """
+    url = url.strip()
+    try:
+        scheme, netloc, path, query, _ = urlsplit(url)
+    except ValueError:
+        return url
+    if not scheme or not netloc:
+        return url
+    scheme = scheme.lower()
+
+    # 用户信息区分大小写，只把 host:port 转为小写
+    userinfo, at, hostport = netloc.rpartition('@')
+    hostport = hostport.lower()
+    default_port = _DEFAULT_PORTS.get(scheme)
+    if default_port and hostport.endswith(f':{default_port}'):
+        hostport = hostport[:-len(str(default_port)) - 1]
+    hostport = hostport.rstrip(':')
+    if hostport.endswith('.'):
+        hostport = hostport[:-1]
+
+    if query:
+        if not isinstance(strip_params, frozenset):
+            strip_params = frozenset(strip_params)
+        strip_prefixes = tuple(strip_prefixes)
+        pairs = []
+        for pair in query.split('&'):
+            if not pair:
+                continue
+            name = pair.split('=', 1)[0].lower()
+            if name in strip_params or (strip_prefixes and name.startswith(strip_prefixes)):
+                continue
+            pairs.append(pair)
+        pairs.sort()
+        query = '&'.join(pairs)
+
+    canonical = f"{scheme}://{userinfo}{at}{hostport}{path or '/'}"
+    return f"{canonical}?{query}" if query else canonical
+
+
+class _BloomSlice:
+    """单层 Bloom 过滤器（固定容量）"""
+
+    __slots__ = ('capacity', 'bits', 'hashes', 'count', '_array', '_file')
+
+    def __init__(self, capacity: int, error_rate: float, path: Optional[str] = None):
+        self.capacity = capacity
+        # m = -n ln(p) / (ln 2)^2，k = m / n * ln 2
+        self.bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.bits / capacity * math.log(2))))
+        self.count = 0
+        size = (self.bits + 7) // 8
+        if path is None:
+            self._file = None
+            self._array = bytearray(size)
+        else:
+            # mmap 文件：打开时清空（count 从 0 开始，不能沿用旧的位）
+            self._file = open(path, 'w+b')
+            self._file.truncate(size)
+            self._array = mmap.mmap(self._file.fileno(), size)
+
+    # 双重哈希：第 i 个位置 = (h1 + i * h2) mod bits
+    def contains(self, h1: int, h2: int) -> bool:
+        array, bits = self._array, self.bits
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % bits
+            if not array[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, h1: int, h2: int):
+        array, bits = self._array, self.bits
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % bits
+            array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+    def close(self):
+        if self._file is not None:
+            self._array.flush()
+            self._array.close()
+            self._file.close()
+            self._file = None
+
+
+class BloomFilter:
+    """
+    可扩容的 Bloom 过滤器
+
+    首层按 capacity 和 error_rate 分配；写满后追加容量翻倍、误判率减半的新层，
+    总误判率不超过 error_rate * 2。
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001,
+                 path: Optional[str] = None):
+        """
+        初始化过滤器
+
+        Args:
+            capacity: 预估元素数（超过后自动扩容）
+            error_rate: 目标误判率（0 < error_rate < 1）
+            path: 位数组文件路径（可选，使用 mmap，打开时清空）；扩容的层写入 path.1、path.2 ...
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate 必须在 0 和 1 之间")
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.path = os.path.expanduser(path) if path else None
+        self._slices = []
+        self._add_slice()
+
+    def _add_slice(self):
+        n = len(self._slices)
+        path = None
+        if self.path:
+            path = self.path if n == 0 else f'{self.path}.{n}'
+        # 第 n 层：容量 capacity * 2^n，误判率 error_rate / 2^n，各层之和 < error_rate * 2
+        rate = self.error_rate / (2 ** n)
+        self._slices.append(_BloomSlice(self.capacity * (2 ** n), rate, path))
+
+    @staticmethod
+    def _hash(key: str):
+        digest = hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def __contains__(self, key: str) -> bool:
+        h1, h2 = self._hash(key)
+        return any(s.contains(h1, h2) for s in self._slices)
+
+    def add(self, key: str) -> bool:
+        """
+        添加元素
+
+        Returns:
+            True 表示新元素；False 表示（可能）已存在
+        """
+        h1, h2 = self._hash(key)
+        for s in self._slices:
+            if s.contains(h1, h2):
+                return False
+        current = self._slices[-1]
+        if current.count >= current.capacity:
+            self._add_slice()
+            current = self._slices[-1]
+        current.add(h1, h2)
+        return True
+
+    def __len__(self):
+        """已添加的元素数"""
+        return sum(s.count for s in self._slices)
+
+    @property
+    def nbytes(self) -> int:
+        """位数组占用的字节数"""
+        return sum(s.nbytes for s in self._slices)
+
+    def close(self):
+        """同步并关闭 mmap 文件"""
+        for s in self._slices:
+            s.close()
+
+
+class URLDeduper:
+    """
+    URL 去重器：规范化 + Bloom 过滤器
+
+    Example:
+        >>> dedup = URLDeduper(error_rate=0.0001)
+        >>> list(dedup.filter(["https://a.com/?x=1&y=2", "https://A.com/?y=2&x=1#f"]))
+        ['https://a.com/?x=1&y=2']
+        >>> dedup.skipped
+        1
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001,
+                 path: Optional[str] = None, canonicalize: bool = True,
+                 strip_params: Iterable[str] = DEFAULT_TRACKING_PARAMS):
+        """
+        初始化去重器
+
+        Args:
+            capacity: 预估 URL 数（超过后自动扩容）
+            error_rate: 误判率（新 URL 被误当成重复而跳过的概率）
+            path: Bloom 位数组的 mmap 文件路径（可选，打开时清空）
+            canonicalize: 是否先规范化 URL
+            strip_params: 规范化时去掉的查询参数
+        """
+        self.bloom = BloomFilter(capacity, error_rate, path)
+        self.canonicalize = canonicalize
+        self.strip_params = frozenset(p.lower() for p in strip_params)
+        self.skipped = 0
+
+    def key(self, url: str) -> str:
+        """URL 的判重键"""
+        if self.canonicalize:
+            return canonicalize_url(url, self.strip_params)
+        return url
+
+    def seen(self, url: str) -> bool:
+        """URL 是否出现过（同时记录该 URL）"""
+        if self.bloom.add(self.key(url)):
+            return False
+        self.skipped += 1
+        return True
+
+    def filter(self, urls: Iterable[str]) -> Iterator[str]:
+        """过滤掉重复的 URL（惰性），产出原始 URL"""
+        for url in urls:
+            if not self.seen(url):
+                yield url
+
+    def stats(self) -> dict:
+        """
+        获取统计信息
+
+        Returns:
+            dict: unique、skipped、bytes（Bloom 位数组大小）、bytes_per_url
+        """
+        unique = len(self.bloom)
+        return {
+            'unique': unique,
+            'skipped': self.skipped,
+            'bytes': self.bloom.nbytes,
+            'bytes_per_url': round(self.bloom.nbytes / unique, 2) if unique else None,
+        }
+
+    def close(self):
+        """关闭 mmap 文件"""
+        self.bloom.close()
+
+
+def make_deduper(dedup) -> Optional[URLDeduper]:
+    """
+    把 dedup 参数转换为 URLDeduper
+
+    Args:
+        dedup: True、URLDeduper 对象、参数字典（如 {"error_rate": 0.0001}）或 False/None
+    """
+    if isinstance(dedup, URLDeduper):
+        return dedup
+    if isinstance(dedup, dict):
+        return URLDeduper(**dedup)
+    if dedup:
+        return URLDeduper()
+    return None
@@ -0,0 +1,210 @@
+"""
+CFspider Workers 发现缓存
+
+缓存 Workers 类型检测（/health、/proxy 探测）和配置发现（/api/config、/api/uuid、
+首页 UUID）的结果，避免每个请求前额外 2~5 次往返：
+- 按 Workers host 缓存，带 TTL；探测失败的结果只缓存较短时间
+- 单飞（single-flight）：同一 host 同一项同时只有一个线程在探测，其余线程等待结果
+- 可选的磁盘缓存，新进程启动时直接复用
+
+Example:
+    >>> import cfspider
+    >>> # 启用磁盘缓存，配置缓存 1 小时
+    >>> cfspider.configure_discovery_cache(ttl=3600, path="~/.cfspider/discovery.json")
+    >>> cfspider.clear_discovery_cache()
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+# 默认缓存时间（秒）
+DEFAULT_TTL = 600
+
+# 探测失败 / 结果不确定时的缓存时间（秒）
+DEFAULT_NEGATIVE_TTL = 60
+
+
+class DiscoveryCache:
+    """
+    按 Workers host 缓存的发现结果
+
+    每个 host 下按项目（如 'type'、'config'）分别缓存。
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, path=None):
+        """
+        初始化缓存
+
+        Args:
+            ttl: 缓存时间（秒）
+            negative_ttl: 探测失败结果的缓存时间（秒）
+            path: 磁盘缓存文件路径（可选，JSON 格式）
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path = os.path.expanduser(path) if path else None
+
+        self._lock = threading.Lock()
+        self._entries = {}   # (host, item) -> (value, expires_at)
+        self._inflight = {}  # (host, item) -> threading.Event
+        self._loaded = False
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, host, item, loader):
+        """
+        获取缓存值，不存在或已过期时调用 loader 探测
+
+        Args:
+            host: Workers host
+            item: 缓存项名称
+            loader: 探测函数，返回 (value, definitive)；
+                    definitive 为 False 时按 negative_ttl 缓存
+
+        Returns:
+            缓存或探测得到的值
+        """
+        key = (host, item)
+        while True:
+            with self._lock:
+                self._load_locked()
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > time.time():
+                    self.hits += 1
+                    return entry[0]
+
+                event = self._inflight.get(key)
+                if event is None:
+                    # 由当前线程负责探测
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    self.misses += 1
+                    break
+
+            # 其他线程正在探测，等待结果后重新读取缓存
+            event.wait()
+
+        try:
+            value, definitive = loader()
+            ttl = self.ttl if definitive else self.negative_ttl
+            with self._lock:
+                self._entries[key] = (value, time.time() + ttl)
+                if definitive:
+                    self._save_locked()
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def invalidate(self, host=None):
+        """清除缓存（host 为空时清除全部）"""
+        with self._lock:
+            self._load_locked()
+            if host is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == host]:
+                    del self._entries[key]
+            self._save_locked()
+
+    def _load_locked(self):
+        """首次访问时从磁盘加载缓存（需持有锁）"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            for host, items in data.items():
+                for item, (value, expires_at) in items.items():
+                    if expires_at > now:
+                        self._entries.setdefault((host, item), (value, expires_at))
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def _save_locked(self):
+        """把未过期的缓存写入磁盘（需持有锁，原子替换）"""
+        if not self.path:
+            return
+        now = time.time()
+        data = {}
+        for (host, item), (value, expires_at) in self._entries.items():
+            if expires_at > now:
+                data.setdefault(host, {})[item] = [value, expires_at]
+        tmp = None
+        try:
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except (OSError, TypeError, ValueError):
+            # 写入失败时清理残留的临时文件
+            if tmp is not None and os.path.exists(tmp):
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+    def stats(self):
+        """获取统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'path': self.path,
+            }
+
+
+_cache = DiscoveryCache()
+
+
+def get_discovery_cache():
+    """获取全局发现缓存"""
+    return _cache
+
+
+def configure_discovery_cache(ttl=None, negative_ttl=None, path=None):
+    """
+    配置全局 Workers 发现缓存
+
+    Args:
+        ttl: 缓存时间（秒），默认 600
+        negative_ttl: 探测失败结果的缓存时间（秒），默认 60
+        path: 磁盘缓存文件路径，如 "~/.cfspider/discovery.json"；
+              传入后新进程可直接复用发现结果，传 False 关闭磁盘缓存
+
+    Example:
+        >>> import cfspider
+        >>> cfspider.configure_discovery_cache(ttl=3600, path="~/.cfspider/discovery.json")
+    """
+    global _cache
+    if path is None:
+        path = _cache.path
+    _cache = DiscoveryCache(
+        ttl=_cache.ttl if ttl is None else ttl,
+        negative_ttl=_cache.negative_ttl if negative_ttl is None else negative_ttl,
+        path=path or None,
+    )
+    return _cache
+
+
+def clear_discovery_cache(host=None):
+    """
+    清除 Workers 发现缓存（包括磁盘缓存）
+
+    Args:
+        host: 只清除指定 Workers host（可选）
+    """
+    _cache.invalidate(host)
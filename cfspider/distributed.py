@@ -0,0 +1,661 @@
+"""
+CFspider 分布式批量请求
+
+协调者（coordinator）把 URL 写入持久化的 SQLite 工作队列，多个 worker 进程
+（同一台机器或不同机器）领取租约（lease）、请求、提交结果：
+- 租约带超时：worker 运行期间由心跳线程续约；worker 崩溃后租约到期，
+  URL 自动回到队列由其他 worker 处理；同一 URL 租约超时 max_leases 次后记为失败
+- 同一台机器上的 worker 可以直接打开队列文件（SQLite WAL，多进程安全）；
+  其他机器上的 worker 通过 QueueServer 的 TCP 接口（每行一个 JSON）访问
+- 队列文件即检查点：协调者中断后用同一个文件重新运行，已完成的 URL 不会重复请求
+- 所有 worker 的结果合并在队列中，queue.result() 返回 BatchResult
+
+Example:
+    >>> import cfspider
+    >>> # 协调者
+    >>> queue = cfspider.WorkQueue("job.db")
+    >>> queue.add(open("urls.txt"))
+    >>> server = cfspider.QueueServer(queue, host="0.0.0.0", port=8765, token="secret").start()
+    >>> queue.wait()
+    >>> queue.result().save("output.csv")
+    >>>
+    >>> # 每个 worker（任意机器）
+    >>> cfspider.run_worker("coordinator-host:8765", queue_token="secret", pick={"title": "h1"},
+    ...                     concurrency=20)
+    >>>
+    >>> # 命令行
+    >>> # cfspider batch urls.txt --coordinator --queue job.db --listen 0.0.0.0:8765 -o out.csv
+    >>> # cfspider batch --worker --queue coordinator-host:8765 --pick "title:h1" -c 20
+"""
+
+import hmac
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+# 默认租约时长（秒），worker 每 1/3 租约时长续约一次
+DEFAULT_LEASE_TTL = 60.0
+
+# 同一 URL 最多租出次数（超过后记为失败，避免反复拖垮 worker 的 URL 无限重试）
+DEFAULT_MAX_LEASES = 3
+
+# QueueServer 默认端口
+DEFAULT_PORT = 8765
+
+# worker 攒够多少条结果或多少秒提交一次
+DEFAULT_COMPLETE_EVERY = 100
+DEFAULT_COMPLETE_INTERVAL = 1.0
+
+# 单次租约的 URL 数上限（SQLite 参数个数限制之内）
+_MAX_LEASE_SIZE = 500
+
+# 连接断开后可以安全重发的队列操作（lease 不能重发）
+_IDEMPOTENT_OPS = frozenset({'renew', 'complete', 'release', 'stats'})
+
+# 任务状态
+_PENDING, _LEASED, _DONE = 0, 1, 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    state INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    expires REAL,
+    leases INTEGER NOT NULL DEFAULT 0,
+    success INTEGER,
+    data TEXT,
+    error TEXT,
+    duration REAL,
+    status INTEGER,
+    size INTEGER,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, id);
+"""
+
+
+class WorkQueue:
+    """
+    SQLite 工作队列（线程安全；多个进程可以同时打开同一个文件）
+    """
+
+    def __init__(self, path: str, lease_ttl: float = DEFAULT_LEASE_TTL,
+                 max_leases: int = DEFAULT_MAX_LEASES):
+        """
+        初始化队列
+
+        Args:
+            path: SQLite 数据库文件路径（不存在时创建）
+            lease_ttl: 默认租约时长（秒）
+            max_leases: 同一 URL 最多租出次数
+        """
+        self.path = os.path.expanduser(path)
+        self.lease_ttl = lease_ttl
+        self.max_leases = max(1, max_leases)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None：自行控制事务，租约使用 BEGIN IMMEDIATE 在进程间互斥
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, urls, chunk_size: int = 1000) -> int:
+        """
+        添加 URL（已在队列中的 URL 被忽略）
+
+        Args:
+            urls: URL 可迭代对象或文件路径（按行读取，跳过空行和 # 注释）
+            chunk_size: 每个事务写入的 URL 数
+
+        Returns:
+            新增的 URL 数
+        """
+        from .batch import _iter_urls
+
+        added = 0
+        rows = ((url,) for url in _iter_urls(urls))
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return added
+            with self._lock:
+                before = self._conn.total_changes
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany("INSERT OR IGNORE INTO tasks (url) VALUES (?)", chunk)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                added += self._conn.total_changes - before
+
+    def lease(self, worker: str, n: int, ttl: Optional[float] = None) -> List[str]:
+        """
+        领取最多 n 个待处理 URL（先回收已过期的租约）
+
+        Args:
+            worker: worker 标识
+            n: 最多领取的 URL 数
+            ttl: 租约时长（秒，默认使用队列的 lease_ttl）
+
+        Returns:
+            URL 列表；没有待处理 URL 时为空列表
+        """
+        now = time.time()
+        expires = now + (ttl or self.lease_ttl)
+        n = max(1, min(int(n), _MAX_LEASE_SIZE))
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reclaim(now)
+                rows = conn.execute(
+                    "SELECT id, url FROM tasks WHERE state = ? ORDER BY id LIMIT ?", (_PENDING, n)
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE tasks SET state = ?, owner = ?, expires = ?, leases = leases + 1 "
+                    "WHERE id = ?",
+                    [(_LEASED, worker, expires, row[0]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return [row[1] for row in rows]
+
+    def _reclaim(self, now: float):
+        """回收过期租约：次数用完的记为失败，其余放回队列"""
+        self._conn.execute(
+            "UPDATE tasks SET state = ?, owner = NULL, success = 0, finished_at = ?, "
+            "error = '租约超时 ' || leases || ' 次（worker 可能已崩溃）' "
+            "WHERE state = ? AND expires < ? AND leases >= ?",
+            (_DONE, now, _LEASED, now, self.max_leases),
+        )
+        self._conn.execute(
+            "UPDATE tasks SET state = ?, owner = NULL WHERE state = ? AND expires < ?",
+            (_PENDING, _LEASED, now),
+        )
+
+    def renew(self, worker: str, ttl: Optional[float] = None) -> int:
+        """
+        续约 worker 持有的所有租约
+
+        Returns:
+            续约的 URL 数
+        """
+        expires = time.time() + (ttl or self.lease_ttl)
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET expires = ? WHERE state = ? AND owner = ?",
+                (expires, _LEASED, worker),
+            )
+            return cursor.rowcount
+
+    def complete(self, worker: str, results: List[Dict[str, Any]]) -> int:
+        """
+        提交结果（同一 URL 以最先提交的结果为准）
+
+        Args:
+            worker: worker 标识
+            results: 结果字典列表，字段为 url、success、data、error、duration、status、size
+
+        Returns:
+            写入的结果数
+        """
+        now = time.time()
+        rows = [(
+            1 if r.get('success') else 0,
+            json.dumps(r['data'], ensure_ascii=False, default=str) if r.get('data') is not None else None,
+            r.get('error'), r.get('duration'), r.get('status'), r.get('size'), now,
+            _DONE, r['url'], _DONE,
+        ) for r in results]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE tasks SET success = ?, data = ?, error = ?, duration = ?, status = ?, "
+                    "size = ?, finished_at = ?, state = ?, owner = NULL "
+                    "WHERE url = ? AND state != ?",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def release(self, worker: str) -> int:
+        """
+        归还 worker 持有的所有租约（worker 正常退出或中断时调用）
+
+        Returns:
+            放回队列的 URL 数
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET state = ?, owner = NULL, leases = MAX(leases - 1, 0) "
+                "WHERE state = ? AND owner = ?",
+                (_PENDING, _LEASED, worker),
+            )
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取统计信息
+
+        Returns:
+            dict: total、pending、leased、done、successful、failed、workers（持有租约的 worker 数）
+        """
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM tasks GROUP BY state"
+            ).fetchall())
+            successful = self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE state = ? AND success = 1", (_DONE,)
+            ).fetchone()[0]
+            workers = self._conn.execute(
+                "SELECT COUNT(DISTINCT owner) FROM tasks WHERE state = ?", (_LEASED,)
+            ).fetchone()[0]
+        done = counts.get(_DONE, 0)
+        return {
+            'total': sum(counts.values()),
+            'pending': counts.get(_PENDING, 0),
+            'leased': counts.get(_LEASED, 0),
+            'done': done,
+            'successful': successful,
+            'failed': done - successful,
+            'workers': workers,
+        }
+
+    @property
+    def finished(self) -> bool:
+        """是否所有 URL 都已完成"""
+        stats = self.stats()
+        return not stats['pending'] and not stats['leased']
+
+    def wait(self, poll_interval: float = 1.0, timeout: Optional[float] = None,
+             callback=None) -> bool:
+        """
+        等待所有 URL 完成（期间回收过期租约）
+
+        Args:
+            poll_interval: 检查间隔（秒）
+            timeout: 最长等待时间（秒，默认不限）
+            callback: 每次检查时调用 callback(stats)，可用于显示进度
+
+        Returns:
+            True 表示全部完成，False 表示超时
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._reclaim(time.time())
+            stats = self.stats()
+            if callback is not None:
+                callback(stats)
+            if not stats['pending'] and not stats['leased']:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+
+    def items(self) -> Iterator:
+        """
+        按完成顺序读取已完成的结果
+
+        Yields:
+            BatchItem（response 为 None）
+        """
+        from .batch import BatchItem
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, success, data, error, duration, status, size FROM tasks "
+                "WHERE state = ? ORDER BY finished_at, id", (_DONE,)
+            ).fetchall()
+        for url, success, data, error, duration, status, size in rows:
+            yield BatchItem(
+                url=url,
+                data=json.loads(data) if data else None,
+                error=error if not success else None,
+                duration=duration or 0.0,
+                status=status,
+                size=size,
+            )
+
+    def result(self):
+        """合并所有 worker 的结果，返回 BatchResult"""
+        from .batch import BatchResult
+        return BatchResult(list(self.items()))
+
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# QueueServer 对外开放的操作
+_OPS = ('lease', 'renew', 'complete', 'release', 'stats')
+
+
+class QueueServer:
+    """
+    WorkQueue 的 TCP 接口（供其他机器上的 worker 使用）
+
+    协议：每行一个 JSON 请求 {"op": ..., "token": ..., 参数...}，
+    每行一个 JSON 响应 {"ok": true, "result": ...} 或 {"ok": false, "error": ...}。
+    """
+
+    def __init__(self, queue: WorkQueue, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 token: Optional[str] = None):
+        """
+        Args:
+            queue: 工作队列
+            host: 监听地址（其他机器访问时使用 "0.0.0.0"）
+            port: 监听端口（0 表示随机端口）
+            token: 访问令牌（可选，worker 需提供相同的 token）
+        """
+        self.queue = queue
+        self.token = token
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    response = server._dispatch(line)
+                    self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._thread = None
+
+    def _dispatch(self, line: bytes) -> Dict[str, Any]:
+        try:
+            request = json.loads(line)
+            if self.token is not None and not hmac.compare_digest(
+                    str(request.get('token') or ''), self.token):
+                return {'ok': False, 'error': 'token 无效'}
+            op = request.pop('op', None)
+            request.pop('token', None)
+            if op not in _OPS:
+                return {'ok': False, 'error': f'未知操作: {op}'}
+            return {'ok': True, 'result': getattr(self.queue, op)(**request)}
+        except Exception as e:
+            return {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+
+    @property
+    def address(self) -> str:
+        """监听地址 "host:port" """
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> 'QueueServer':
+        """在后台线程中开始服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """在当前线程中服务（阻塞）"""
+        self._server.serve_forever()
+
+    def stop(self):
+        """停止服务"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class QueueClient:
+    """
+    通过 TCP 访问 QueueServer 的客户端（接口与 WorkQueue 相同，线程安全）
+    """
+
+    def __init__(self, address: str, token: Optional[str] = None, timeout: float = 30.0):
+        """
+        Args:
+            address: "host:port"
+            token: 访问令牌
+            timeout: 网络超时（秒）
+        """
+        host, _, port = address.rpartition(':')
+        self.address = (host.strip('[]') or '127.0.0.1', int(port))
+        self.token = token
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _call(self, op: str, **params):
+        request = dict(params, op=op)
+        if self.token is not None:
+            request['token'] = self.token
+        payload = json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n'
+        with self._lock:
+            # 连接断开时重连一次（协调者重启等）；请求可能已送达时只重发幂等操作，
+            # lease 的回复丢失后重发会让第一次领取的 URL 一直记在本 worker 名下
+            for attempt in range(2):
+                sent = False
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    sent = True
+                    self._sock.sendall(payload)
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("协调者关闭了连接")
+                    break
+                except OSError:
+                    self._disconnect()
+                    if attempt or (sent and op not in _IDEMPOTENT_OPS):
+                        raise
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise RuntimeError(f"队列操作 {op} 失败: {response.get('error')}")
+        return response.get('result')
+
+    def _connect(self):
+        """连接协调者；协调者尚未启动时在 timeout 秒内重试"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self._sock = socket.create_connection(self.address, self.timeout)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+        self._file = self._sock.makefile('rb')
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = self._file = None
+
+    def lease(self, worker: str, n: int, ttl: Optional[float] = None) -> List[str]:
+        return self._call('lease', worker=worker, n=n, ttl=ttl)
+
+    def renew(self, worker: str, ttl: Optional[float] = None) -> int:
+        return self._call('renew', worker=worker, ttl=ttl)
+
+    def complete(self, worker: str, results: List[Dict[str, Any]]) -> int:
+        return self._call('complete', worker=worker, results=results)
+
+    def release(self, worker: str) -> int:
+        return self._call('release', worker=worker)
+
+    def stats(self) -> Dict[str, int]:
+        return self._call('stats')
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+def _is_address(queue: str) -> bool:
+    """"host:port" 形式的队列地址（而不是文件路径）"""
+    host, sep, port = queue.rpartition(':')
+    return bool(sep and host and port.isdigit() and not os.path.exists(queue))
+
+
+def connect_queue(queue, token: Optional[str] = None, lease_ttl: float = DEFAULT_LEASE_TTL):
+    """
+    把 queue 参数转换为队列对象
+
+    Args:
+        queue: WorkQueue / QueueClient 对象、"host:port" 地址或 SQLite 文件路径
+
+    Returns:
+        (队列对象, owned)：owned 为 True 表示由调用方负责关闭
+    """
+    if isinstance(queue, (WorkQueue, QueueClient)):
+        return queue, False
+    if _is_address(queue):
+        return QueueClient(queue, token=token), True
+    return WorkQueue(queue, lease_ttl=lease_ttl), True
+
+
+def _result_row(item) -> Dict[str, Any]:
+    """BatchItem -> 提交给队列的结果字典"""
+    return {
+        'url': item.url,
+        'success': item.success,
+        'data': dict(item.data) if item.data is not None else None,
+        'error': item.error,
+        'duration': item.duration,
+        'status': item.status,
+        'size': item.size,
+    }
+
+
+def run_worker(queue, pick: Dict[str, Any] = None, concurrency: int = 5,
+               lease_size: int = None, lease_ttl: float = DEFAULT_LEASE_TTL,
+               queue_token: Optional[str] = None, worker_id: Optional[str] = None,
+               poll_interval: float = 1.0, on_item=None, **kwargs) -> Dict[str, Any]:
+    """
+    运行一个 worker：从队列领取 URL、请求、提交结果，直到队列中所有 URL 完成
+
+    Args:
+        queue: 队列文件路径（同一台机器）、协调者地址 "host:port"，或队列对象
+        pick: 数据提取规则（字典或 compile_rules() 编译后的 ExtractionPlan）
+        concurrency: 并发数
+        lease_size: 每次领取的 URL 数（默认 concurrency * 2）
+        lease_ttl: 租约时长（秒）；worker 每 lease_ttl / 3 秒续约一次
+        queue_token: 协调者的访问令牌（QueueServer 的 token）
+        worker_id: worker 标识（默认 "主机名:进程号"）
+        poll_interval: 队列暂时为空（其他 worker 仍持有租约）时的检查间隔（秒）
+        on_item: 每个结果的回调 on_item(BatchItem)
+        **kwargs: 传给 batch_iter() 的其他参数（retry、timeout、cf_proxies、host_rate 等）
+
+    Returns:
+        dict: worker、processed、successful、failed
+    """
+    from .batch import batch_iter, DEFAULT_PREFETCH
+    from .extract import compile_rules
+
+    # 每轮领取都会调用 batch_iter，规则在这里编译一次
+    pick = compile_rules(pick) if pick else None
+    q, owned = connect_queue(queue, token=queue_token, lease_ttl=lease_ttl)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    lease_size = lease_size or max(1, concurrency * DEFAULT_PREFETCH)
+    counts = {'worker': worker_id, 'processed': 0, 'successful': 0, 'failed': 0}
+
+    # 心跳：续约本 worker 持有的所有租约
+    stopping = threading.Event()
+
+    def heartbeat():
+        while not stopping.wait(lease_ttl / 3):
+            try:
+                q.renew(worker_id, lease_ttl)
+            except Exception:
+                pass
+
+    def leased_urls():
+        # 队列为空时立即结束（不能在这里等待：本 worker 在途的结果要先提交）
+        while True:
+            try:
+                urls = q.lease(worker_id, lease_size, lease_ttl)
+            except OSError:
+                # 与协调者的连接断开：结束本轮，回复丢失时已生效的租约在本轮结束后归还
+                return
+            if not urls:
+                return
+            yield from urls
+
+    pending: List[Dict[str, Any]] = []
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal last_flush
+        last_flush = time.monotonic()
+        if pending:
+            q.complete(worker_id, pending)
+            pending.clear()
+
+    thread = threading.Thread(target=heartbeat, daemon=True)
+    thread.start()
+    try:
+        while True:
+            for item in batch_iter(leased_urls(), pick=pick, concurrency=concurrency, **kwargs):
+                pending.append(_result_row(item))
+                counts['processed'] += 1
+                counts['successful' if item.success else 'failed'] += 1
+                if on_item is not None:
+                    on_item(item)
+                if (len(pending) >= DEFAULT_COMPLETE_EVERY
+                        or time.monotonic() - last_flush >= DEFAULT_COMPLETE_INTERVAL):
+                    flush()
+            flush()
+            # 本轮的结果都已提交，仍记在本 worker 名下的租约（lease 回复丢失等）放回队列，
+            # 否则心跳会一直续约，队列永远不会完成
+            q.release(worker_id)
+            stats = q.stats()
+            if not stats['pending'] and not stats['leased']:
+                return counts
+            if not stats['pending']:
+                # 其他 worker 仍持有租约：等待它们完成或租约过期
+                time.sleep(poll_interval)
+    finally:
+        stopping.set()
+        try:
+            try:
+                flush()
+            finally:
+                # 中断时归还尚未处理的租约，其他 worker 可以立即领取
+                q.release(worker_id)
+        finally:
+            if owned:
+                q.close()
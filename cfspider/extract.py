@@ -16,17 +16,39 @@ Example:
     >>> 
     >>> # 批量提取
     >>> data = response.pick(title="h1", links=("a", "href"))
+
+CSS 选择器默认由 lxml 解析 + 预编译的 cssselect 表达式执行（parser="lxml"），
+比 BeautifulSoup + html.parser 快一个数量级；需要与旧版本逐字一致的结果时
+可使用 parser="bs4"：
+
+    >>> response.parser = "bs4"
+    >>> Extractor(html, parser="bs4").css("h1")
+
+两种引擎的差异：lxml 模式下多值属性（如 class）返回字符串而不是列表；
+cssselect 不支持的选择器（如 :-soup-contains()）自动改用 BeautifulSoup 执行；
+不规范的 HTML（如块级元素嵌套在 <a> 中）两种解析器修复出的树结构可能不同，
+依赖父子关系的选择器（div > a）在这类页面上结果会有出入。
 """
 
 import re
 import json
-from typing import Any, Optional, Union, List, Dict, Callable
+import threading
+from functools import lru_cache
+from typing import Any, AsyncIterable, Optional, Union, List, Dict, Callable, Iterable
 
 # 延迟导入可选依赖
 _bs4 = None
 _lxml = None
+_lxml_html = None
 _jsonpath_ng = None
 
+# CSS 选择器引擎
+PARSERS = ("lxml", "bs4")
+DEFAULT_PARSER = "lxml"
+
+# 文本内容不计入父元素文本的标签（与 BeautifulSoup 的 get_text() 一致）
+_RAW_TEXT_TAGS = frozenset(("script", "style"))
+
 
 def _get_bs4():
     """延迟加载 BeautifulSoup"""
@@ -58,6 +80,102 @@ def _get_lxml():
     return _lxml
 
 
+def _get_lxml_html():
+    """延迟加载 lxml.html"""
+    global _lxml_html
+    if _lxml_html is None:
+        _get_lxml()
+        from lxml import html
+        _lxml_html = html
+    return _lxml_html
+
+
+@lru_cache(maxsize=1024)
+def _compile_css(selector: str):
+    """
+    把 CSS 选择器编译为 lxml 的 CSSSelector（按选择器缓存）
+    
+    Returns:
+        CSSSelector；cssselect 不支持的选择器返回 None
+    """
+    try:
+        from lxml.cssselect import CSSSelector, SelectorError
+    except ImportError:
+        raise ImportError(
+            "cssselect is required for CSS selectors with lxml. "
+            "Install it with: pip install cssselect"
+        )
+    try:
+        return CSSSelector(selector, translator='html')
+    except SelectorError:
+        return None
+
+
+def _lxml_text(element, strip: bool = True) -> str:
+    """
+    lxml 元素的文本内容
+    
+    与 BeautifulSoup 的 get_text() 一致：不含注释，也不含子孙 script / style 的内容；
+    strip=True 时去除每段文本两端的空白后直接拼接。
+    """
+    if not isinstance(element.tag, str):
+        return ""
+    if element.tag in _RAW_TEXT_TAGS:
+        strings = [element.text or ""]
+    else:
+        strings = []
+        for text in element.xpath('.//text()'):
+            owner = text.getparent()
+            if text.is_text and owner is not element and owner.tag in _RAW_TEXT_TAGS:
+                continue
+            strings.append(text)
+    if strip:
+        return "".join(s.strip() for s in strings)
+    return "".join(strings)
+
+
+def _lxml_outer_html(element) -> str:
+    """lxml 元素的 HTML（不含元素之后的尾部文本）"""
+    etree = _get_lxml()
+    return etree.tostring(element, encoding='unicode', method='html', with_tail=False)
+
+
+def _css_select(element, selector: str) -> list:
+    """在 lxml 元素内执行 CSS 选择器"""
+    sel = _compile_css(selector)
+    if sel is None:
+        raise ValueError(f"lxml 引擎不支持该 CSS 选择器: {selector}")
+    return sel(element)
+
+
+@lru_cache(maxsize=1024)
+def _compile_xpath(expression: str):
+    """把 XPath 表达式编译为 etree.XPath（按表达式缓存）"""
+    etree = _get_lxml()
+    return etree.XPath(expression)
+
+
+def _xpath_select(node, xpath) -> list:
+    """
+    在 lxml 节点上执行 XPath；count() / string() 等标量结果包装为单元素列表
+    
+    Args:
+        node: lxml 文档或元素
+        xpath: XPath 表达式或编译好的 etree.XPath
+    """
+    if isinstance(xpath, str):
+        xpath = _compile_xpath(xpath)
+    results = xpath(node)
+    return results if isinstance(results, list) else [results]
+
+
+def _xpath_text(result) -> Optional[str]:
+    """XPath 结果的文本：元素取 text_content()，字符串 / 数值直接转为字符串"""
+    if hasattr(result, 'text_content'):
+        return result.text_content().strip()
+    return str(result).strip() if result else None
+
+
 def _get_jsonpath():
     """延迟加载 jsonpath-ng"""
     global _jsonpath_ng
@@ -73,14 +191,101 @@ def _get_jsonpath():
     return _jsonpath_ng
 
 
+@lru_cache(maxsize=256)
+def _compile_jsonpath(expression: str):
+    """解析 JSONPath 表达式（jsonpath_ng.parse 很慢，按表达式缓存）；简化路径自动补 "$." """
+    parse = _get_jsonpath()
+    if not expression.startswith('$'):
+        expression = '$.' + expression
+    return parse(expression)
+
+
+# 响应头 / <meta> 中的字符集
+_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+
+
+def _charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """从 Content-Type 响应头中取出 charset"""
+    if not content_type:
+        return None
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+
+def _sniff_charset(head: bytes) -> Optional[str]:
+    """从文档开头（BOM 或前 2 KB 内的 <meta charset>）识别编码"""
+    if head.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8'
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return 'utf-16'
+    match = _CHARSET_RE.search(head[:2048])
+    return match.group(1).decode('ascii') if match else None
+
+
+# 按 HTML 标准当作超集处理的编码（gb2312 页面常含 GBK 字符）
+_CHARSET_ALIASES = {"gb2312": "gbk", "gb_2312-80": "gbk", "x-gbk": "gbk"}
+
+
+def _normalize_charset(charset: Optional[str]) -> Optional[str]:
+    """统一编码名称（小写，gb2312 按 gbk 处理）"""
+    if not charset:
+        return None
+    charset = charset.strip().lower()
+    return _CHARSET_ALIASES.get(charset, charset)
+
+
+def _response_encoding(response) -> Optional[str]:
+    """
+    响应声明的编码：手动设置的 response.encoding 优先，其次是 Content-Type 的 charset
+    
+    都没有时返回 None，由 Extractor 从 BOM / <meta charset> 识别。
+    """
+    override = getattr(response, '_encoding_override', None)
+    if override:
+        return override
+    headers = getattr(response, 'headers', None) or {}
+    return _charset_from_content_type(headers.get('content-type'))
+
+
+_parsers = threading.local()
+
+
+def _html_parser(encoding: Optional[str], huge_tree: bool = False):
+    """
+    当前线程的 lxml.html 解析器（按编码缓存；同一个解析器不能被多个线程同时使用）
+    
+    huge_tree 关闭 libxml2 对文本节点大小和嵌套深度的安全限制，只应对可信页面开启。
+    """
+    cache = getattr(_parsers, 'cache', None)
+    if cache is None:
+        cache = _parsers.cache = {}
+    key = (encoding, huge_tree)
+    parser = cache.get(key)
+    if parser is None:
+        html = _get_lxml_html()
+        try:
+            parser = html.HTMLParser(encoding=encoding, huge_tree=huge_tree)
+        except LookupError:
+            # libxml2 不认识的编码
+            parser = html.HTMLParser(encoding='utf-8', huge_tree=huge_tree)
+        cache[key] = parser
+    return parser
+
+
 class Element:
     """
     HTML 元素封装类，支持链式操作
     
+    lxml 模式下 CSS 选择器和 XPath 作用于同一棵树，可以交替链式查找。
+    
     Example:
         >>> element = response.css_one("#product")
         >>> title = element.find("h1")
         >>> price = element.find(".price")
+        >>> link = element.xpath(".//a/@href")
         >>> element.text  # 获取文本
         >>> element.html  # 获取 HTML
         >>> element["href"]  # 获取属性
@@ -104,8 +309,10 @@ class Element:
             return ""
         if self._parser == "bs4":
             return self._element.get_text(strip=True)
-        else:
-            return self._element.text_content().strip() if hasattr(self._element, 'text_content') else str(self._element)
+        if not hasattr(self._element, 'xpath'):
+            # XPath 返回的字符串 / 数值
+            return str(self._element).strip()
+        return _lxml_text(self._element)
     
     @property
     def html(self) -> str:
@@ -114,9 +321,9 @@ class Element:
             return ""
         if self._parser == "bs4":
             return str(self._element)
-        else:
-            etree = _get_lxml()
-            return etree.tostring(self._element, encoding='unicode')
+        if not hasattr(self._element, 'xpath'):
+            return str(self._element)
+        return _lxml_outer_html(self._element)
     
     @property
     def attrs(self) -> Dict[str, str]:
@@ -160,20 +367,14 @@ class Element:
             text = found.get_text(strip=strip)
             return text
         else:
-            # lxml 使用 cssselect
-            try:
-                from lxml.cssselect import CSSSelector
-                sel = CSSSelector(selector)
-                results = sel(self._element)
-                if not results:
-                    return None
-                found = results[0]
-                if attr:
-                    return found.get(attr)
-                text = found.text_content()
-                return text.strip() if strip and text else text
-            except ImportError:
-                raise ImportError("cssselect is required for CSS selectors with lxml")
+            # lxml 使用预编译的 cssselect 表达式
+            results = _css_select(self._element, selector)
+            if not results:
+                return None
+            found = results[0]
+            if attr:
+                return found.get(attr)
+            return _lxml_text(found, strip)
     
     def find_all(self, selector: str, attr: str = None, strip: bool = True) -> List[str]:
         """
@@ -203,21 +404,15 @@ class Element:
                     if text:
                         results.append(text)
         else:
-            try:
-                from lxml.cssselect import CSSSelector
-                sel = CSSSelector(selector)
-                elements = sel(self._element)
-                for el in elements:
-                    if attr:
-                        val = el.get(attr)
-                        if val:
-                            results.append(val)
-                    else:
-                        text = el.text_content()
-                        if text:
-                            results.append(text.strip() if strip else text)
-            except ImportError:
-                raise ImportError("cssselect is required for CSS selectors with lxml")
+            for el in _css_select(self._element, selector):
+                if attr:
+                    val = el.get(attr)
+                    if val:
+                        results.append(val)
+                else:
+                    text = _lxml_text(el, strip)
+                    if text:
+                        results.append(text)
         
         return results
     
@@ -230,14 +425,39 @@ class Element:
             found = self._element.select_one(selector)
             return Element(found, self._parser)
         else:
-            try:
-                from lxml.cssselect import CSSSelector
-                sel = CSSSelector(selector)
-                results = sel(self._element)
-                found = results[0] if results else None
-                return Element(found, self._parser)
-            except ImportError:
-                raise ImportError("cssselect is required for CSS selectors with lxml")
+            results = _css_select(self._element, selector)
+            return Element(results[0] if results else None, self._parser)
+    
+    def _xpath(self, expression: str) -> list:
+        """在当前元素上执行 XPath（与 CSS 选择器共用同一棵 lxml 树）"""
+        if self._parser == "bs4":
+            raise ValueError("bs4 模式下的 Element 不支持 XPath，请使用 parser=\"lxml\"")
+        if self._element is None or not hasattr(self._element, 'xpath'):
+            return []
+        return _xpath_select(self._element, expression)
+    
+    def xpath(self, expression: str) -> Optional[str]:
+        """
+        在当前元素上执行 XPath，返回第一个匹配的文本或属性值
+        
+        相对路径以 "." 开头，如 ".//a/@href"；"//" 开头的表达式从文档根查找。
+        """
+        results = self._xpath(expression)
+        return _xpath_text(results[0]) if results else None
+    
+    def xpath_all(self, expression: str) -> List[str]:
+        """在当前元素上执行 XPath，返回所有匹配的文本或属性值"""
+        extracted = []
+        for result in self._xpath(expression):
+            text = _xpath_text(result)
+            if text:
+                extracted.append(text)
+        return extracted
+    
+    def xpath_one(self, expression: str) -> 'Element':
+        """返回第一个匹配的 Element 对象，可继续用 CSS 或 XPath 链式查找"""
+        results = self._xpath(expression)
+        return Element(results[0] if results else None, "lxml")
     
     def __bool__(self) -> bool:
         """检查元素是否存在"""
@@ -286,26 +506,101 @@ class Extractor:
     """
     数据提取器，支持 CSS 选择器、XPath、JSONPath
     
+    lxml 模式下文档只解析一次，CSS 选择器、XPath 和 Element 共用同一棵 lxml.html 树；
+    bs4 模式下 CSS 使用 BeautifulSoup 树，XPath 仍需要 lxml 树，混用时会解析两次。
+    
     Example:
         >>> extractor = Extractor(html_content)
         >>> title = extractor.css("h1")
         >>> links = extractor.css_all("a", attr="href")
     """
     
-    def __init__(self, content: Union[str, bytes], content_type: str = "html"):
+    def __init__(self, content: Union[str, bytes], content_type: str = "html",
+                 parser: str = None, encoding: str = None, huge_tree: bool = False):
         """
         初始化提取器
         
         Args:
-            content: HTML 或 JSON 内容
+            content: HTML 或 JSON 内容；bytes 直接交给 lxml 解析，不先解码为 str
             content_type: 内容类型 ("html", "json")
+            parser: CSS 选择器引擎，"lxml"（默认，lxml + cssselect）或 "bs4"（BeautifulSoup）
+            encoding: content 为 bytes 时的编码（None 时按 BOM / <meta charset> 识别，默认 UTF-8）
+            huge_tree: 解除 libxml2 的安全限制（超过 10 MB 的文本节点、极深的嵌套），
+                       默认关闭，只对可信页面开启
         """
-        self.content = content if isinstance(content, str) else content.decode('utf-8', errors='replace')
+        parser = parser or DEFAULT_PARSER
+        if parser not in PARSERS:
+            raise ValueError(f"parser 只能是 {' 或 '.join(PARSERS)}，而不是 {parser!r}")
+        if isinstance(content, str):
+            self._text, self._raw = content, None
+        else:
+            self._text, self._raw = None, content
+        self._encoding = _normalize_charset(encoding)
         self.content_type = content_type
+        self.parser = parser
+        self.huge_tree = huge_tree
         self._soup = None
-        self._lxml_doc = None
+        self._html_doc = None
+        self._html_parsed = False
         self._json_data = None
     
+    @property
+    def encoding(self) -> Optional[str]:
+        """bytes 内容的编码（str 内容返回 None）"""
+        if self._raw is None:
+            return None
+        if self._encoding is None:
+            self._encoding = _normalize_charset(_sniff_charset(self._raw[:2048])) or 'utf-8'
+        return self._encoding
+    
+    @property
+    def content(self) -> str:
+        """文档文本（bytes 内容在首次访问时才解码，lxml 解析不需要）"""
+        if self._text is None:
+            try:
+                self._text = self._raw.decode(self.encoding, errors='replace')
+            except LookupError:
+                self._text = self._raw.decode('utf-8', errors='replace')
+        return self._text
+    
+    def _get_html_doc(self):
+        """获取 lxml.html 文档（CSS 选择器、XPath 和 Element 共用）；空文档返回 None"""
+        if not self._html_parsed:
+            self._html_parsed = True
+            html = _get_lxml_html()
+            try:
+                if self._raw is not None:
+                    self._html_doc = html.document_fromstring(
+                        self._raw, parser=_html_parser(self.encoding, self.huge_tree))
+                else:
+                    try:
+                        self._html_doc = html.document_fromstring(
+                            self._text, parser=_html_parser(None, self.huge_tree))
+                    except ValueError:
+                        # 带编码声明的 XML 文档不能以 str 解析
+                        self._html_doc = html.document_fromstring(
+                            self._text.encode('utf-8'), parser=_html_parser('utf-8', self.huge_tree))
+            except Exception:
+                # 空文档等无法解析的内容
+                self._html_doc = None
+        return self._html_doc
+    
+    def _css_elements(self, selector: str, first: bool = False):
+        """
+        lxml 模式下执行 CSS 选择器
+        
+        Returns:
+            元素列表；cssselect 不支持该选择器时返回 None（由调用方改用 BeautifulSoup）
+        """
+        sel = _compile_css(selector)
+        if sel is None:
+            return None
+        doc = self._get_html_doc()
+        if doc is None:
+            return []
+        results = sel(doc)
+        return results[:1] if first else results
+    
     def _get_soup(self):
         """获取 BeautifulSoup 对象"""
         if self._soup is None:
@@ -313,17 +608,12 @@ class Extractor:
             self._soup = BeautifulSoup(self.content, 'html.parser')
         return self._soup
     
-    def _get_lxml_doc(self):
-        """获取 lxml 文档对象"""
-        if self._lxml_doc is None:
-            etree = _get_lxml()
-            self._lxml_doc = etree.HTML(self.content)
-        return self._lxml_doc
-    
     def _get_json(self):
         """获取 JSON 数据"""
         if self._json_data is None:
-            self._json_data = json.loads(self.content)
+            # UTF-8 的 bytes 由 json 直接解析，不经过 str
+            utf8 = self._text is None and self.encoding in ('utf-8', 'utf8')
+            self._json_data = json.loads(self._raw if utf8 else self.content)
         return self._json_data
     
     # ========== 简洁 API ==========
@@ -406,6 +696,18 @@ class Extractor:
         Returns:
             匹配元素的文本、属性或 HTML
         """
+        if self.parser == "lxml":
+            elements = self._css_elements(selector, first=True)
+            if elements is not None:
+                if not elements:
+                    return None
+                element = elements[0]
+                if attr:
+                    return element.get(attr)
+                if html:
+                    return _lxml_outer_html(element)
+                return _lxml_text(element, strip)
+        
         soup = self._get_soup()
         element = soup.select_one(selector)
         
@@ -433,6 +735,23 @@ class Extractor:
         Returns:
             匹配元素的文本、属性或 HTML 列表
         """
+        if self.parser == "lxml":
+            elements = self._css_elements(selector)
+            if elements is not None:
+                results = []
+                for el in elements:
+                    if attr:
+                        val = el.get(attr)
+                        if val:
+                            results.append(val)
+                    elif html:
+                        results.append(_lxml_outer_html(el))
+                    else:
+                        text = _lxml_text(el, strip)
+                        if text:
+                            results.append(text)
+                return results
+        
         soup = self._get_soup()
         elements = soup.select(selector)
         
@@ -461,6 +780,11 @@ class Extractor:
         Returns:
             Element 对象
         """
+        if self.parser == "lxml":
+            elements = self._css_elements(selector, first=True)
+            if elements is not None:
+                return Element(elements[0] if elements else None, "lxml")
+        
         soup = self._get_soup()
         element = soup.select_one(selector)
         return Element(element, "bs4")
@@ -477,16 +801,15 @@ class Extractor:
         Returns:
             匹配的文本或属性值
         """
-        doc = self._get_lxml_doc()
-        results = doc.xpath(expression)
+        doc = self._get_html_doc()
+        if doc is None:
+            return None
+        results = _xpath_select(doc, expression)
         
         if not results:
             return None
         
-        result = results[0]
-        if hasattr(result, 'text_content'):
-            return result.text_content().strip()
-        return str(result).strip() if result else None
+        return _xpath_text(results[0])
     
     def xpath_all(self, expression: str) -> List[str]:
         """
@@ -498,17 +821,15 @@ class Extractor:
         Returns:
             匹配的文本或属性值列表
         """
-        doc = self._get_lxml_doc()
-        results = doc.xpath(expression)
+        doc = self._get_html_doc()
+        if doc is None:
+            return []
         
         extracted = []
-        for result in results:
-            if hasattr(result, 'text_content'):
-                text = result.text_content().strip()
-                if text:
-                    extracted.append(text)
-            elif result:
-                extracted.append(str(result).strip())
+        for result in _xpath_select(doc, expression):
+            text = _xpath_text(result)
+            if text:
+                extracted.append(text)
         
         return extracted
     
@@ -522,8 +843,8 @@ class Extractor:
         Returns:
             Element 对象
         """
-        doc = self._get_lxml_doc()
-        results = doc.xpath(expression)
+        doc = self._get_html_doc()
+        results = _xpath_select(doc, expression) if doc is not None else None
         element = results[0] if results else None
         return Element(element, "lxml")
     
@@ -539,15 +860,10 @@ class Extractor:
         Returns:
             匹配的值
         """
-        parse = _get_jsonpath()
         data = self._get_json()
         
-        # 处理简化的点号路径（如 data.items.*.name）
-        if not expression.startswith('$'):
-            expression = '$.' + expression
-        
-        jsonpath_expr = parse(expression)
-        matches = jsonpath_expr.find(data)
+        # 简化的点号路径（如 data.items.*.name）在编译时补全为 $.data.items.*.name
+        matches = _compile_jsonpath(expression).find(data)
         
         if not matches:
             return None
@@ -564,14 +880,8 @@ class Extractor:
         Returns:
             匹配的值列表
         """
-        parse = _get_jsonpath()
         data = self._get_json()
-        
-        if not expression.startswith('$'):
-            expression = '$.' + expression
-        
-        jsonpath_expr = parse(expression)
-        matches = jsonpath_expr.find(data)
+        matches = _compile_jsonpath(expression).find(data)
         
         return [match.value for match in matches]
     
@@ -586,6 +896,7 @@ class Extractor:
                 - 字符串：CSS 选择器，提取文本
                 - 元组 (selector, attr)：提取属性
                 - 元组 (selector, attr, converter)：提取并转换
+                同一组规则用于大量页面时，先用 compile_rules() 编译再 plan.run()
                 
         Returns:
             ExtractResult 字典，支持直接保存
@@ -598,46 +909,7 @@ class Extractor:
             ... )
             >>> data.save("output.csv")
         """
-        result = {}
-        
-        for field_name, selector_spec in fields.items():
-            try:
-                if isinstance(selector_spec, str):
-                    # 简单字符串选择器
-                    result[field_name] = self.find(selector_spec)
-                
-                elif isinstance(selector_spec, tuple):
-                    if len(selector_spec) == 2:
-                        selector, attr = selector_spec
-                        if attr == "text":
-                            result[field_name] = self.find(selector)
-                        else:
-                            result[field_name] = self.find(selector, attr=attr)
-                    
-                    elif len(selector_spec) == 3:
-                        selector, attr, converter = selector_spec
-                        if attr == "text":
-                            value = self.find(selector)
-                        else:
-                            value = self.find(selector, attr=attr)
-                        
-                        if value is not None and converter:
-                            try:
-                                value = converter(value)
-                            except (ValueError, TypeError):
-                                pass
-                        result[field_name] = value
-                    
-                    else:
-                        result[field_name] = None
-                
-                else:
-                    result[field_name] = None
-                    
-            except Exception:
-                result[field_name] = None
-        
-        return ExtractResult(result)
+        return compile_rules(fields).run(self)
     
     def extract(self, rules: Dict[str, str]) -> ExtractResult:
         """
@@ -663,65 +935,556 @@ class Extractor:
             ...     "api_data": "jsonpath:$.items[*].id"
             ... })
         """
+        return compile_rules(rules).run(self)
+
+
+# ========== 编译后的提取规则 ==========
+
+# 选择器类型前缀
+_RULE_PREFIXES = (("css:", "css"), ("xpath:", "xpath"), ("jsonpath:", "jpath"))
+
+
+def _parse_rule(rule) -> Optional[tuple]:
+    """
+    把一条 pick / extract 规则解析为 (kind, selector, attr, html, converter)
+    
+    kind 为 "css"、"xpath" 或 "jpath"；无法识别的规则返回 None（提取结果为 None）。
+    """
+    attr = converter = None
+    if isinstance(rule, str):
+        selector = rule
+    elif isinstance(rule, tuple) and len(rule) == 2:
+        selector, attr = rule
+    elif isinstance(rule, tuple) and len(rule) == 3:
+        selector, attr, converter = rule
+    else:
+        return None
+    if not isinstance(selector, str):
+        return None
+    if attr == "text":
+        attr = None
+    
+    html = False
+    if "::text" in selector:
+        selector = selector.replace("::text", "")
+    elif "::html" in selector:
+        selector = selector.replace("::html", "")
+        html = True
+    
+    for prefix, kind in _RULE_PREFIXES:
+        if selector.startswith(prefix):
+            selector = selector[len(prefix):]
+            break
+    else:
+        # 与 Extractor.find 相同的自动识别
+        if selector.startswith('$'):
+            kind = "jpath"
+        elif selector.startswith('//') or selector.startswith('(//'):
+            kind = "xpath"
+        else:
+            kind = "css"
+    
+    # CSS 选择器末尾的 @attr（属性选择器 [...] 中的 @ 不算）
+    if kind == "css" and attr is None and '@' in selector.rsplit(']', 1)[-1]:
+        selector, attr = selector.rsplit('@', 1)
+    return (kind, selector, attr, html, converter)
+
+
+def _compile_rule(kind: str, selector: str):
+    """
+    预编译选择器
+    
+    Returns:
+        CSSSelector / etree.XPath / JSONPath 表达式；cssselect 不支持的 CSS 选择器
+        返回 None（运行时改用 BeautifulSoup）
+        
+    Raises:
+        选择器语法错误或缺少依赖时抛出原始异常
+    """
+    if kind == "css":
+        return _compile_css(selector)
+    if kind == "xpath":
+        return _compile_xpath(selector)
+    return _compile_jsonpath(selector)
+
+
+class ExtractionPlan:
+    """
+    编译后的提取规则（不可变，可以 pickle）
+    
+    由 compile_rules() 创建。规则在创建时解析一次：选择器类型识别、::text / ::html /
+    @attr 后缀拆分，CSS / XPath / JSONPath 表达式预编译，之后对每个文档只执行查询。
+    pickle 时只传规则本身，子进程按规则重新编译并缓存，同一进程内同一组规则只编译一次。
+    
+    Example:
+        >>> plan = cfspider.compile_rules({"title": "h1", "price": (".price", "text", float)})
+        >>> for response in responses:
+        ...     data = plan.run(response)
+    """
+    
+    __slots__ = ('_specs', '_rules')
+    
+    def __init__(self, rules: Dict[str, Any]):
+        """
+        Args:
+            rules: 字段名到规则的映射，规则格式同 Extractor.pick / Extractor.extract
+        """
+        self._compile(tuple((name, _parse_rule(rule)) for name, rule in rules.items()))
+    
+    @classmethod
+    def _from_specs(cls, specs: tuple) -> 'ExtractionPlan':
+        """由已解析的规则创建（反序列化时使用）"""
+        plan = cls.__new__(cls)
+        plan._compile(specs)
+        return plan
+    
+    def _compile(self, specs: tuple):
+        self._specs = specs
+        compiled = []
+        for name, spec in specs:
+            if spec is None:
+                compiled.append((name, None, None, None, None, False, None))
+                continue
+            kind, selector, attr, html, converter = spec
+            try:
+                query = _compile_rule(kind, selector)
+            except Exception:
+                # 与 pick 一致：无效的选择器提取结果为 None
+                kind = query = None
+            compiled.append((name, kind, selector, query, attr, html, converter))
+        self._rules = tuple(compiled)
+    
+    @property
+    def fields(self) -> tuple:
+        """字段名"""
+        return tuple(name for name, _ in self._specs)
+    
+    def __len__(self) -> int:
+        return len(self._specs)
+    
+    def __reduce__(self):
+        return (_load_plan, (self._specs,))
+    
+    def __repr__(self) -> str:
+        return f"ExtractionPlan({', '.join(self.fields)})"
+    
+    def run(self, target, content_type: str = "html", huge_tree: bool = False) -> ExtractResult:
+        """
+        对一个文档执行提取
+        
+        Args:
+            target: 响应对象（CFSpiderResponse / AsyncCFSpiderResponse）、Extractor、
+                    HTML / JSON 的 str 或 bytes
+            content_type: target 为 str / bytes 时的内容类型 ("html", "json")
+            huge_tree: target 为 str / bytes 时解除 libxml2 的安全限制（参见 Extractor）
+            
+        Returns:
+            ExtractResult 字典（target 为响应时带 url）
+        """
+        url = None
+        if isinstance(target, Extractor):
+            extractor = target
+        elif hasattr(target, '_get_extractor'):
+            extractor = target._get_extractor()
+            url = str(target.url)
+        else:
+            extractor = Extractor(target, content_type, huge_tree=huge_tree)
+        
         result = {}
+        for name, kind, selector, query, attr, html, converter in self._rules:
+            try:
+                value = _RUNNERS[kind](extractor, selector, query, attr, html) if kind else None
+                result[name] = _convert(value, converter)
+            except Exception:
+                result[name] = None
+        return ExtractResult(result, url)
+    
+    def run_stream(self, chunks: Iterable[Union[bytes, str]], encoding: Optional[str] = None,
+                   content_type: str = "html", huge_tree: bool = False) -> ExtractResult:
+        """
+        边读边提取：所有字段确定后停止消费 chunks（参见 StreamExtraction）
+        
+        Args:
+            chunks: 内容分块的可迭代对象，如 requests 的 response.iter_content(65536)
+            encoding: 文档编码（None 时自动识别）
+            content_type: 内容类型 ("html", "json")
+            huge_tree: 解除 libxml2 的安全限制（参见 Extractor），默认关闭
+            
+        Example:
+            >>> with requests.get(url, stream=True) as r:
+            ...     data = plan.run_stream(r.iter_content(65536))
+        """
+        extraction = StreamExtraction(self, encoding, content_type, huge_tree)
+        for chunk in chunks:
+            if extraction.feed(chunk):
+                break
+        return extraction.close()
+    
+    async def arun_stream(self, chunks: AsyncIterable[Union[bytes, str]], encoding: Optional[str] = None,
+                          content_type: str = "html", huge_tree: bool = False) -> ExtractResult:
+        """run_stream() 的异步版本，chunks 为异步可迭代对象（如 response.aiter_bytes()）"""
+        extraction = StreamExtraction(self, encoding, content_type, huge_tree)
+        async for chunk in chunks:
+            if extraction.feed(chunk):
+                break
+        return extraction.close()
+
+
+def _run_css(extractor: Extractor, selector: str, query, attr: Optional[str], html: bool):
+    if query is None or extractor.parser != "lxml":
+        # bs4 模式，或 cssselect 不支持的选择器
+        return extractor.css(selector, attr=attr, html=html)
+    doc = extractor._get_html_doc()
+    elements = query(doc) if doc is not None else None
+    if not elements:
+        return None
+    element = elements[0]
+    if attr:
+        return element.get(attr)
+    if html:
+        return _lxml_outer_html(element)
+    return _lxml_text(element)
+
+
+def _run_xpath(extractor: Extractor, selector: str, query, attr: Optional[str], html: bool):
+    doc = extractor._get_html_doc()
+    if doc is None:
+        return None
+    results = _xpath_select(doc, query)
+    return _xpath_text(results[0]) if results else None
+
+
+def _run_jpath(extractor: Extractor, selector: str, query, attr: Optional[str], html: bool):
+    matches = query.find(extractor._get_json())
+    return matches[0].value if matches else None
+
+
+_RUNNERS = {"css": _run_css, "xpath": _run_xpath, "jpath": _run_jpath}
+
+
+def _convert(value, converter):
+    """应用字段的转换函数（转换失败时保留原值）"""
+    if value is not None and converter:
+        try:
+            return converter(value)
+        except (ValueError, TypeError):
+            pass
+    return value
+
+
+@lru_cache(maxsize=32)
+def _load_cached_plan(specs: tuple) -> ExtractionPlan:
+    return ExtractionPlan._from_specs(specs)
+
+
+def _load_plan(specs: tuple) -> ExtractionPlan:
+    """pickle 还原 ExtractionPlan：同一进程内相同的规则只编译一次"""
+    try:
+        return _load_cached_plan(specs)
+    except TypeError:
+        # 转换函数不可哈希
+        return ExtractionPlan._from_specs(specs)
+
+
+def compile_rules(rules: Union[Dict[str, Any], ExtractionPlan]) -> ExtractionPlan:
+    """
+    把提取规则编译为可复用的 ExtractionPlan
+    
+    同一组规则用于大量页面时先编译一次，避免每个页面重复解析规则和编译选择器；
+    batch / abatch 的 pick 参数会自动编译。
+    
+    Args:
+        rules: 字段名到规则的映射（格式同 Extractor.pick / Extractor.extract），
+               或已编译的 ExtractionPlan（原样返回）
+        
+    Returns:
+        ExtractionPlan
         
-        for field_name, selector in rules.items():
+    Example:
+        >>> plan = cfspider.compile_rules({
+        ...     "title": "h1",
+        ...     "links": "xpath://a/@href",
+        ...     "price": (".price", "text", float),
+        ... })
+        >>> plan.run(response)
+        >>> plan.run(html_bytes)
+    """
+    if isinstance(rules, ExtractionPlan):
+        return rules
+    return ExtractionPlan(rules)
+
+
+# ========== 流式提取 ==========
+
+# 流式提取检查字段的间隔：新增字节数不少于该值且不少于已读字节数的一半
+# （检查次数随文档大小按对数增长，总开销与整页解析同阶）
+STREAM_CHECK_BYTES = 16 * 1024
+
+# 依赖元素之后内容的 CSS 伪类：首个匹配要等文档结束才能确定
+_STREAM_UNSAFE_CSS = re.compile(r':(?:has|contains|last-|only-|nth-last-)', re.I)
+
+# 向后 / 向上查找的 XPath 轴和函数
+_STREAM_UNSAFE_XPATH = re.compile(r'last\(\)|following|preceding|parent|ancestor|\.\.')
+
+# XPath 谓词中允许的函数（只依赖属性和位置时，元素的开始标签即可决定是否匹配）
+_STREAM_XPATH_FUNCTIONS = frozenset(("and", "or", "not", "contains", "starts-with", "normalize-space"))
+
+def _stream_safe(kind: str, selector: str, query) -> bool:
+    """
+    字段能否在文档读完之前确定
+    
+    要求首个匹配在其开始标签处就能判定（只依赖祖先、前面的兄弟和自身属性），
+    之后读入的内容不会让更靠前的元素变成匹配。
+    """
+    if kind == "css":
+        return query is not None and not _STREAM_UNSAFE_CSS.search(selector)
+    if kind != "xpath" or _STREAM_UNSAFE_XPATH.search(selector):
+        return False
+    # 谓词只能引用属性、位置数字和字符串字面量
+    stripped = re.sub(r'"[^"]*"|\'[^\']*\'', '""', selector)
+    depth = 0
+    for token in re.findall(r'@[\w:.-]+|[A-Za-z_][\w.-]*|\S', stripped):
+        if token == '[':
+            depth += 1
+        elif token == ']':
+            depth -= 1
+        elif depth and not (token[0] == '@' or token.isdigit() or token in _STREAM_XPATH_FUNCTIONS
+                            or token in '=!<>(),"'):
+            return False
+    return True
+
+
+def _open_elements(root) -> set:
+    """可能仍未结束的元素：从根开始一直取最后一个子节点的路径"""
+    path = set()
+    node = root
+    while node is not None:
+        path.add(node)
+        node = node[-1] if len(node) else None
+    return path
+
+
+def _stream_match(kind: str, query, attr: Optional[str], html: bool, root, open_elements: set):
+    """
+    在部分文档上执行一个可流式确定的字段
+    
+    Returns:
+        (是否已确定, 值)
+    """
+    results = query(root)
+    if not isinstance(results, list) or not results:
+        return False, None
+    first = results[0]
+    if hasattr(first, 'tag'):
+        if first in open_elements:
+            return False, None
+        if kind == "xpath":
+            return True, _xpath_text(first)
+        if attr:
+            return True, first.get(attr)
+        if html:
+            return True, _lxml_outer_html(first)
+        return True, _lxml_text(first)
+    # XPath 的属性 / 文本结果：属性随开始标签完整；文本要等所属元素结束
+    owner = first.getparent() if hasattr(first, 'getparent') else None
+    if owner is not None and not getattr(first, 'is_attribute', False):
+        if getattr(first, 'is_tail', False):
+            owner = owner.getparent()
+        if owner is None or owner in open_elements:
+            return False, None
+    return True, _xpath_text(first)
+
+
+class StreamExtraction:
+    """
+    增量执行 ExtractionPlan：边下载边解析，所有字段确定后即可停止读取
+    
+    基于 lxml.etree.HTMLPullParser。字段的首个匹配元素已经结束（之后的内容
+    不会再改变结果）时就确定下来；依赖后续内容的选择器（:last-child、:has()、
+    XPath 的 following / last() 等）、需要 BeautifulSoup 的选择器和 JSONPath
+    在 close() 时按完整文档执行。提前停止时，这些字段在已读到的部分文档上执行。
+    
+    Example:
+        >>> extraction = StreamExtraction(plan, encoding="utf-8")
+        >>> for chunk in chunks:
+        ...     if extraction.feed(chunk):
+        ...         break  # 所有字段已确定，可以中止下载
+        >>> data = extraction.close()
+    """
+    
+    def __init__(self, plan: 'ExtractionPlan', encoding: Optional[str] = None,
+                 content_type: str = "html", huge_tree: bool = False):
+        """
+        Args:
+            plan: compile_rules() 编译后的提取计划
+            encoding: 文档编码（None 时按 BOM / <meta charset> 识别，默认 UTF-8）
+            content_type: 内容类型；"json" 时不能增量解析，读完后整体提取
+            huge_tree: 解除 libxml2 的安全限制（参见 Extractor），默认关闭
+        """
+        self.plan = plan
+        self.encoding = encoding
+        self.content_type = content_type
+        self.huge_tree = huge_tree
+        self.bytes_read = 0
+        self._parser = None
+        self._head = b""
+        self._root = None
+        self._next_check = STREAM_CHECK_BYTES
+        self._values = {}
+        # 可以提前确定的字段 / 在 close() 时按完整文档执行的字段
+        self._pending = []
+        self._deferred = []
+        for rule in plan._rules:
+            name, kind, selector, query = rule[:4]
+            if kind is None:
+                self._values[name] = None
+            elif content_type == "html" and _stream_safe(kind, selector, query):
+                self._pending.append(rule)
+            else:
+                self._deferred.append(rule)
+        # BeautifulSoup 回退和 JSONPath 需要原文
+        keep = content_type != "html" or any(
+            rule[1] == "jpath" or rule[3] is None for rule in self._deferred)
+        self._chunks = [] if keep else None
+    
+    @property
+    def done(self) -> bool:
+        """所有字段是否都已确定（之后的内容不再需要）"""
+        return not self._pending and not self._deferred
+    
+    def _create_parser(self, head):
+        etree = _get_lxml()
+        encoding = self.encoding
+        if encoding is None and isinstance(head, bytes):
+            encoding = _sniff_charset(head) or 'utf-8'
+            self.encoding = encoding
+        try:
+            parser = etree.HTMLPullParser(events=('start',), tag='html', encoding=encoding,
+                                          huge_tree=self.huge_tree)
+        except LookupError:
+            parser = etree.HTMLPullParser(events=('start',), tag='html', encoding='utf-8',
+                                          huge_tree=self.huge_tree)
+        parser.set_element_class_lookup(_get_lxml_html().HtmlElementClassLookup())
+        return parser
+    
+    def feed(self, chunk: Union[bytes, str]) -> bool:
+        """
+        输入下一段内容
+        
+        Returns:
+            所有字段是否都已确定（True 时可以停止读取）
+        """
+        if not chunk:
+            return self.done
+        self.bytes_read += len(chunk)
+        if self._chunks is not None:
+            self._chunks.append(chunk)
+        if self.content_type != "html":
+            return False
+        if self._parser is None:
+            if self.encoding is None and isinstance(chunk, bytes):
+                # 编码未知：攒够开头 1 KB 再识别 <meta charset>
+                self._head += chunk
+                if len(self._head) < 1024:
+                    return False
+                chunk, self._head = self._head, b""
+            self._parser = self._create_parser(chunk)
+        self._parser.feed(chunk)
+        for _, element in self._parser.read_events():
+            if self._root is None:
+                self._root = element
+        if self._pending and self._root is not None and self.bytes_read >= self._next_check:
+            self._next_check = self.bytes_read + max(STREAM_CHECK_BYTES, self.bytes_read // 2)
+            self._check()
+        return self.done
+    
+    def _check(self):
+        """确定已经可以确定的字段"""
+        open_elements = _open_elements(self._root)
+        pending = []
+        for rule in self._pending:
+            name, kind, selector, query, attr, html, converter = rule
             try:
-                # 解析选择器
-                extract_html = False
-                attr = None
-                
-                # 检查后缀
-                if "::text" in selector:
-                    selector = selector.replace("::text", "")
-                elif "::html" in selector:
-                    selector = selector.replace("::html", "")
-                    extract_html = True
-                
-                # 检查属性提取 @attr
-                if "@" in selector and not selector.startswith("xpath:"):
-                    parts = selector.rsplit("@", 1)
-                    selector = parts[0]
-                    attr = parts[1]
-                
-                # 检查前缀
-                if selector.startswith("css:"):
-                    selector = selector[4:]
-                    if extract_html:
-                        result[field_name] = self.css(selector, html=True)
-                    elif attr:
-                        result[field_name] = self.css(selector, attr=attr)
-                    else:
-                        result[field_name] = self.css(selector)
-                
-                elif selector.startswith("xpath:"):
-                    selector = selector[6:]
-                    result[field_name] = self.xpath(selector)
-                
-                elif selector.startswith("jsonpath:"):
-                    selector = selector[9:]
-                    result[field_name] = self.jpath(selector)
-                
-                else:
-                    # 默认使用 find（自动识别）
-                    result[field_name] = self.find(selector, attr=attr)
-                    
+                final, value = _stream_match(kind, query, attr, html, self._root, open_elements)
             except Exception:
-                result[field_name] = None
+                final, value = True, None
+            if final:
+                self._values[name] = _convert(value, converter)
+            else:
+                pending.append(rule)
+        self._pending = pending
+    
+    def close(self) -> ExtractResult:
+        """
+        结束输入，返回提取结果
         
+        未确定的字段在已读到的文档上执行（读完整个文档时与 plan.run() 结果相同）。
+        """
+        content = ""
+        if self._chunks:
+            first = self._chunks[0]
+            content = (b"" if isinstance(first, bytes) else "").join(self._chunks)
+            self._chunks = None
+        extractor = Extractor(content, self.content_type, "lxml", self.encoding, self.huge_tree)
+        if self.content_type == "html":
+            if self._head:
+                # 文档不足 1 KB
+                self._parser = self._create_parser(self._head)
+                self._parser.feed(self._head)
+                self._head = b""
+            if self._parser is not None:
+                try:
+                    root = self._parser.close()
+                except Exception:
+                    root = self._root
+                extractor._html_doc = root if root is not None else self._root
+            extractor._html_parsed = True
+        
+        result = {}
+        for name, kind, selector, query, attr, html, converter in self.plan._rules:
+            if name in self._values:
+                result[name] = self._values[name]
+                continue
+            try:
+                value = _RUNNERS[kind](extractor, selector, query, attr, html)
+                result[name] = _convert(value, converter)
+            except Exception:
+                result[name] = None
+        self._pending = self._deferred = []
         return ExtractResult(result)
 
 
-def create_extractor(content: Union[str, bytes], content_type: str = "html") -> Extractor:
+def pick_content(content: bytes, encoding: Optional[str], content_type: str,
+                 fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    对原始响应字节执行 pick（供 ProcessPoolExecutor 在子进程中调用）
+    
+    参数和返回值都可以 pickle，子进程只返回提取出的字典，不回传文档。
+    
+    Args:
+        content: 响应原始字节
+        encoding: 响应声明的编码（None 时按 BOM / <meta charset> 识别）
+        content_type: 内容类型 ("html", "json")
+        fields: pick 规则或 compile_rules() 编译后的 ExtractionPlan
+        
+    Returns:
+        提取结果字典
+    """
+    return dict(compile_rules(fields).run(Extractor(content, content_type, encoding=encoding)))
+
+
+def create_extractor(content: Union[str, bytes], content_type: str = "html",
+                     parser: str = None) -> Extractor:
     """
     创建数据提取器
     
     Args:
         content: HTML 或 JSON 内容
         content_type: 内容类型
+        parser: CSS 选择器引擎（"lxml" 或 "bs4"）
         
     Returns:
         Extractor 实例
     """
-    return Extractor(content, content_type)
+    return Extractor(content, content_type, parser)
 
@@ -0,0 +1,242 @@
+"""
+CFspider HTTP/1.1 报文分帧
+
+供本地 VLESS 代理（thread / asyncio 引擎）在同一条连接上连续转发多个 HTTP 请求：
+- 按 Content-Length / chunked 判断报文体何时结束，不依赖读超时
+- 判断请求 / 响应是否允许 keep-alive
+
+本模块不做任何 I/O，调用方把读到的数据交给 BodyFramer.feed()。
+
+Example:
+    >>> head, rest = split_head(buffer)
+    >>> start_line, headers = parse_head(head)
+    >>> version, status = parse_status_line(start_line)
+    >>> framer = body_framer(headers, method='GET', status=status)
+    >>> n = framer.feed(rest)   # rest[:n] 属于本响应
+    >>> framer.done
+"""
+
+import re
+
+# 报文头最大长度
+MAX_HEAD_SIZE = 64 * 1024
+
+# chunk 大小行 / trailer 行最大长度
+MAX_LINE_SIZE = 8 * 1024
+
+# chunk 大小：只允许十六进制数字
+_CHUNK_SIZE_RE = re.compile(rb'[0-9a-fA-F]+')
+
+
+def split_head(buffer):
+    """
+    从缓冲区中切出报文头
+
+    Returns:
+        (head, rest)：head 含结尾的空行；报文头不完整时返回 None
+
+    Raises:
+        ValueError: 报文头超过 MAX_HEAD_SIZE
+    """
+    index = buffer.find(b'\r\n\r\n')
+    if index == -1:
+        if len(buffer) > MAX_HEAD_SIZE:
+            raise ValueError("HTTP 报文头过长")
+        return None
+    return buffer[:index + 4], buffer[index + 4:]
+
+
+def parse_head(head):
+    """
+    解析报文头
+
+    Returns:
+        (start_line, headers)：headers 为小写名称 → 值的字典，重复的头以 ", " 合并
+    """
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(':')
+        if not sep:
+            raise ValueError(f"无效的 HTTP 头: {line}")
+        name = name.strip().lower()
+        value = value.strip()
+        if name in headers:
+            headers[name] = f"{headers[name]}, {value}"
+        else:
+            headers[name] = value
+    return lines[0], headers
+
+
+def parse_request_line(line):
+    """
+    解析请求行
+
+    Returns:
+        (method, target, version)
+    """
+    parts = line.split(' ')
+    if len(parts) < 2:
+        raise ValueError(f"无效的请求行: {line}")
+    version = parts[2] if len(parts) > 2 else 'HTTP/1.0'
+    return parts[0], parts[1], version
+
+
+def parse_status_line(line):
+    """
+    解析状态行
+
+    Returns:
+        (version, status)
+    """
+    parts = line.split(' ', 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+        raise ValueError(f"无效的状态行: {line}")
+    return parts[0], int(parts[1])
+
+
+def keep_alive(version, headers):
+    """报文是否允许复用连接（HTTP/1.1 默认复用，HTTP/1.0 需显式 keep-alive）"""
+    tokens = {t.strip().lower() for t in headers.get('connection', '').split(',')}
+    if 'close' in tokens:
+        return False
+    if version.upper() == 'HTTP/1.0':
+        return 'keep-alive' in tokens
+    return True
+
+
+def body_framer(headers, method=None, status=None):
+    """
+    根据报文头创建报文体分帧器
+
+    Args:
+        headers: parse_head() 返回的头字典
+        method: 请求方法（创建响应分帧器时传入，HEAD 响应无报文体）
+        status: 响应状态码；为 None 表示创建请求分帧器
+
+    Returns:
+        BodyFramer
+    """
+    is_response = status is not None
+    if is_response:
+        if method == 'HEAD' or 100 <= status < 200 or status in (204, 304):
+            return BodyFramer(0)
+
+    transfer_encoding = headers.get('transfer-encoding')
+    if transfer_encoding:
+        codings = [c.strip().lower() for c in transfer_encoding.split(',')]
+        if codings[-1] == 'chunked':
+            return BodyFramer(chunked=True)
+        if not is_response:
+            raise ValueError(f"无法确定请求体长度: Transfer-Encoding: {transfer_encoding}")
+        return BodyFramer(None)
+
+    content_length = headers.get('content-length')
+    if content_length is not None:
+        values = {v.strip() for v in content_length.split(',')}
+        value = values.pop() if len(values) == 1 else ''
+        if not value.isdigit():
+            raise ValueError(f"无效的 Content-Length: {content_length}")
+        return BodyFramer(int(value))
+
+    # 请求没有长度信息即无报文体；响应则读到连接关闭为止
+    return BodyFramer(None if is_response else 0)
+
+
+class BodyFramer:
+    """
+    报文体分帧状态机
+
+    三种模式：
+    - 定长（Content-Length）
+    - chunked（解析 chunk 大小行与 trailer，原样转发）
+    - 读到连接关闭为止（length=None，无法复用连接）
+    """
+
+    def __init__(self, length=None, chunked=False):
+        """
+        初始化分帧器
+
+        Args:
+            length: 报文体长度；None 表示读到连接关闭为止（chunked 时忽略）
+            chunked: 是否为 chunked 编码
+        """
+        self.chunked = chunked
+        self.remaining = length
+        self.done = not chunked and length == 0
+        self._state = 'size' if chunked else 'data'
+        self._line = b''
+
+    @property
+    def until_close(self):
+        """是否以连接关闭作为结束"""
+        return not self.chunked and self.remaining is None
+
+    def feed(self, data):
+        """
+        处理新读到的数据
+
+        Args:
+            data: 新数据
+
+        Returns:
+            data 开头属于本报文体的字节数；done 之后的剩余数据属于下一个报文
+
+        Raises:
+            ValueError: chunked 编码格式错误
+        """
+        if self.done:
+            return 0
+
+        if not self.chunked:
+            if self.remaining is None:
+                return len(data)
+            n = min(len(data), self.remaining)
+            self.remaining -= n
+            self.done = self.remaining == 0
+            return n
+
+        pos = 0
+        size = len(data)
+        while pos < size and not self.done:
+            if self._state == 'data':
+                take = min(size - pos, self.remaining)
+                pos += take
+                self.remaining -= take
+                if self.remaining == 0:
+                    self._state = 'data_end'
+                continue
+
+            # 按行解析：chunk 大小行、chunk 数据后的 CRLF、trailer
+            end = data.find(b'\n', pos)
+            if end == -1:
+                self._line += data[pos:]
+                if len(self._line) > MAX_LINE_SIZE:
+                    raise ValueError("chunk 行过长")
+                return size
+            line = (self._line + data[pos:end]).rstrip(b'\r')
+            self._line = b''
+            pos = end + 1
+
+            if self._state == 'size':
+                # 只接受十六进制数字（int() 还会接受 -5、0x10、1_0 等，导致分帧错位）
+                digits = line.split(b';', 1)[0].strip()
+                if not _CHUNK_SIZE_RE.fullmatch(digits):
+                    raise ValueError(f"无效的 chunk 大小: {line[:32]!r}")
+                chunk_size = int(digits, 16)
+                if chunk_size:
+                    self.remaining = chunk_size
+                    self._state = 'data'
+                else:
+                    self._state = 'trailer'
+            elif self._state == 'data_end':
+                if line:
+                    raise ValueError("chunk 数据后缺少 CRLF")
+                self._state = 'size'
+            elif not line:
+                # trailer 以空行结束
+                self.done = True
+
+        return pos
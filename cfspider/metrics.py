@@ -0,0 +1,424 @@
+"""
+CFspider 批量请求指标
+
+batch / abatch 的每个请求记录分阶段耗时（传输层能提供时），并汇总为：
+- HDR 风格直方图：对数分桶（每个 2 的幂区间 256 个子桶，相对误差 < 0.4%），
+  内存只与取值范围有关，与样本数无关；输出 p50 / p90 / p99 / max
+- 吞吐时间线：每个时间片（默认 1 秒）的请求数、字节数、错误数
+- 按 Cloudflare 节点（cf_colo）分组的请求数、错误数、字节数和延迟分布
+
+各传输层能提供的阶段：
+- 异步（httpx）：connect（含 DNS）、tls、ttfb、body；
+  VLESS 隧道的 connect 为到 Workers 的 TCP + TLS，另有 ws_handshake
+- curl_cffi（impersonate）：dns、connect、tls、ttfb、body
+- requests：ttfb（从发送到收到响应头，新连接时包含建连）、body
+复用连接的请求没有 dns / connect / tls 阶段，不计入这几个直方图。
+
+Example:
+    >>> results = cfspider.batch(urls, concurrency=20)
+    >>> print(results.stats.format())
+    >>> results.stats.to_json("stats.json")
+    >>> results.stats.phases["ttfb"].percentile(99)
+"""
+
+import json
+import time
+from typing import Any, Dict, Optional
+
+# 阶段的输出顺序
+PHASES = ('dns', 'connect', 'tls', 'ws_handshake', 'ttfb', 'body', 'total')
+
+# 报告的百分位
+PERCENTILES = (50, 90, 99)
+
+# 直方图以微秒为单位记录
+_UNIT = 1_000_000
+
+
+class Histogram:
+    """
+    HDR 风格直方图（单位：秒）
+
+    取值按微秒取整后分桶：小于 2^SUB_BITS 的值精确记录，更大的值保留
+    最高 SUB_BITS 位，因此任意取值的相对误差不超过 1 / 2^(SUB_BITS-1)。
+    """
+
+    SUB_BITS = 9
+
+    __slots__ = ('_counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value: float):
+        """记录一个取值（秒）"""
+        if value < 0:
+            value = 0.0
+        v = int(value * _UNIT)
+        shift = v.bit_length() - self.SUB_BITS
+        if shift > 0:
+            v = v >> shift << shift
+        self._counts[v] = self._counts.get(v, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: 'Histogram'):
+        """合并另一个直方图"""
+        for key, n in other._counts.items():
+            self._counts[key] = self._counts.get(key, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        百分位（秒）
+
+        Args:
+            q: 0 ~ 100
+
+        Returns:
+            桶中点对应的取值（不超过实际最大值）；没有样本时返回 None
+        """
+        if not self.count:
+            return None
+        if q >= 100:
+            return self.max
+        rank = max(1, int(q / 100 * self.count + 0.5))
+        seen = 0
+        for key in sorted(self._counts):
+            seen += self._counts[key]
+            if seen >= rank:
+                width = 1 << max(0, key.bit_length() - self.SUB_BITS)
+                value = (key + (width - 1) / 2) / _UNIT
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """count、mean、min、p50、p90、p99、max（秒）"""
+        data = {'count': self.count}
+        for name, value in [('mean', self.mean), ('min', self.min)] + \
+                [(f'p{q}', self.percentile(q)) for q in PERCENTILES] + [('max', self.max)]:
+            data[name] = round(value, 6) if value is not None else None
+        return data
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return f"Histogram(count={self.count}, p50={self.percentile(50)}, max={self.max})"
+
+
+class PhaseTracer:
+    """
+    httpx 的 trace 扩展：记录一个异步请求的分阶段耗时
+
+    通过 extensions={"trace": tracer} 传给 httpx 的异步请求，
+    请求完成后 tracer.timings 即各阶段耗时（秒）。
+    """
+
+    __slots__ = ('timings', '_started')
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._started: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]):
+        # 事件名形如 "connection.connect_tcp.started"、"http2.receive_response_body.complete"
+        _, _, event = event_name.rpartition('.')
+        step = event_name[:-len(event) - 1].rpartition('.')[2]
+        now = time.perf_counter()
+        if event == 'started':
+            if step == 'send_request_headers':
+                self._started['ttfb'] = now
+            elif step in ('connect_tcp', 'start_tls', 'receive_response_body'):
+                self._started[step] = now
+            return
+        if event != 'complete':
+            return
+        if step == 'connect_tcp':
+            stream = info.get('return_value')
+            tunnel = stream.get_extra_info('vless_timings') if stream is not None else None
+            if tunnel:
+                self.timings.update(tunnel)
+            else:
+                self._stop('connect_tcp', 'connect', now)
+        elif step == 'start_tls':
+            self._stop('start_tls', 'tls', now)
+        elif step == 'receive_response_headers':
+            self._stop('ttfb', 'ttfb', now)
+        elif step == 'receive_response_body':
+            self._stop('receive_response_body', 'body', now)
+
+    def _stop(self, key: str, phase: str, now: float):
+        started = self._started.pop(key, None)
+        if started is not None:
+            self.timings[phase] = now - started
+
+
+def curl_timing_infos():
+    """curl_cffi 会话需要采集的计时信息（传给 Session(curl_infos=...)）"""
+    from curl_cffi import CurlInfo
+    return [
+        CurlInfo.NAMELOOKUP_TIME, CurlInfo.CONNECT_TIME, CurlInfo.APPCONNECT_TIME,
+        CurlInfo.PRETRANSFER_TIME, CurlInfo.STARTTRANSFER_TIME, CurlInfo.TOTAL_TIME,
+    ]
+
+
+def _curl_timings(infos: Dict[Any, Any]) -> Optional[Dict[str, float]]:
+    """由 curl 的累计时间点计算各阶段耗时"""
+    from curl_cffi import CurlInfo
+    dns = infos.get(CurlInfo.NAMELOOKUP_TIME)
+    connect = infos.get(CurlInfo.CONNECT_TIME)
+    tls = infos.get(CurlInfo.APPCONNECT_TIME)
+    pretransfer = infos.get(CurlInfo.PRETRANSFER_TIME)
+    first_byte = infos.get(CurlInfo.STARTTRANSFER_TIME)
+    total = infos.get(CurlInfo.TOTAL_TIME)
+    if first_byte is None or total is None:
+        return None
+    timings = {}
+    # 复用连接时 curl 报告的建连时间点为 0
+    if dns:
+        timings['dns'] = dns
+    if connect:
+        timings['connect'] = connect - (dns or 0.0)
+    if tls and connect:
+        timings['tls'] = tls - connect
+    timings['ttfb'] = first_byte - (pretransfer or 0.0)
+    timings['body'] = total - first_byte
+    return timings
+
+
+def response_timings(response, duration: Optional[float] = None) -> Optional[Dict[str, float]]:
+    """
+    从同步响应中提取分阶段耗时
+
+    Args:
+        response: CFSpiderResponse 或原始响应对象
+        duration: 请求总耗时（秒），用于计算 requests 后端的 body 阶段
+
+    Returns:
+        阶段名 -> 秒；传输层不提供时返回 None
+    """
+    raw = getattr(response, '_response', response)
+    infos = getattr(raw, 'infos', None)
+    if infos:
+        try:
+            return _curl_timings(infos)
+        except ImportError:
+            return None
+    # requests 的 elapsed 是发送请求到解析完响应头的时间；httpx 的 elapsed 包含正文，不能当作 TTFB
+    if type(raw).__module__.startswith('requests.'):
+        elapsed = getattr(raw, 'elapsed', None)
+        if elapsed is None:
+            return None
+        ttfb = elapsed.total_seconds()
+        timings = {'ttfb': ttfb}
+        if duration is not None and duration >= ttfb:
+            timings['body'] = duration - ttfb
+        return timings
+    return None
+
+
+class _ColoStats:
+    __slots__ = ('requests', 'errors', 'bytes', 'latency')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = Histogram()
+
+
+class BatchStats:
+    """
+    批量请求的汇总指标
+
+    由 batch_iter / abatch_iter 在产出每个 BatchItem 时调用 record()；
+    结果可通过 to_dict() / to_json() 导出，format() 生成文本报告。
+    """
+
+    def __init__(self, interval: float = 1.0):
+        """
+        初始化
+
+        Args:
+            interval: 吞吐时间线的时间片长度（秒）
+        """
+        self.interval = interval
+        self.phases: Dict[str, Histogram] = {}
+        self.colos: Dict[str, _ColoStats] = {}
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self.finished = None
+        # 时间片序号 -> [请求数, 字节数, 错误数]
+        self._timeline: Dict[int, list] = {}
+
+    def record(self, item, now: Optional[float] = None):
+        """
+        记录一个已完成的 BatchItem（使用 item.timings、item.colo、item.size、item.duration）
+        """
+        now = time.monotonic() if now is None else now
+        failed = item.error is not None
+        size = item.size or 0
+        self.requests += 1
+        self.bytes += size
+        if failed:
+            self.errors += 1
+
+        index = int((now - self.started) / self.interval)
+        slot = self._timeline.get(index)
+        if slot is None:
+            slot = self._timeline[index] = [0, 0, 0]
+        slot[0] += 1
+        slot[1] += size
+        slot[2] += failed
+
+        if not failed:
+            self._phase('total').record(item.duration)
+            for phase, value in (item.timings or {}).items():
+                self._phase(phase).record(value)
+
+        colo = item.colo
+        if colo:
+            stats = self.colos.get(colo)
+            if stats is None:
+                stats = self.colos[colo] = _ColoStats()
+            stats.requests += 1
+            stats.bytes += size
+            if failed:
+                stats.errors += 1
+            else:
+                stats.latency.record(item.duration)
+
+    def _phase(self, name: str) -> Histogram:
+        hist = self.phases.get(name)
+        if hist is None:
+            hist = self.phases[name] = Histogram()
+        return hist
+
+    def finish(self, now: Optional[float] = None):
+        """标记结束时间（计算平均吞吐）"""
+        self.finished = time.monotonic() if now is None else now
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished if self.finished is not None else time.monotonic()
+        return max(end - self.started, 1e-9)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        导出为字典
+
+        Returns:
+            dict: requests、errors、bytes、elapsed、requests_per_sec、bytes_per_sec、
+                  phases（阶段 -> 直方图）、timeline（每个时间片的 requests_per_sec /
+                  bytes_per_sec / errors）、colos（cf_colo -> 计数和延迟直方图）
+        """
+        elapsed = self.elapsed
+        order = {name: i for i, name in enumerate(PHASES)}
+        last = max(self._timeline) if self._timeline else -1
+        timeline = []
+        for index in range(last + 1):
+            requests, size, errors = self._timeline.get(index, (0, 0, 0))
+            timeline.append({
+                't': round(index * self.interval, 3),
+                'requests_per_sec': round(requests / self.interval, 3),
+                'bytes_per_sec': round(size / self.interval, 1),
+                'errors': errors,
+            })
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'elapsed': round(elapsed, 3),
+            'requests_per_sec': round(self.requests / elapsed, 3),
+            'bytes_per_sec': round(self.bytes / elapsed, 1),
+            'phases': {
+                name: self.phases[name].to_dict()
+                for name in sorted(self.phases, key=lambda n: (order.get(n, len(order)), n))
+            },
+            'timeline': timeline,
+            'colos': {
+                colo: {
+                    'requests': s.requests,
+                    'errors': s.errors,
+                    'bytes': s.bytes,
+                    'latency': s.latency.to_dict(),
+                }
+                for colo, s in sorted(self.colos.items(), key=lambda kv: -kv[1].requests)
+            },
+        }
+
+    def to_json(self, filepath: Optional[str] = None, indent: int = 2) -> str:
+        """
+        导出为 JSON
+
+        Args:
+            filepath: 文件路径（可选，指定时同时写入文件）
+            indent: 缩进
+
+        Returns:
+            JSON 字符串
+        """
+        text = json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+        if filepath:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+    def format(self) -> str:
+        """生成文本报告（cfspider batch 输出使用）"""
+        data = self.to_dict()
+        lines = [
+            f"吞吐: {data['requests_per_sec']:.1f} req/s, "
+            f"{_format_bytes(data['bytes_per_sec'])}/s（{data['elapsed']:.1f} 秒）"
+        ]
+        if data['phases']:
+            # 中文标题占两列宽度
+            lines.append(f"{'阶段':<12}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+            for name, h in data['phases'].items():
+                lines.append(
+                    f"{name:<14}{h['count']:>8}" +
+                    ''.join(f"{_format_ms(h[k]):>10}" for k in ('p50', 'p90', 'p99', 'max'))
+                )
+        if data['colos']:
+            lines.append(f"{'节点':<12}{'requests':>10}{'errors':>8}{'p50':>10}{'p99':>10}")
+            for colo, s in data['colos'].items():
+                lines.append(
+                    f"{colo:<14}{s['requests']:>10}{s['errors']:>8}"
+                    f"{_format_ms(s['latency']['p50']):>10}{_format_ms(s['latency']['p99']):>10}"
+                )
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return f"BatchStats(requests={self.requests}, errors={self.errors}, bytes={self.bytes})"
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value * 1000:.1f}ms"
+
+
+def _format_bytes(value: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if value < 1024:
+            return f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}GB"
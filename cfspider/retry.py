@@ -0,0 +1,197 @@
+"""
+CFspider 重试策略
+
+batch / abatch / Session 共用的重试策略：
+- 按状态码（默认 429、500、502、503、504）和异常类型判断是否重试
+- 指数退避 + 完全抖动（full jitter）：等待 uniform(0, min(backoff_max, backoff_base * 2^n))
+- 响应带 Retry-After 时按服务端提示等待（不超过 retry_after_max）
+- 整个运行共享的重试预算，避免大面积故障时重试风暴
+- 同一 URL 失败 N 次后可以换用其他 cf_proxies 节点重试
+
+batch / abatch 中重试的 URL 回到调度队列延后派发，等待期间不占用并发槽位。
+
+Example:
+    >>> import cfspider
+    >>> policy = cfspider.RetryPolicy(
+    ...     max_retries=5,
+    ...     budget=1000,                                  # 整个任务最多重试 1000 次
+    ...     switch_after=2,                               # 失败 2 次后换节点
+    ...     fallback_proxies=["https://b.workers.dev", "https://c.workers.dev"],
+    ... )
+    >>> results = cfspider.batch(urls, cf_proxies="https://a.workers.dev", retry=policy)
+    >>> with cfspider.Session(cf_proxies="https://a.workers.dev", retry=policy) as s:
+    ...     s.get("https://example.com")
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional, Sequence, Tuple, Type
+
+# 默认重试的状态码
+DEFAULT_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _default_exceptions() -> Tuple[Type[BaseException], ...]:
+    """默认重试的异常：网络 / 超时类错误（requests、curl_cffi 的异常都是 OSError 子类）"""
+    exceptions = [OSError]
+    try:
+        import httpx
+        exceptions.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(exceptions)
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    解析 Retry-After 头（秒数或 HTTP 日期）
+
+    Returns:
+        需要等待的秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class RetryBudget:
+    """运行级重试预算（线程安全）"""
+
+    def __init__(self, total: Optional[int]):
+        """
+        Args:
+            total: 可用的重试次数，None 表示不限
+        """
+        self.total = total
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """取用一次重试，预算用完时返回 False"""
+        with self._lock:
+            if self.total is not None and self.used >= self.total:
+                return False
+            self.used += 1
+            return True
+
+    @property
+    def remaining(self) -> Optional[int]:
+        if self.total is None:
+            return None
+        return max(0, self.total - self.used)
+
+
+class RetryPolicy:
+    """
+    重试策略（不可变配置；运行状态保存在 RetryBudget 中）
+    """
+
+    def __init__(self, max_retries: int = 3,
+                 statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+                 exceptions: Sequence[Type[BaseException]] = None,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 respect_retry_after: bool = True, retry_after_max: float = 120.0,
+                 budget: Optional[int] = None,
+                 switch_after: Optional[int] = None,
+                 fallback_proxies: Sequence[str] = None):
+        """
+        初始化重试策略
+
+        Args:
+            max_retries: 每个 URL 最多重试次数
+            statuses: 需要重试的 HTTP 状态码
+            exceptions: 需要重试的异常类型（默认网络 / 超时错误）
+            backoff_base: 退避基数（秒）
+            backoff_max: 单次退避上限（秒）
+            respect_retry_after: 是否遵循响应的 Retry-After 头
+            retry_after_max: Retry-After 等待上限（秒）
+            budget: 每次运行（一次 batch 调用或一个 Session）的总重试次数上限
+            switch_after: 同一 URL 失败多少次后换用 fallback_proxies 中的节点
+            fallback_proxies: 备用 cf_proxies 节点列表
+        """
+        self.max_retries = max_retries
+        self.statuses = frozenset(statuses or ())
+        self.exceptions = tuple(exceptions) if exceptions is not None else _default_exceptions()
+        # 默认策略不重试参数错误（如 requests 的 MissingSchema / InvalidURL 同时是 ValueError）
+        self._never = (ValueError,) if exceptions is None else ()
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.respect_retry_after = respect_retry_after
+        self.retry_after_max = retry_after_max
+        self.budget = budget
+        self.switch_after = switch_after
+        self.fallback_proxies = list(fallback_proxies or [])
+
+    @classmethod
+    def from_retry(cls, retry) -> Optional['RetryPolicy']:
+        """把 retry 参数（整数或 RetryPolicy）转换为策略"""
+        if isinstance(retry, RetryPolicy):
+            return retry
+        if retry:
+            return cls(max_retries=int(retry))
+        return None
+
+    def new_budget(self) -> RetryBudget:
+        """创建一次运行的重试预算"""
+        return RetryBudget(self.budget)
+
+    def is_retryable(self, response=None, error: BaseException = None) -> bool:
+        """响应状态码或异常是否可重试"""
+        if error is not None:
+            return isinstance(error, self.exceptions) and not isinstance(error, self._never)
+        status = getattr(response, 'status_code', None)
+        return status is not None and status in self.statuses
+
+    def backoff(self, failures: int, response=None) -> float:
+        """
+        第 failures 次失败后的等待时间（秒）
+
+        Args:
+            failures: 已失败次数（从 1 开始）
+            response: 失败的响应（用于读取 Retry-After）
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (failures - 1))))
+        if self.respect_retry_after and response is not None:
+            headers = getattr(response, 'headers', None) or {}
+            hint = parse_retry_after(headers.get('Retry-After'))
+            if hint is not None:
+                delay = max(delay, min(hint, self.retry_after_max))
+        return delay
+
+    def should_retry(self, failures: int, budget: RetryBudget, response=None,
+                     error: BaseException = None) -> bool:
+        """
+        判断是否重试（会消耗预算）
+
+        Args:
+            failures: 已失败次数（含本次）
+            budget: 本次运行的预算
+            response: 本次的响应
+            error: 本次的异常
+        """
+        if failures > self.max_retries:
+            return False
+        if not self.is_retryable(response, error):
+            return False
+        return budget.take()
+
+    def proxy_for(self, failures: int, cf_proxies):
+        """
+        第 failures 次失败后使用的 cf_proxies
+
+        失败次数达到 switch_after 后，在 fallback_proxies 中轮换。
+        """
+        if not self.switch_after or not self.fallback_proxies or failures < self.switch_after:
+            return cf_proxies
+        index = (failures - self.switch_after) % len(self.fallback_proxies)
+        return self.fallback_proxies[index]
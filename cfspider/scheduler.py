@@ -0,0 +1,380 @@
+"""
+CFspider 批量请求调度器
+
+batch / abatch 共用的按 host 礼貌调度：
+- 每个 host 一个令牌桶（rate 次/秒，突发 burst 次）
+- 每个 host 的并发上限
+- 在可发送的 host 之间轮询（round-robin），混合域名的任务能跑满全局并发，
+  而不会集中请求某一个站点
+- 全局 delay（两次请求开始之间的最小间隔）也用令牌桶实现
+
+调度器本身不发请求，也不加锁：由 batch_iter / abatch_iter 在单个线程（或事件循环）中
+调用 push() / pop() / release()。
+
+Example:
+    >>> import cfspider
+    >>> results = cfspider.batch(
+    ...     urls,
+    ...     concurrency=50,
+    ...     host_rate=2, host_burst=5,        # 每个站点每秒最多 2 个请求
+    ...     host_concurrency=4,               # 每个站点最多 4 个并发
+    ...     host_limits={"slow.example.com": {"rate": 0.5, "concurrency": 1}},
+    ... )
+"""
+
+import heapq
+import time
+from collections import deque
+from itertools import count
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+# 每排队多少个 URL 清理一次空闲 host
+SWEEP_EVERY = 10000
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float = 1):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = self.burst
+        self.updated = None
+
+    def _refill(self, now: float):
+        if self.updated is not None and now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        if self.updated is None or now > self.updated:
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """距离有可用令牌还需等待的秒数（0 表示现在可用）"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        """取走一个令牌（调用前应确认 wait_time() 为 0）"""
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Host:
+    """单个 host 的调度状态"""
+
+    __slots__ = ('name', 'queue', 'running', 'bucket', 'concurrency', 'state')
+
+    def __init__(self, name, bucket, concurrency):
+        self.name = name
+        self.queue = deque()
+        self.running = 0
+        self.bucket = bucket
+        self.concurrency = concurrency
+        # 'idle'（无排队 URL）、'ready'、'sleeping'（等令牌）、'blocked'（达到并发上限）
+        self.state = 'idle'
+
+
+def host_of(url: str) -> str:
+    """URL 的 host（小写，不含端口）"""
+    try:
+        return (urlsplit(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+class HostScheduler:
+    """
+    按 host 的令牌桶 + 并发上限调度器
+
+    URL 通过 push() 排队，pop() 按 host 轮询取出当前可以发送的 URL，
+    请求结束后调用 release()。
+    """
+
+    def __init__(self, rate: float = None, burst: float = 1, concurrency: int = None,
+                 host_limits: Dict[str, Dict] = None, delay: float = 0.0):
+        """
+        初始化调度器
+
+        Args:
+            rate: 每个 host 每秒最多请求数（None 表示不限）
+            burst: 每个 host 的突发请求数
+            concurrency: 每个 host 的并发上限（None 表示不限）
+            host_limits: 指定 host 的单独配置，如
+                         {"example.com": {"rate": 1, "burst": 2, "concurrency": 1}}；
+                         也匹配子域名（www.example.com）
+            delay: 全局请求间隔（秒），所有 host 共享
+        """
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.host_limits = {k.lower(): v for k, v in (host_limits or {}).items()}
+        self.global_bucket = TokenBucket(1.0 / delay, 1) if delay and delay > 0 else None
+
+        self._hosts: Dict[str, _Host] = {}
+        self._ready = deque()   # 可立即发送的 host（轮询顺序）
+        self._sleeping = []     # (可发送时间, 序号, host)
+        self._delayed = []     # (可派发时间, 序号, url, task)：延后重试的 URL
+        self._seq = count()
+        self._pushes = 0
+        self.queued = 0
+        self.running = 0
+
+    def _limits_for(self, name: str) -> Dict:
+        """查找 host 的单独配置（精确匹配或父域名匹配）"""
+        if self.host_limits:
+            parts = name.split('.')
+            for i in range(len(parts)):
+                limits = self.host_limits.get('.'.join(parts[i:]))
+                if limits is not None:
+                    return limits
+        return {}
+
+    def _host(self, name: str) -> _Host:
+        host = self._hosts.get(name)
+        if host is None:
+            limits = self._limits_for(name)
+            rate = limits.get('rate', self.rate)
+            burst = limits.get('burst', self.burst)
+            bucket = TokenBucket(rate, burst) if rate else None
+            host = _Host(name, bucket, limits.get('concurrency', self.concurrency))
+            self._hosts[name] = host
+        return host
+
+    def _classify(self, host: _Host, now: float):
+        """根据排队、并发和令牌情况，把 host 放入对应的结构"""
+        if not host.queue:
+            host.state = 'idle'
+            if not host.running and (host.bucket is None or host.bucket.wait_time(now) == 0):
+                # 没有需要保留的状态，释放（host 很多时内存不增长）
+                self._hosts.pop(host.name, None)
+            return
+        if host.concurrency and host.running >= host.concurrency:
+            host.state = 'blocked'
+            return
+        wait = host.bucket.wait_time(now) if host.bucket is not None else 0.0
+        if wait > 0:
+            host.state = 'sleeping'
+            heapq.heappush(self._sleeping, (now + wait, next(self._seq), host))
+        else:
+            host.state = 'ready'
+            self._ready.append(host)
+
+    def push(self, url: str, now: float = None, delay: float = 0.0, task: Any = None):
+        """
+        URL 排队
+
+        Args:
+            url: URL
+            now: 当前时间（time.monotonic()）
+            delay: 延后多少秒才能派发（重试退避），等待期间不占用并发
+            task: 与 URL 一起排队的任务对象，pop() 返回它而不是 URL
+                  （同一 URL 多次排队时用于区分各次任务）
+        """
+        now = time.monotonic() if now is None else now
+        task = url if task is None else task
+        if delay > 0:
+            heapq.heappush(self._delayed, (now + delay, next(self._seq), url, task))
+            self.queued += 1
+            return
+        self._enqueue(url, now, task)
+
+    def _enqueue(self, url: str, now: float, task: Any):
+        self._pushes += 1
+        if self._pushes % SWEEP_EVERY == 0:
+            self._sweep(now)
+
+        host = self._host(host_of(url))
+        host.queue.append(task)
+        self.queued += 1
+        if host.state == 'idle':
+            self._classify(host, now)
+
+    def _sweep(self, now: float):
+        """清理令牌已回满的空闲 host"""
+        for host in [h for h in self._hosts.values() if h.state == 'idle' and not h.running]:
+            self._classify(host, now)
+
+    def pop(self, now: float = None) -> Tuple[Any, Optional[float]]:
+        """
+        取出一个可以立即发送的 URL
+
+        Returns:
+            (url, None)：可以发送的 URL（push() 指定了 task 时返回 task）
+            (None, wait)：需要等待 wait 秒后再调用（wait 为 None 表示要等到
+                          有 URL 排队或有请求结束）
+        """
+        now = time.monotonic() if now is None else now
+
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, url, task = heapq.heappop(self._delayed)
+            self.queued -= 1
+            self._enqueue(url, now, task)
+
+        while self._sleeping and self._sleeping[0][0] <= now:
+            host = heapq.heappop(self._sleeping)[2]
+            if host.state == 'sleeping':
+                self._classify(host, now)
+
+        if self.global_bucket is not None:
+            wait = self.global_bucket.wait_time(now)
+            if wait > 0:
+                return None, wait
+
+        while self._ready:
+            host = self._ready.popleft()
+            if host.state != 'ready':
+                continue
+            if host.bucket is not None:
+                if host.bucket.wait_time(now) > 0:
+                    self._classify(host, now)
+                    continue
+                host.bucket.consume(now)
+            if self.global_bucket is not None:
+                self.global_bucket.consume(now)
+
+            task = host.queue.popleft()
+            self.queued -= 1
+            host.running += 1
+            self.running += 1
+            # 放回队尾（轮询）或转入等待
+            self._classify(host, now)
+            return task, None
+
+        wake = [heap[0][0] for heap in (self._sleeping, self._delayed) if heap]
+        if wake:
+            return None, max(0.0, min(wake) - now)
+        return None, None
+
+    def release(self, url: str, now: float = None):
+        """请求结束（成功或失败）后调用"""
+        host = self._hosts.get(host_of(url))
+        self.running -= 1
+        if host is None:
+            return
+        host.running -= 1
+        if host.state in ('blocked', 'idle'):
+            self._classify(host, time.monotonic() if now is None else now)
+
+    def __len__(self):
+        """排队中的 URL 数（含延后重试的 URL）"""
+        return self.queued
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 自适应并发控制
+
+    每完成一个窗口（约等于当前并发数个请求）评估一次：
+    - 出现 429、5xx / 异常比例超过 error_threshold，或 p90 延迟超过基线的
+      latency_factor 倍时，并发上限乘以 decrease（乘性减）
+    - 否则并发上限加 increase（加性增）
+    上限始终在 [min_limit, max_limit] 之间。
+
+    Example:
+        >>> results = cfspider.batch(urls, concurrency=10, adaptive=True, max_concurrency=100)
+        >>> print(results.summary()["concurrency_limit"])
+    """
+
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int = None,
+                 increase: float = 1, decrease: float = 0.5,
+                 error_threshold: float = 0.05, latency_factor: float = 2.0):
+        """
+        初始化控制器
+
+        Args:
+            initial: 初始并发上限
+            min_limit: 并发下限
+            max_limit: 并发上限（默认 initial * 4）
+            increase: 每个健康窗口增加的并发数
+            decrease: 过载时的缩减系数
+            error_threshold: 窗口内错误（5xx / 异常）比例阈值
+            latency_factor: p90 延迟超过基线多少倍视为过载
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or initial * 4)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.increase = increase
+        self.decrease = decrease
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor
+
+        self._latencies = []
+        self._errors = 0
+        self._throttled = 0
+        self.baseline = None  # 健康窗口的 p90 延迟基线
+
+        # 统计
+        self.peak = self.current
+        self.low = self.current
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def current(self) -> int:
+        """当前并发上限（整数）"""
+        return int(self.limit)
+
+    def observe(self, duration: float, status: int = None, error: bool = False):
+        """
+        记录一个完成的请求
+
+        Args:
+            duration: 请求耗时（秒）
+            status: HTTP 状态码（可选）
+            error: 是否失败（异常）
+        """
+        self._latencies.append(duration)
+        if status == 429:
+            self._throttled += 1
+        elif error or (status is not None and status >= 500):
+            self._errors += 1
+
+        if len(self._latencies) >= max(5, self.current):
+            self._evaluate()
+
+    def _evaluate(self):
+        """窗口结束，调整并发上限"""
+        samples = sorted(self._latencies)
+        n = len(samples)
+        p90 = samples[min(n - 1, int(n * 0.9))]
+        error_rate = self._errors / n
+
+        spike = self.baseline is not None and p90 > self.baseline * self.latency_factor
+        if self._throttled or error_rate > self.error_threshold or spike:
+            self.limit = max(self.min_limit, self.limit * self.decrease)
+            self.decreases += 1
+        else:
+            self.limit = min(self.max_limit, self.limit + self.increase)
+            self.increases += 1
+            # 基线取健康窗口的最低 p90，并缓慢上浮以适应目标站点整体变慢
+            if self.baseline is None or p90 < self.baseline:
+                self.baseline = p90
+            else:
+                self.baseline *= 1.02
+
+        self.peak = max(self.peak, self.current)
+        self.low = min(self.low, self.current)
+        self._latencies.clear()
+        self._errors = 0
+        self._throttled = 0
+
+    def stats(self) -> dict:
+        """获取统计信息"""
+        return {
+            'limit': self.current,
+            'min': self.min_limit,
+            'max': self.max_limit,
+            'peak': self.peak,
+            'low': self.low,
+            'increases': self.increases,
+            'decreases': self.decreases,
+        }
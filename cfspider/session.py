@@ -5,7 +5,11 @@ CFspider Session 模块
 简化 API：只需提供 Workers 地址即可自动获取 UUID 和配置。
 """
 
+import time
+
 from .api import request
+from .balancer import get_balancer, is_multi
+from .retry import RetryPolicy
 
 
 class Session:
@@ -47,7 +51,7 @@ class Session:
         please use cfspider.StealthSession.
     """
     
-    def __init__(self, cf_proxies=None, uuid=None, static_ip=False, two_proxy=None):
+    def __init__(self, cf_proxies=None, uuid=None, static_ip=False, two_proxy=None, retry=None):
         """
         初始化会话 / Initialize session
         
@@ -58,6 +62,8 @@ class Session:
                 e.g., "https://cfspider.violetqqcom.workers.dev"
                 UUID 将自动从 Workers 获取
                 UUID will be auto-fetched from Workers
+                也可以是多个地址 / WorkersManager 组成的列表，请求在各节点间负载均衡
+                Can also be a list of addresses / WorkersManager objects (load balanced)
             uuid (str, optional): VLESS UUID（可选）
                 如果不填写，会自动从 Workers 首页获取
                 If not provided, will be auto-fetched from Workers homepage
@@ -66,6 +72,10 @@ class Session:
             two_proxy (str, optional): 第二层代理配置
                 / Second layer proxy configuration
                 格式：host:port:user:pass 或 host:port
+            retry (int/RetryPolicy, optional): 重试次数或重试策略（默认不重试）
+                / Retry count or cfspider.RetryPolicy (no retries by default)
+                429 / 5xx 响应和网络错误按指数退避重试，整个会话共享重试预算
+                429 / 5xx responses and network errors are retried with exponential backoff
         
         Raises:
             ValueError: 当 cf_proxies 为空时
@@ -95,13 +105,19 @@ class Session:
                 "如果不需要代理，可以直接使用 cfspider.get() 等函数。\n"
                 "如果需要隐身模式会话，请使用 cfspider.StealthSession。"
             )
-        self.cf_proxies = cf_proxies.rstrip("/") if cf_proxies else None
+        if is_multi(cf_proxies):
+            # 多个节点：会话内的请求共用一个均衡器，计数可通过 session.cf_proxies.stats() 读取
+            self.cf_proxies = get_balancer(cf_proxies)
+        else:
+            self.cf_proxies = cf_proxies.rstrip("/") if cf_proxies else None
         self.uuid = uuid
         self.static_ip = static_ip
         self.two_proxy = two_proxy
         self.headers = {}
         self.cookies = {}
         self._base_headers = {}  # 兼容 StealthSession API
+        self.retry_policy = RetryPolicy.from_retry(retry)
+        self._retry_budget = self.retry_policy.new_budget() if self.retry_policy else None
     
     @property
     def _cookies(self):
@@ -250,17 +266,34 @@ class Session:
         # 如果用户在请求中指定了 two_proxy，使用用户指定的，否则使用 Session 的
         two_proxy = kwargs.pop("two_proxy", None) or self.two_proxy
         
-        response = request(
-            method,
-            url,
-            cf_proxies=cf_proxies,
-            uuid=uuid,
-            static_ip=static_ip,
-            two_proxy=two_proxy,
-            headers=headers,
-            cookies=cookies,
-            **kwargs
-        )
+        policy = self.retry_policy
+        failures = 0
+        while True:
+            # 失败次数达到 switch_after 后换用备用节点（UUID 由新节点自动获取）
+            proxies = policy.proxy_for(failures, cf_proxies) if policy else cf_proxies
+            try:
+                response = request(
+                    method,
+                    url,
+                    cf_proxies=proxies,
+                    uuid=uuid if proxies == cf_proxies else None,
+                    static_ip=static_ip,
+                    two_proxy=two_proxy,
+                    headers=headers,
+                    cookies=cookies,
+                    **kwargs
+                )
+            except Exception as e:
+                failures += 1
+                if policy is None or not policy.should_retry(failures, self._retry_budget, error=e):
+                    raise
+                time.sleep(policy.backoff(failures))
+                continue
+            
+            failures += 1
+            if policy is None or not policy.should_retry(failures, self._retry_budget, response=response):
+                break
+            time.sleep(policy.backoff(failures, response))
         
         # 自动从响应中更新 cookies
         self._update_cookies(response)
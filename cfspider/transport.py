@@ -0,0 +1,278 @@
+"""
+CFspider 共享连接池传输层
+
+模块级 get() / post() 等调用不再每次新建 requests / httpx / curl_cffi 客户端，
+而是从注册表中取出长期存活的连接池客户端，像 requests.Session 一样复用
+keep-alive 连接（省去每个请求的 TCP + TLS 握手）：
+- 按 (后端, 代理 URL, 指纹) 区分客户端；后端为 'requests'、'httpx-h2'、'curl_cffi'
+- 连接池大小、空闲超时可配置
+- 线程安全；curl_cffi 会话不能跨线程共享，按线程各建一个
+- 进程退出时自动关闭
+
+与 requests.request() 一样，模块级调用之间不保留 Cookie：
+客户端的 Cookie 罐拒绝保存任何 Set-Cookie，调用方传入的 cookies 仍按请求生效。
+
+Example:
+    >>> import cfspider
+    >>> cfspider.configure_transports(pool_maxsize=50, idle_timeout=120)
+    >>> cfspider.get("https://httpbin.org/ip")   # 后续请求复用连接
+    >>> cfspider.close_transports()
+"""
+
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from http import cookiejar
+
+# 支持的后端
+BACKENDS = ('requests', 'httpx-h2', 'curl_cffi')
+
+# 默认连接池配置
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_IDLE_TIMEOUT = 60
+
+
+class _BlockAllCookies(cookiejar.DefaultCookiePolicy):
+    """拒绝保存和发送 Cookie 罐中的任何 Cookie（共享客户端之间不泄露会话状态）"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+class TransportRegistry:
+    """
+    连接池客户端注册表
+
+    正在使用的客户端不会因空闲超时被关闭。
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """
+        初始化注册表
+
+        Args:
+            pool_connections: requests 缓存的连接池（host）数量
+            pool_maxsize: 每个 host 保持的最大连接数（httpx 为总连接数上限）
+            idle_timeout: 客户端 / keep-alive 连接的空闲超时（秒）
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        # key -> [client, in_use, last_used]
+        self._clients = {}
+
+        # 统计计数
+        self.created = 0
+        self.closed = 0
+
+    def _create(self, backend, proxy, fingerprint):
+        """创建客户端"""
+        if backend == 'requests':
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.cookies.set_policy(_BlockAllCookies())
+            adapter = HTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            if proxy:
+                session.proxies = {'http': proxy, 'https': proxy}
+            return session
+
+        if backend == 'httpx-h2':
+            from .api import _get_httpx
+            httpx = _get_httpx()
+            limits = httpx.Limits(
+                max_connections=self.pool_maxsize * self.pool_connections,
+                max_keepalive_connections=self.pool_maxsize,
+                keepalive_expiry=self.idle_timeout,
+            )
+            return httpx.Client(
+                http2=True, proxy=proxy, limits=limits,
+                cookies=cookiejar.CookieJar(policy=_BlockAllCookies()),
+            )
+
+        if backend == 'curl_cffi':
+            from .api import _get_curl_cffi
+            curl_requests = _get_curl_cffi()
+            from .metrics import curl_timing_infos
+            proxies = {'http': proxy, 'https': proxy} if proxy else None
+            try:
+                # 采集 DNS / 连接 / TLS / 首字节计时（response.infos），供批量请求统计
+                return curl_requests.Session(impersonate=fingerprint, proxies=proxies,
+                                             curl_infos=curl_timing_infos())
+            except TypeError:
+                # 旧版 curl_cffi 不支持 curl_infos
+                return curl_requests.Session(impersonate=fingerprint, proxies=proxies)
+
+        raise ValueError(f"未知的传输后端: {backend}，可选: {', '.join(BACKENDS)}")
+
+    @contextmanager
+    def client(self, backend, proxy=None, fingerprint=None):
+        """
+        借用一个连接池客户端
+
+        Args:
+            backend: 'requests'、'httpx-h2' 或 'curl_cffi'
+            proxy: 代理 URL（可选）
+            fingerprint: curl_cffi 的 impersonate 指纹（可选）
+
+        Yields:
+            requests.Session / httpx.Client / curl_cffi.requests.Session
+        """
+        key = (backend, proxy or None, fingerprint or None)
+        if backend == 'curl_cffi':
+            # curl_cffi 会话不是线程安全的，每个线程单独一个
+            key += (threading.get_ident(),)
+
+        with self._lock:
+            stale = self._evict_locked(time.time())
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = [self._create(backend, proxy, fingerprint), 0, 0]
+                self._clients[key] = entry
+                self.created += 1
+            entry[1] += 1
+        for client in stale:
+            _close_quietly(client)
+
+        try:
+            yield entry[0]
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                entry[2] = time.time()
+
+    def request(self, backend, method, url, proxy=None, fingerprint=None, **kwargs):
+        """
+        使用连接池客户端发送请求
+
+        Args:
+            backend: 'requests'、'httpx-h2' 或 'curl_cffi'
+            method: HTTP 方法
+            url: 目标 URL
+            proxy: 代理 URL（可选）
+            fingerprint: curl_cffi 的 impersonate 指纹（可选）
+            **kwargs: 传给客户端 request() 的参数
+
+        Returns:
+            对应后端的响应对象
+        """
+        with self.client(backend, proxy, fingerprint) as client:
+            if backend == 'curl_cffi':
+                try:
+                    return client.request(method, url, impersonate=fingerprint, **kwargs)
+                finally:
+                    # 会话 Cookie 只对本次调用有效
+                    client.cookies.clear()
+            return client.request(method, url, **kwargs)
+
+    def _evict_locked(self, now):
+        """
+        移除空闲超时的客户端（需持有锁）
+
+        Returns:
+            需要在锁外关闭的客户端列表
+        """
+        stale = [
+            key for key, entry in self._clients.items()
+            if entry[1] == 0 and entry[2] and now - entry[2] > self.idle_timeout
+        ]
+        clients = [self._clients.pop(key)[0] for key in stale]
+        self.closed += len(clients)
+        return clients
+
+    def stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: clients（当前客户端数）、in_use、按后端计数、created、closed
+        """
+        with self._lock:
+            entries = list(self._clients.items())
+        stats = {
+            'clients': len(entries),
+            'in_use': sum(1 for _, e in entries if e[1]),
+            'created': self.created,
+            'closed': self.closed,
+        }
+        for backend in BACKENDS:
+            stats[backend] = sum(1 for key, _ in entries if key[0] == backend)
+        return stats
+
+    def close(self):
+        """关闭所有客户端"""
+        with self._lock:
+            clients = [entry[0] for entry in self._clients.values()]
+            self._clients.clear()
+            self.closed += len(clients)
+        for client in clients:
+            _close_quietly(client)
+
+
+def _close_quietly(client):
+    try:
+        client.close()
+    except Exception:
+        pass
+
+
+_registry = TransportRegistry()
+_registry_lock = threading.Lock()
+
+
+def get_transport_registry():
+    """获取全局传输注册表"""
+    return _registry
+
+
+def configure_transports(pool_connections=None, pool_maxsize=None, idle_timeout=None):
+    """
+    配置模块级请求使用的连接池（已有客户端会被关闭，之后按新配置创建）
+
+    Args:
+        pool_connections: requests 缓存的连接池（host）数量，默认 10
+        pool_maxsize: 每个 host 保持的最大连接数，默认 10
+        idle_timeout: 空闲超时（秒），默认 60
+
+    Example:
+        >>> import cfspider
+        >>> cfspider.configure_transports(pool_maxsize=50)
+    """
+    global _registry
+    with _registry_lock:
+        old = _registry
+        _registry = TransportRegistry(
+            pool_connections=old.pool_connections if pool_connections is None else pool_connections,
+            pool_maxsize=old.pool_maxsize if pool_maxsize is None else pool_maxsize,
+            idle_timeout=old.idle_timeout if idle_timeout is None else idle_timeout,
+        )
+    old.close()
+    return _registry
+
+
+def close_transports():
+    """关闭所有模块级连接池客户端"""
+    _registry.close()
+
+
+atexit.register(close_transports)
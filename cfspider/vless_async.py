@@ -0,0 +1,608 @@
+"""
+CFspider asyncio VLESS 引擎
+
+基于 asyncio 的 VLESS 客户端与本地 HTTP 代理：
+- 一个事件循环承载所有客户端连接（不再每个连接 3 个线程 + 1 秒轮询）
+- 转发时通过 drain() 实现背压
+- 任一方向 EOF 立即关闭两端，无 time.sleep(0.1) 的收尾延迟
+
+与 LocalVlessProxy 接口一致（start() / stop() / proxy_url），
+可通过 vless_client.create_local_proxy(engine='asyncio') 选择。
+
+Example:
+    >>> from cfspider.vless_async import AsyncLocalVlessProxy
+    >>> proxy = AsyncLocalVlessProxy("wss://your-workers.dev/uuid", "uuid")
+    >>> proxy.start()
+    >>> print(proxy.proxy_url)
+    >>> proxy.stop()
+"""
+
+import asyncio
+import base64
+import os
+import ssl
+import threading
+import time
+
+from . import http_framing, ws_frame
+from .vless_client import (
+    VlessClient, parse_two_proxy, build_connect_request, rewrite_http_request, _quickack
+)
+
+
+class AsyncVlessClient(VlessClient):
+    """VLESS 协议客户端（asyncio 版本）"""
+
+    def __init__(self, ws_url, vless_uuid=None, connect_timeout=30):
+        """
+        初始化客户端
+
+        Args:
+            ws_url: edgetunnel WebSocket 地址，如 "wss://v2.kami666.xyz/uuid"
+            vless_uuid: VLESS UUID
+            connect_timeout: 建立隧道的超时时间（秒）
+        """
+        super().__init__(ws_url, vless_uuid)
+        self.connect_timeout = connect_timeout
+
+    async def _websocket_handshake_async(self, reader, writer):
+        """执行 WebSocket 握手"""
+        key = base64.b64encode(os.urandom(16)).decode('utf-8')
+
+        request = (
+            f"GET {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            f"Upgrade: websocket\r\n"
+            f"Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            f"Sec-WebSocket-Version: 13\r\n"
+            f"\r\n"
+        )
+        writer.write(request.encode('utf-8'))
+        await writer.drain()
+
+        try:
+            response = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            raise Exception("WebSocket 握手失败")
+
+        status_line = response.split(b'\r\n', 1)[0]
+        if b' 101' not in status_line:
+            raise Exception(f"WebSocket 握手失败: {response.decode('utf-8', errors='ignore')}")
+
+    async def aopen_tunnel(self, timings=None):
+        """
+        建立已握手的 WebSocket 隧道（TCP 连接 + TLS 握手 + WebSocket 升级）
+
+        Args:
+            timings: 可选的字典，写入各阶段耗时（秒）：
+                     connect（到 Workers 的 TCP + TLS）、ws_handshake（WebSocket 升级）
+
+        Returns:
+            (asyncio.StreamReader, asyncio.StreamWriter)
+        """
+        ssl_context = ssl.create_default_context() if self.use_ssl else None
+
+        async def _open():
+            start = time.perf_counter()
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port,
+                ssl=ssl_context,
+                server_hostname=self.host if ssl_context else None,
+                limit=ws_frame.DEFAULT_BUFFER_SIZE,
+            )
+            connected = time.perf_counter()
+            try:
+                await self._websocket_handshake_async(reader, writer)
+            except BaseException:
+                writer.close()
+                raise
+            if timings is not None:
+                timings['connect'] = connected - start
+                timings['ws_handshake'] = time.perf_counter() - connected
+            return reader, writer
+
+        return await asyncio.wait_for(_open(), self.connect_timeout)
+
+    async def aconnect(self, target_host, target_port):
+        """
+        通过 VLESS 连接到目标
+
+        Returns:
+            AsyncVlessConnection: 可用于读写的连接对象
+        """
+        timings = {}
+        reader, writer = await self.aopen_tunnel(timings)
+
+        # 创建 VLESS 头（稍后与第一个数据包一起发送）
+        vless_header = self._create_vless_header(target_host, target_port)
+
+        return AsyncVlessConnection(reader, writer, vless_header, timings)
+
+
+class AsyncVlessConnection:
+    """VLESS 连接封装（asyncio 版本）"""
+
+    def __init__(self, reader, writer, vless_header=None, timings=None):
+        self.reader = reader
+        self.writer = writer
+        self.vless_header = vless_header  # 第一次发送时需要带上
+        self.timings = timings or {}      # 建立隧道的各阶段耗时
+        self.first_send = True
+        self.first_response = True
+
+    def write(self, data):
+        """写入一个数据帧（不等待发送完成）"""
+        if self.first_send and self.vless_header:
+            # 第一次发送时，将 VLESS 头和数据一起发送
+            data = self.vless_header + data
+            self.first_send = False
+        header, payload = ws_frame.encode_frame(data)
+        self.writer.writelines((header, payload))
+
+    async def send(self, data):
+        """发送数据（等待写缓冲区回落，实现背压）"""
+        self.write(data)
+        await self.writer.drain()
+
+    async def recv(self):
+        """
+        接收一个数据帧（已去除 VLESS 响应头）
+
+        Returns:
+            数据 bytes；连接关闭时返回 None
+        """
+        frame = await ws_frame.read_message_async(self.reader)
+        if frame is None:
+            return None
+
+        # 第一个响应需要跳过 VLESS 响应头
+        if self.first_response and len(frame) >= 2:
+            addon_len = frame[1]
+            frame = frame[2 + addon_len:]
+            self.first_response = False
+        return frame
+
+    def is_reusable(self):
+        """空闲连接是否可复用（没有未读数据且对端未关闭）"""
+        return not self.reader.at_eof() and not self.writer.is_closing()
+
+    def close(self):
+        """关闭连接"""
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+async def _read_http_head(recv, buffer):
+    """
+    读取直到缓冲区中有完整的 HTTP 报文头
+
+    Returns:
+        (head, rest)；连接在报文头完整前关闭时返回 (None, buffer)
+    """
+    while True:
+        split = http_framing.split_head(buffer)
+        if split is not None:
+            return split
+        data = await recv()
+        if data is None:
+            return None, buffer
+        buffer += data
+
+
+async def _relay_http_body(framer, buffer, recv, send):
+    """
+    按分帧器转发报文体
+
+    Returns:
+        报文体结束后多读到的数据（属于下一个报文）
+    """
+    while True:
+        if buffer:
+            n = framer.feed(buffer)
+            if n:
+                await send(buffer[:n] if n < len(buffer) else buffer)
+            buffer = buffer[n:]
+        if framer.done:
+            return buffer
+        data = await recv()
+        if data is None:
+            if framer.until_close:
+                return b''
+            raise ConnectionError("连接在报文体结束前关闭")
+        buffer = data
+
+
+class AsyncLocalVlessProxy:
+    """
+    本地 VLESS HTTP 代理服务器（asyncio 引擎）
+
+    在后台线程中运行一个事件循环，所有客户端连接共用该循环。
+    """
+
+    def __init__(self, ws_url, vless_uuid=None, two_proxy=None, timeout=30, reuse_tunnels=True):
+        """
+        初始化本地代理
+
+        Args:
+            ws_url: edgetunnel WebSocket 地址
+            vless_uuid: VLESS UUID
+            two_proxy: 第二层代理，格式为 "host:port:user:pass" 或 "host:port"
+            timeout: 读取客户端请求头和建立隧道的超时时间（秒）
+            reuse_tunnels: 普通 HTTP 请求在 keep-alive 连接上是否复用上游隧道
+        """
+        self.ws_url = ws_url
+        self.vless_uuid = vless_uuid
+        self.two_proxy = parse_two_proxy(two_proxy) if two_proxy else None
+        self.timeout = timeout
+        self.reuse_tunnels = reuse_tunnels
+        self.client = AsyncVlessClient(ws_url, vless_uuid, connect_timeout=timeout)
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.port = None
+        self.running = False
+        self.active_connections = 0
+        self._tasks = set()
+
+    def start(self):
+        """启动代理服务器，返回监听端口"""
+        ready = threading.Event()
+        errors = []
+        self.loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.server = self.loop.run_until_complete(
+                    asyncio.start_server(self._handle_client, '127.0.0.1', 0, backlog=512)
+                )
+                self.port = self.server.sockets[0].getsockname()[1]
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+                self.loop.close()
+                return
+
+            ready.set()
+            try:
+                self.loop.run_forever()
+                # 等待被取消的连接完成清理
+                if self._tasks:
+                    self.loop.run_until_complete(
+                        asyncio.gather(*self._tasks, return_exceptions=True)
+                    )
+            finally:
+                self.loop.close()
+
+        self.running = True
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+        # 等待服务器就绪（无固定 sleep）
+        ready.wait()
+        if errors:
+            self.running = False
+            raise errors[0]
+        return self.port
+
+    async def _handle_client(self, reader, writer):
+        """处理客户端连接（普通 HTTP 请求支持 keep-alive）"""
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self.active_connections += 1
+        conn = None
+        upstream = {}  # 可复用的上游连接: {'conn', 'target'}
+        try:
+            client_sock = writer.get_extra_info('socket')
+
+            async def client_recv():
+                data = await reader.read(65536)
+                _quickack(client_sock)
+                return data or None
+
+            buffer = b''
+            while True:
+                # 读取请求头（keep-alive 空闲超过 timeout 即关闭）
+                try:
+                    head, buffer = await asyncio.wait_for(
+                        _read_http_head(client_recv, buffer), self.timeout
+                    )
+                except (asyncio.TimeoutError, ValueError):
+                    return
+                if head is None:
+                    return
+
+                # 解析请求
+                first_line = head.split(b'\r\n', 1)[0].decode('utf-8', errors='replace')
+                parts = first_line.split(' ')
+                if len(parts) < 2:
+                    return
+
+                method = parts[0]
+                if method != 'CONNECT':
+                    # HTTP 代理
+                    keep_alive, buffer = await self._handle_http(
+                        reader, writer, method, parts[1], head, buffer, upstream
+                    )
+                    if not keep_alive:
+                        return
+                    continue
+
+                # HTTPS 代理
+                self._close_upstream(upstream)
+                target = parts[1]
+                if ':' in target:
+                    host, port = target.rsplit(':', 1)
+                    port = int(port)
+                else:
+                    host = target
+                    port = 443
+                try:
+                    conn, leftover = await self._open_connect(host, port)
+                except Exception:
+                    writer.write(b'HTTP/1.1 502 Bad Gateway\r\n\r\n')
+                    return
+                writer.write(b'HTTP/1.1 200 Connection Established\r\n\r\n')
+                if leftover:
+                    writer.write(leftover)
+                if buffer:
+                    await conn.send(buffer)
+
+                await self._relay(reader, writer, conn)
+                return
+        except (ConnectionError, OSError):
+            pass
+        except asyncio.CancelledError:
+            # stop() 取消的连接正常结束，避免 StreamReaderProtocol 记录异常
+            pass
+        finally:
+            if conn is not None:
+                conn.close()
+            self._close_upstream(upstream)
+            try:
+                writer.close()
+            except Exception:
+                pass
+            self._tasks.discard(task)
+            self.active_connections -= 1
+
+    async def _open_connect(self, host, port):
+        """
+        为 CONNECT 请求建立隧道
+
+        Returns:
+            (conn, leftover)：leftover 为第二层代理响应头之后已读到的数据
+        """
+        if not self.two_proxy:
+            return await self.client.aconnect(host, port), b''
+
+        # 使用第二层代理：通过 VLESS 连接到第二层代理
+        proxy = self.two_proxy
+        conn = await self.client.aconnect(proxy['host'], proxy['port'])
+        try:
+            await conn.send(build_connect_request(host, port, proxy))
+
+            # 读取代理响应
+            response = b''
+            while b'\r\n\r\n' not in response:
+                chunk = await asyncio.wait_for(conn.recv(), self.timeout)
+                if chunk is None:
+                    raise Exception("Second proxy connection failed")
+                response += chunk
+
+            head, _, leftover = response.partition(b'\r\n\r\n')
+            status_line = head.split(b'\r\n', 1)[0].decode('utf-8', errors='replace')
+            if '200' not in status_line:
+                raise Exception(f"Second proxy CONNECT failed: {status_line}")
+        except BaseException:
+            conn.close()
+            raise
+        return conn, leftover
+
+    async def _handle_http(self, reader, writer, method, url, head, buffer, upstream):
+        """
+        处理一个 HTTP 请求
+
+        按 Content-Length / chunked 转发请求体和响应体，响应结束后立即返回，
+        客户端连接和上游隧道留给下一个请求复用。
+
+        Returns:
+            (keep_alive, buffer)：客户端连接是否继续使用，以及多读到的数据
+        """
+        try:
+            host, port, request = rewrite_http_request(head, method, url, proxy=self.two_proxy)
+            start_line, headers = http_framing.parse_head(head)
+            version = http_framing.parse_request_line(start_line)[2]
+            request_body = http_framing.body_framer(headers)
+        except ValueError:
+            writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            return False, b''
+
+        if self.two_proxy:
+            # 使用第二层代理（请求保留完整 URL）
+            target = (self.two_proxy['host'], self.two_proxy['port'])
+        else:
+            target = (host, port)
+
+        client_sock = writer.get_extra_info('socket')
+
+        async def client_recv():
+            data = await reader.read(65536)
+            _quickack(client_sock)
+            return data or None
+
+        async def client_send(data):
+            writer.write(data)
+            await writer.drain()
+
+        # 是否已向客户端写出响应（写出之后出错只能关闭连接，不能再发 502）
+        progress = {'sent': False}
+        try:
+            # 已读到的请求体与请求头合并为一帧发送
+            n = request_body.feed(buffer)
+            first_send = request + buffer[:n]
+            buffer = buffer[n:]
+            # 请求体随请求头一次发完时，复用的隧道失效可以安全重试
+            retryable = request_body.done
+
+            conn, reused = await self._upstream_conn(upstream, target)
+            try:
+                await conn.send(first_send)
+                buffer = await _relay_http_body(request_body, buffer, client_recv, conn.send)
+                result = await self._relay_response(reader, writer, conn, method, client_send, progress)
+            except OSError:
+                if not (reused and retryable) or progress['sent']:
+                    raise
+                result = None
+            if result is None and reused and retryable:
+                # 复用的隧道已被对端关闭，换新隧道重试一次
+                self._close_upstream(upstream)
+                conn, _ = await self._upstream_conn(upstream, target)
+                await conn.send(first_send)
+                result = await self._relay_response(reader, writer, conn, method, client_send, progress)
+            if result is None:
+                raise ConnectionError("上游在响应前关闭")
+        except Exception:
+            self._close_upstream(upstream)
+            if not progress['sent']:
+                writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            return False, b''
+
+        framed, reusable = result
+        if not (reusable and self.reuse_tunnels):
+            self._close_upstream(upstream)
+        return framed and http_framing.keep_alive(version, headers), buffer
+
+    async def _upstream_conn(self, upstream, target):
+        """
+        获取到 target 的上游连接（同一目标且仍存活时复用）
+
+        Returns:
+            (conn, reused)
+        """
+        conn = upstream.get('conn')
+        if conn is not None:
+            if upstream['target'] == target and conn.is_reusable():
+                return conn, True
+            self._close_upstream(upstream)
+        conn = await self.client.aconnect(*target)
+        upstream['conn'] = conn
+        upstream['target'] = target
+        return conn, False
+
+    @staticmethod
+    def _close_upstream(upstream):
+        """关闭并清除上游连接"""
+        conn = upstream.pop('conn', None)
+        upstream.pop('target', None)
+        if conn is not None:
+            conn.close()
+
+    async def _relay_response(self, reader, writer, conn, method, client_send, progress):
+        """
+        转发一个 HTTP 响应（按 Content-Length / chunked 判断结束）
+
+        Args:
+            progress: 开始向客户端写出时置 progress['sent'] = True
+
+        Returns:
+            (framed, reusable)：响应是否有明确边界、上游连接是否可复用；
+            上游在响应前关闭时返回 None
+        """
+        async def upstream_recv():
+            return await asyncio.wait_for(conn.recv(), self.timeout)
+
+        buffer = b''
+        while True:
+            head, buffer = await _read_http_head(upstream_recv, buffer)
+            if head is None:
+                if buffer:
+                    raise ConnectionError("上游在响应头结束前关闭")
+                return None
+
+            status_line, headers = http_framing.parse_head(head)
+            version, status = http_framing.parse_status_line(status_line)
+            progress['sent'] = True
+            writer.write(head)
+
+            if status == 101:
+                # 协议升级（如 WebSocket）：改为双向转发，结束后关闭
+                if buffer:
+                    writer.write(buffer)
+                await self._relay(reader, writer, conn)
+                return False, False
+            if status >= 200:
+                break
+            # 1xx 中间响应，继续读取最终响应
+
+        framer = http_framing.body_framer(headers, method=method, status=status)
+        leftover = await _relay_http_body(framer, buffer, upstream_recv, client_send)
+        await writer.drain()
+
+        framed = not framer.until_close
+        reusable = framed and not leftover and http_framing.keep_alive(version, headers)
+        return framed, reusable
+
+    async def _relay(self, reader, writer, conn):
+        """双向转发，任一方向结束即关闭"""
+
+        async def client_to_vless():
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                await conn.send(data)
+
+        async def vless_to_client():
+            while True:
+                data = await conn.recv()
+                if data is None:
+                    break
+                if data:
+                    writer.write(data)
+                    await writer.drain()
+
+        tasks = [
+            asyncio.ensure_future(client_to_vless()),
+            asyncio.ensure_future(vless_to_client()),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        """停止代理服务器"""
+        self.running = False
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            def shutdown():
+                if self.server is not None:
+                    self.server.close()
+                for task in list(self._tasks):
+                    task.cancel()
+                loop.stop()
+
+            try:
+                loop.call_soon_threadsafe(shutdown)
+            except RuntimeError:
+                pass
+            if self.thread is not None and self.thread is not threading.current_thread():
+                self.thread.join(timeout=5)
+
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.port = None
+
+    @property
+    def proxy_url(self):
+        """获取代理 URL"""
+        if self.port:
+            return f"http://127.0.0.1:{self.port}"
+        return None
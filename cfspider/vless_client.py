@@ -3,14 +3,19 @@ CFspider 内置 VLESS 客户端
 通过 WebSocket 连接 edgetunnel，提供本地 HTTP 代理
 """
 
+import atexit
+import select
 import socket
 import struct
 import threading
 import ssl
 import time
 import uuid
+from collections import deque
 from urllib.parse import urlparse
 
+from . import http_framing, ws_frame
+
 
 class VlessClient:
     """VLESS 协议客户端"""
@@ -107,91 +112,313 @@ class VlessClient:
         return True
     
     def _send_ws_frame(self, sock, data):
-        """发送 WebSocket 帧"""
-        import os
+        """发送 WebSocket 帧（整块掩码，帧头与负载一次发出）"""
+        ws_frame.send_frame(sock, data)
+    
+    def _recv_ws_frame(self, sock, reader=None):
+        """
+        接收 WebSocket 帧
         
-        # 构建帧头
-        frame = bytes([0x82])  # Binary frame, FIN=1
+        Args:
+            sock: WebSocket socket
+            reader: 该 socket 对应的 FrameReader（不提供时按帧精确读取，不预读）
         
-        length = len(data)
-        if length <= 125:
-            frame += bytes([0x80 | length])  # Masked
-        elif length <= 65535:
-            frame += bytes([0x80 | 126])
-            frame += struct.pack('>H', length)
-        else:
-            frame += bytes([0x80 | 127])
-            frame += struct.pack('>Q', length)
+        Returns:
+            帧负载；收到关闭帧或连接关闭时返回 None
+        """
+        if reader is None:
+            reader = ws_frame.FrameReader(sock, buffer_size=4096, readahead=False)
+        return reader.read_message()
+    
+    def open_tunnel(self):
+        """
+        建立已握手的 WebSocket 隧道（TCP 连接 + TLS 握手 + WebSocket 升级）
         
-        # 掩码
-        mask = os.urandom(4)
-        frame += mask
+        尚未发送 VLESS 头，可放入 VlessTunnelPool 预热备用。
         
-        # 掩码数据
-        masked_data = bytes([data[i] ^ mask[i % 4] for i in range(len(data))])
-        frame += masked_data
+        Returns:
+            socket: 已完成 WebSocket 握手的 socket
+        """
+        # 创建连接
+        sock = socket.create_connection((self.host, self.port), timeout=30)
         
-        sock.sendall(frame)
+        try:
+            # 每个 WebSocket 帧都是一次完整写入，关闭 Nagle 避免与延迟 ACK 叠加
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.use_ssl:
+                context = ssl.create_default_context()
+                sock = context.wrap_socket(sock, server_hostname=self.host)
+            
+            # WebSocket 握手
+            self._websocket_handshake(sock)
+        except:
+            sock.close()
+            raise
+        
+        return sock
     
-    def _recv_ws_frame(self, sock):
-        """接收 WebSocket 帧"""
-        # 读取帧头
-        header = sock.recv(2)
-        if len(header) < 2:
-            return None
+    def connect(self, target_host, target_port, sock=None):
+        """
+        通过 VLESS 连接到目标
         
-        opcode = header[0] & 0x0F
-        masked = (header[1] & 0x80) != 0
-        length = header[1] & 0x7F
+        Args:
+            target_host: 目标主机
+            target_port: 目标端口
+            sock: 已握手的隧道 socket（如来自 VlessTunnelPool），不提供则新建
         
-        if length == 126:
-            length_bytes = sock.recv(2)
-            length = struct.unpack('>H', length_bytes)[0]
-        elif length == 127:
-            length_bytes = sock.recv(8)
-            length = struct.unpack('>Q', length_bytes)[0]
+        Returns:
+            VlessConnection: 可用于读写的连接对象
+        """
+        if sock is None:
+            sock = self.open_tunnel()
         
-        if masked:
-            mask = sock.recv(4)
+        # 创建 VLESS 头（稍后与第一个数据包一起发送）
+        vless_header = self._create_vless_header(target_host, target_port)
         
-        # 读取数据
-        data = b''
-        while len(data) < length:
-            chunk = sock.recv(length - len(data))
-            if not chunk:
-                break
-            data += chunk
+        return VlessConnection(sock, self, vless_header)
+
+
+class VlessTunnelPool:
+    """
+    预热的 VLESS WebSocket 隧道池
+    
+    后台保持若干已完成 TCP + TLS + WebSocket 握手的隧道，
+    CONNECT 到达时直接取用，只需随第一个数据包发送 VLESS 头，
+    省去每个请求到 Cloudflare 边缘的 2~3 个 RTT。
+    
+    每条隧道只承载一个 VLESS 连接，用完即关闭，不影响动态 IP 语义。
+    
+    Example:
+        >>> pool = VlessTunnelPool("wss://your-workers.dev/uuid", uuid, min_size=2)
+        >>> conn = pool.connect("httpbin.org", 443)
+        >>> print(pool.stats())
+    """
+    
+    def __init__(self, ws_url, vless_uuid=None, min_size=2, max_size=10,
+                 idle_timeout=60, refill=True):
+        """
+        初始化隧道池
         
-        if masked:
-            data = bytes([data[i] ^ mask[i % 4] for i in range(len(data))])
+        Args:
+            ws_url: edgetunnel WebSocket 地址
+            vless_uuid: VLESS UUID
+            min_size: 保持预热的最少空闲隧道数
+            max_size: 空闲隧道上限
+            idle_timeout: 空闲过期时间（秒）。超过该时间的空闲隧道会被丢弃
+                          （Cloudflare 会关闭长期空闲的 WebSocket）；
+                          池本身超过该时间未被使用时停止补充
+            refill: 是否在后台自动补充隧道
+        """
+        self.client = VlessClient(ws_url, vless_uuid)
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.idle_timeout = idle_timeout
+        self.refill = refill
         
-        # 处理关闭帧
-        if opcode == 0x08:
-            return None
+        self._idle = deque()  # (sock, created_at)
+        self._cond = threading.Condition()
+        self._connecting = 0
+        self._last_used = time.time()
+        self._closed = False
+        self._thread = None
         
-        return data
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.expired = 0
+        self.failed = 0
+        
+        if self.refill and self.min_size > 0:
+            self._thread = threading.Thread(target=self._refill_loop, daemon=True)
+            self._thread.start()
     
-    def connect(self, target_host, target_port):
+    @staticmethod
+    def _is_alive(sock):
+        """空闲隧道不应有可读数据，可读说明对端已关闭"""
+        try:
+            if isinstance(sock, ssl.SSLSocket) and sock.pending():
+                return False
+            readable, _, _ = select.select([sock], [], [], 0)
+            return not readable
+        except (OSError, ValueError):
+            return False
+    
+    def _expire_locked(self, now):
+        """丢弃过期的空闲隧道（需持有锁）"""
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            sock, _ = self._idle.popleft()
+            self.expired += 1
+            _close_quietly(sock)
+    
+    def acquire(self):
         """
-        通过 VLESS 连接到目标
+        取出一条已握手的隧道（池为空时同步新建）
         
         Returns:
-            VlessConnection: 可用于读写的连接对象
+            socket: 已完成 WebSocket 握手的 socket
         """
-        # 创建连接
-        sock = socket.create_connection((self.host, self.port), timeout=30)
-        
-        if self.use_ssl:
-            context = ssl.create_default_context()
-            sock = context.wrap_socket(sock, server_hostname=self.host)
+        sock = None
+        with self._cond:
+            now = time.time()
+            self._last_used = now
+            self._expire_locked(now)
+            while self._idle:
+                candidate, _ = self._idle.pop()  # 优先使用最新的隧道
+                if self._is_alive(candidate):
+                    sock = candidate
+                    break
+                self.expired += 1
+                _close_quietly(candidate)
+            
+            if sock is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            # 唤醒后台线程补充
+            self._cond.notify()
         
-        # WebSocket 握手
-        self._websocket_handshake(sock)
+        if sock is None:
+            sock = self.client.open_tunnel()
+        return sock
+    
+    def connect(self, target_host, target_port):
+        """
+        通过池中隧道连接到目标
         
-        # 创建 VLESS 头（稍后与第一个数据包一起发送）
-        vless_header = self._create_vless_header(target_host, target_port)
+        Returns:
+            VlessConnection: 可用于读写的连接对象
+        """
+        return self.client.connect(target_host, target_port, sock=self.acquire())
+    
+    def _refill_loop(self):
+        """后台补充循环"""
+        interval = max(1.0, min(self.idle_timeout / 2, 5.0))
+        while True:
+            with self._cond:
+                if self._closed:
+                    break
+                now = time.time()
+                self._expire_locked(now)
+                need = 0
+                # 池长时间未被使用时停止补充，避免占用 Workers 连接
+                if now - self._last_used < self.idle_timeout:
+                    need = self.min_size - len(self._idle) - self._connecting
+                    need = min(need, self.max_size - len(self._idle) - self._connecting)
+                if need <= 0:
+                    self._cond.wait(interval)
+                    continue
+                self._connecting += need
+            
+            failed = False
+            for _ in range(need):
+                try:
+                    sock = self.client.open_tunnel()
+                except Exception:
+                    failed = True
+                    with self._cond:
+                        self.failed += 1
+                        self._connecting -= 1
+                    continue
+                with self._cond:
+                    self._connecting -= 1
+                    if self._closed or len(self._idle) >= self.max_size:
+                        _close_quietly(sock)
+                    else:
+                        self._idle.append((sock, time.time()))
+                        self.created += 1
+            
+            if failed:
+                # 握手失败时退避，避免对不可用的 Workers 频繁重试
+                with self._cond:
+                    if not self._closed:
+                        self._cond.wait(interval)
+    
+    def stats(self):
+        """
+        获取统计信息
         
-        return VlessConnection(sock, self, vless_header)
+        Returns:
+            dict: hits, misses, hit_rate, idle, connecting, created, expired, failed
+        """
+        with self._cond:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'idle': len(self._idle),
+                'connecting': self._connecting,
+                'created': self.created,
+                'expired': self.expired,
+                'failed': self.failed,
+            }
+    
+    def close(self):
+        """关闭隧道池，释放所有空闲隧道"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                sock, _ = self._idle.popleft()
+                _close_quietly(sock)
+            self._cond.notify_all()
+
+
+def _close_quietly(sock):
+    """关闭 socket，忽略错误"""
+    try:
+        sock.close()
+    except:
+        pass
+
+
+# 共享隧道池（按 WebSocket 地址区分）
+_tunnel_pools = {}
+_tunnel_pools_lock = threading.Lock()
+
+
+def get_tunnel_pool(ws_url, vless_uuid=None, **options):
+    """
+    获取指定 Workers 的共享隧道池（不存在时创建）
+    
+    Args:
+        ws_url: edgetunnel WebSocket 地址
+        vless_uuid: VLESS UUID
+        **options: 传递给 VlessTunnelPool 的参数（仅在首次创建时生效）
+    
+    Returns:
+        VlessTunnelPool
+    """
+    with _tunnel_pools_lock:
+        pool = _tunnel_pools.get(ws_url)
+        if pool is None:
+            pool = VlessTunnelPool(ws_url, vless_uuid, **options)
+            _tunnel_pools[ws_url] = pool
+        return pool
+
+
+def tunnel_pool_stats():
+    """
+    获取所有共享隧道池的统计信息
+    
+    Returns:
+        dict: {ws_url: stats}
+    """
+    with _tunnel_pools_lock:
+        pools = list(_tunnel_pools.items())
+    return {url: pool.stats() for url, pool in pools}
+
+
+def close_tunnel_pools():
+    """关闭所有共享隧道池"""
+    with _tunnel_pools_lock:
+        pools = list(_tunnel_pools.values())
+        _tunnel_pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_tunnel_pools)
 
 
 class VlessConnection:
@@ -200,6 +427,7 @@ class VlessConnection:
     def __init__(self, sock, client, vless_header=None):
         self.sock = sock
         self.client = client
+        self.reader = ws_frame.FrameReader(sock)
         self.buffer = b''
         self.first_response = True
         self.vless_header = vless_header  # 第一次发送时需要带上
@@ -214,18 +442,36 @@ class VlessConnection:
         else:
             self.client._send_ws_frame(self.sock, data)
     
+    def recv_frame(self):
+        """
+        接收一个数据帧（已去除 VLESS 响应头）
+        
+        Returns:
+            数据 bytes；连接关闭时返回 None
+        """
+        frame = self.client._recv_ws_frame(self.sock, self.reader)
+        if frame is None:
+            return None
+        
+        # 第一个响应需要跳过 VLESS 响应头（版本 + 附加信息长度 + 附加信息）
+        if self.first_response and len(frame) >= 2:
+            addon_len = frame[1]
+            frame = frame[2 + addon_len:]
+            self.first_response = False
+        return frame
+    
+    def is_reusable(self):
+        """空闲连接是否可复用（没有未读数据且对端未关闭）"""
+        return (not self.buffer and not self.reader.pending
+                and VlessTunnelPool._is_alive(self.sock))
+    
     def recv(self, size):
         """接收数据"""
         # 如果缓冲区不够，尝试接收更多数据
         if len(self.buffer) < size:
             try:
-                frame = self.client._recv_ws_frame(self.sock)
+                frame = self.recv_frame()
                 if frame:
-                    # 第一个响应需要跳过 VLESS 响应头
-                    if self.first_response and len(frame) >= 2:
-                        addon_len = frame[1] if len(frame) > 1 else 0
-                        frame = frame[2 + addon_len:]
-                        self.first_response = False
                     self.buffer += frame
             except:
                 pass
@@ -240,15 +486,9 @@ class VlessConnection:
             self.sock.setblocking(False)
             while True:
                 try:
-                    frame = self.client._recv_ws_frame(self.sock)
+                    frame = self.recv_frame()
                     if frame is None:
                         break
-                    
-                    if self.first_response and len(frame) >= 2:
-                        addon_len = frame[1] if len(frame) > 1 else 0
-                        frame = frame[2 + addon_len:]
-                        self.first_response = False
-                    
                     self.buffer += frame
                 except (BlockingIOError, ssl.SSLWantReadError):
                     break
@@ -267,10 +507,196 @@ class VlessConnection:
             pass
 
 
+def parse_two_proxy(two_proxy):
+    """
+    解析第二层代理配置
+    
+    Args:
+        two_proxy: "host:port:user:pass" 或 "host:port"
+    
+    Returns:
+        dict: {'host', 'port', 'user', 'pass'}；two_proxy 为空时返回 None
+    """
+    if not two_proxy:
+        return None
+    
+    # 格式: host:port:user:pass
+    parts = two_proxy.split(':')
+    if len(parts) == 4:
+        return {
+            'host': parts[0],
+            'port': int(parts[1]),
+            'user': parts[2],
+            'pass': parts[3]
+        }
+    elif len(parts) == 2:
+        # 无认证: host:port
+        return {
+            'host': parts[0],
+            'port': int(parts[1]),
+            'user': None,
+            'pass': None
+        }
+    else:
+        raise ValueError(
+            f"Invalid two_proxy format: {two_proxy}\n"
+            "Expected format: host:port:user:pass or host:port"
+        )
+
+
+def _proxy_authorization(proxy):
+    """生成第二层代理的 Proxy-Authorization 头（无认证时返回 None）"""
+    if proxy and proxy['user'] and proxy['pass']:
+        import base64
+        auth = base64.b64encode(f"{proxy['user']}:{proxy['pass']}".encode()).decode()
+        return f'Proxy-Authorization: Basic {auth}'
+    return None
+
+
+def build_connect_request(host, port, proxy):
+    """构建发给第二层代理的 CONNECT 请求"""
+    connect_request = f"CONNECT {host}:{port} HTTP/1.1\r\n"
+    connect_request += f"Host: {host}:{port}\r\n"
+    
+    # 添加代理认证
+    auth = _proxy_authorization(proxy)
+    if auth:
+        connect_request += f"{auth}\r\n"
+    
+    connect_request += "\r\n"
+    return connect_request.encode()
+
+
+def rewrite_http_request(request, method, url, proxy=None):
+    """
+    重写客户端发来的 HTTP 代理请求
+    
+    - 直连目标：请求行改为 origin-form（/path?query）
+    - 经第二层代理：保留完整 URL，并添加 Proxy-Authorization
+    - 统一 Host 头，移除客户端的 Proxy-* 头
+    
+    Args:
+        request: 客户端原始请求
+        method: 请求方法
+        url: 请求行中的完整 URL
+        proxy: parse_two_proxy() 的结果（可选）
+    
+    Returns:
+        (host, port, request_bytes)
+    """
+    parsed = urlparse(url)
+    host = parsed.hostname
+    port = parsed.port or 80
+    path = parsed.path or '/'
+    if parsed.query:
+        path += '?' + parsed.query
+    
+    lines = request.split(b'\r\n')
+    if not proxy:
+        lines[0] = f'{method} {path} HTTP/1.1'.encode('utf-8')
+    
+    # 更新 Host 头
+    new_lines = [lines[0]]
+    has_host = False
+    for line in lines[1:]:
+        if line.lower().startswith(b'host:'):
+            new_lines.append(f'Host: {host}'.encode('utf-8'))
+            has_host = True
+        elif line.lower().startswith(b'proxy-'):
+            continue  # 移除原有的代理头
+        else:
+            new_lines.append(line)
+    
+    if not has_host:
+        new_lines.insert(1, f'Host: {host}'.encode('utf-8'))
+    
+    # 添加代理认证
+    auth = _proxy_authorization(proxy)
+    if auth:
+        new_lines.insert(1, auth.encode('utf-8'))
+    
+    return host, port, b'\r\n'.join(new_lines)
+
+
+def _quickack(sock):
+    """
+    立即确认已收到的数据（仅 Linux）
+    
+    HTTP 客户端常把请求头和请求体分两次写入，未开启 TCP_NODELAY 时
+    第二次写入要等第一段被确认，与延迟 ACK 叠加会多出约 40ms。
+    """
+    if _TCP_QUICKACK is not None:
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, _TCP_QUICKACK, 1)
+        except (OSError, AttributeError):
+            pass
+
+
+_TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', None)
+
+
+def _recv_quickack(sock, size=65536):
+    """从客户端 socket 读取数据并立即确认，连接关闭时返回 None"""
+    data = sock.recv(size)
+    _quickack(sock)
+    return data or None
+
+
+def _read_http_head(recv, buffer):
+    """
+    读取直到缓冲区中有完整的 HTTP 报文头
+    
+    Args:
+        recv: 读取函数，连接关闭时返回 None
+        buffer: 已读到的数据
+    
+    Returns:
+        (head, rest)；连接在报文头完整前关闭时返回 (None, buffer)
+    """
+    while True:
+        split = http_framing.split_head(buffer)
+        if split is not None:
+            return split
+        data = recv()
+        if data is None:
+            return None, buffer
+        buffer += data
+
+
+def _relay_http_body(framer, buffer, recv, send):
+    """
+    按分帧器转发报文体
+    
+    Args:
+        framer: http_framing.BodyFramer
+        buffer: 已读到的数据
+        recv: 读取函数，连接关闭时返回 None
+        send: 发送函数
+    
+    Returns:
+        报文体结束后多读到的数据（属于下一个报文）
+    """
+    while True:
+        if buffer:
+            n = framer.feed(buffer)
+            if n:
+                send(buffer[:n] if n < len(buffer) else buffer)
+            buffer = buffer[n:]
+        if framer.done:
+            return buffer
+        data = recv()
+        if data is None:
+            if framer.until_close:
+                return b''
+            raise ConnectionError("连接在报文体结束前关闭")
+        buffer = data
+
+
 class LocalVlessProxy:
     """本地 VLESS HTTP 代理服务器"""
     
-    def __init__(self, ws_url, vless_uuid=None, two_proxy=None):
+    def __init__(self, ws_url, vless_uuid=None, two_proxy=None, tunnel_pool=None,
+                 reuse_tunnels=True):
         """
         初始化本地代理
         
@@ -279,42 +705,36 @@ class LocalVlessProxy:
             vless_uuid: VLESS UUID
             two_proxy: 第二层代理，格式为 "host:port:user:pass"
                        例如 "us.cliproxy.io:3010:username:password"
+            tunnel_pool: 预热隧道池（可选）
+                - None / False: 每个连接新建隧道
+                - True: 使用该 Workers 的共享隧道池（默认参数）
+                - dict: 使用共享隧道池，并作为 VlessTunnelPool 参数
+                  如 {"min_size": 4, "max_size": 16, "idle_timeout": 60}
+                - VlessTunnelPool 实例
+            reuse_tunnels: 普通 HTTP 请求在 keep-alive 连接上是否复用上游隧道
+                           （False 时每个请求新建隧道，保证每次请求更换出口 IP）
         """
         self.ws_url = ws_url
         self.vless_uuid = vless_uuid
         self.two_proxy = self._parse_two_proxy(two_proxy) if two_proxy else None
+        if isinstance(tunnel_pool, VlessTunnelPool):
+            self.tunnel_pool = tunnel_pool
+        elif tunnel_pool:
+            options = tunnel_pool if isinstance(tunnel_pool, dict) else {}
+            self.tunnel_pool = get_tunnel_pool(ws_url, vless_uuid, **options)
+        else:
+            self.tunnel_pool = None
+        self.reuse_tunnels = reuse_tunnels
         self.server = None
         self.thread = None
         self.port = None
         self.running = False
+        self.active_connections = 0
+        self._conn_lock = threading.Lock()
     
     def _parse_two_proxy(self, two_proxy):
         """解析第二层代理配置"""
-        if not two_proxy:
-            return None
-        
-        # 格式: host:port:user:pass
-        parts = two_proxy.split(':')
-        if len(parts) == 4:
-            return {
-                'host': parts[0],
-                'port': int(parts[1]),
-                'user': parts[2],
-                'pass': parts[3]
-            }
-        elif len(parts) == 2:
-            # 无认证: host:port
-            return {
-                'host': parts[0],
-                'port': int(parts[1]),
-                'user': None,
-                'pass': None
-            }
-        else:
-            raise ValueError(
-                f"Invalid two_proxy format: {two_proxy}\n"
-                "Expected format: host:port:user:pass or host:port"
-            )
+        return parse_two_proxy(two_proxy)
     
     def start(self):
         """启动代理服务器"""
@@ -323,14 +743,12 @@ class LocalVlessProxy:
         self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server.bind(('127.0.0.1', 0))
         self.port = self.server.getsockname()[1]
-        self.server.listen(10)
+        self.server.listen(128)
         
+        # listen() 之后连接即可排队，无需等待 accept 线程就绪
         self.running = True
         self.thread = threading.Thread(target=self._serve, daemon=True)
         self.thread.start()
-        
-        # 等待服务器就绪
-        time.sleep(0.1)
         return self.port
     
     def _serve(self):
@@ -351,74 +769,83 @@ class LocalVlessProxy:
                 break
     
     def _handle_client(self, client):
-        """处理客户端连接"""
+        """处理客户端连接（普通 HTTP 请求支持 keep-alive）"""
+        upstream = {}  # 可复用的上游连接: {'conn', 'target'}
+        with self._conn_lock:
+            self.active_connections += 1
         try:
             client.settimeout(30)
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client_recv = lambda: _recv_quickack(client)
             
-            # 读取请求
-            request = b''
-            while b'\r\n\r\n' not in request:
-                chunk = client.recv(4096)
-                if not chunk:
+            buffer = b''
+            while True:
+                # 读取请求头
+                head, buffer = _read_http_head(client_recv, buffer)
+                if head is None:
+                    return
+                
+                # 解析请求
+                first_line = head.split(b'\r\n', 1)[0].decode('utf-8')
+                parts = first_line.split(' ')
+                
+                if len(parts) < 2:
+                    return
+                
+                method = parts[0]
+                
+                if method == 'CONNECT':
+                    # HTTPS 代理
+                    target = parts[1]
+                    if ':' in target:
+                        host, port = target.rsplit(':', 1)
+                        port = int(port)
+                    else:
+                        host = target
+                        port = 443
+                    
+                    self._close_upstream(upstream)
+                    self._handle_connect(client, host, port, buffer)
                     return
-                request += chunk
-            
-            # 解析请求
-            lines = request.split(b'\r\n')
-            first_line = lines[0].decode('utf-8')
-            parts = first_line.split(' ')
-            
-            if len(parts) < 2:
-                return
-            
-            method = parts[0]
-            
-            if method == 'CONNECT':
-                # HTTPS 代理
-                target = parts[1]
-                if ':' in target:
-                    host, port = target.rsplit(':', 1)
-                    port = int(port)
-                else:
-                    host = target
-                    port = 443
                 
-                self._handle_connect(client, host, port)
-            else:
                 # HTTP 代理
                 url = parts[1]
-                self._handle_http(client, method, url, request)
+                keep_alive, buffer = self._handle_http(client, method, url, head, buffer, upstream)
+                if not keep_alive:
+                    return
                 
         except Exception as e:
             pass
         finally:
+            self._close_upstream(upstream)
             try:
                 client.close()
             except:
                 pass
+            with self._conn_lock:
+                self.active_connections -= 1
     
-    def _handle_connect(self, client, host, port):
-        """处理 HTTPS CONNECT 请求"""
+    def _open_vless(self, host, port):
+        """通过 VLESS 连接到目标（优先使用预热隧道池）"""
+        if self.tunnel_pool is not None:
+            return self.tunnel_pool.connect(host, port)
+        return VlessClient(self.ws_url, self.vless_uuid).connect(host, port)
+    
+    def _handle_connect(self, client, host, port, initial=b''):
+        """
+        处理 HTTPS CONNECT 请求
+        
+        Args:
+            initial: 请求头之后已从客户端读到的数据
+        """
         try:
-            vless = VlessClient(self.ws_url, self.vless_uuid)
-            
             if self.two_proxy:
                 # 使用第二层代理：通过 VLESS 连接到第二层代理
                 proxy = self.two_proxy
-                conn = vless.connect(proxy['host'], proxy['port'])
+                conn = self._open_vless(proxy['host'], proxy['port'])
                 
                 # 向第二层代理发送 CONNECT 请求
-                connect_request = f"CONNECT {host}:{port} HTTP/1.1\r\n"
-                connect_request += f"Host: {host}:{port}\r\n"
-                
-                # 添加代理认证
-                if proxy['user'] and proxy['pass']:
-                    import base64
-                    auth = base64.b64encode(f"{proxy['user']}:{proxy['pass']}".encode()).decode()
-                    connect_request += f"Proxy-Authorization: Basic {auth}\r\n"
-                
-                connect_request += "\r\n"
-                conn.send(connect_request.encode())
+                conn.send(build_connect_request(host, port, proxy))
                 
                 # 读取代理响应
                 response = b''
@@ -434,10 +861,12 @@ class LocalVlessProxy:
                     raise Exception(f"Second proxy CONNECT failed: {status_line}")
             else:
                 # 直接连接目标
-                conn = vless.connect(host, port)
+                conn = self._open_vless(host, port)
             
             # 发送连接成功
             client.sendall(b'HTTP/1.1 200 Connection Established\r\n\r\n')
+            if initial:
+                conn.send(initial)
             
             # 双向转发（使用线程）
             self._relay_bidirectional(client, conn)
@@ -448,80 +877,105 @@ class LocalVlessProxy:
             except:
                 pass
     
-    def _handle_http(self, client, method, url, original_request):
-        """处理 HTTP 请求"""
+    def _handle_http(self, client, method, url, head, buffer, upstream):
+        """
+        处理一个 HTTP 请求
+        
+        按 Content-Length / chunked 转发请求体和响应体，响应结束后立即返回，
+        客户端连接和上游隧道留给下一个请求复用。
+        
+        Args:
+            head: 请求头
+            buffer: 请求头之后已从客户端读到的数据
+            upstream: 可复用的上游连接（原地更新）
+        
+        Returns:
+            (keep_alive, buffer)：客户端连接是否继续使用，以及多读到的数据
+        """
         try:
-            parsed = urlparse(url)
-            host = parsed.hostname
-            port = parsed.port or 80
-            path = parsed.path or '/'
-            if parsed.query:
-                path += '?' + parsed.query
-            
-            vless = VlessClient(self.ws_url, self.vless_uuid)
-            
-            if self.two_proxy:
-                # 使用第二层代理
-                proxy = self.two_proxy
-                conn = vless.connect(proxy['host'], proxy['port'])
-                
-                # 重建请求（保留完整 URL，因为是发给代理的）
-                lines = original_request.split(b'\r\n')
-                
-                # 更新请求头
-                new_lines = [lines[0]]  # 保持原始请求行（包含完整 URL）
-                has_host = False
-                for line in lines[1:]:
-                    if line.lower().startswith(b'host:'):
-                        new_lines.append(f'Host: {host}'.encode('utf-8'))
-                        has_host = True
-                    elif line.lower().startswith(b'proxy-'):
-                        continue  # 移除原有的代理头
-                    else:
-                        new_lines.append(line)
-                
-                if not has_host:
-                    new_lines.insert(1, f'Host: {host}'.encode('utf-8'))
-                
-                # 添加代理认证
-                if proxy['user'] and proxy['pass']:
-                    import base64
-                    auth = base64.b64encode(f"{proxy['user']}:{proxy['pass']}".encode()).decode()
-                    new_lines.insert(1, f'Proxy-Authorization: Basic {auth}'.encode('utf-8'))
-                
-                request = b'\r\n'.join(new_lines)
-                conn.send(request)
-            else:
-                # 直接连接目标
-                conn = vless.connect(host, port)
-            
-            # 重建请求
-            lines = original_request.split(b'\r\n')
-            lines[0] = f'{method} {path} HTTP/1.1'.encode('utf-8')
-            
-            # 更新 Host 头
-            new_lines = [lines[0]]
-            has_host = False
-            for line in lines[1:]:
-                if line.lower().startswith(b'host:'):
-                    new_lines.append(f'Host: {host}'.encode('utf-8'))
-                    has_host = True
-                elif line.lower().startswith(b'proxy-'):
-                    continue
-                else:
-                    new_lines.append(line)
-            
-            if not has_host:
-                new_lines.insert(1, f'Host: {host}'.encode('utf-8'))
-            
-            request = b'\r\n'.join(new_lines)
-            conn.send(request)
-            
-            # 读取响应并转发
-            self._relay_response(client, conn)
+            host, port, request = rewrite_http_request(
+                head, method, url, proxy=self.two_proxy
+            )
+            start_line, headers = http_framing.parse_head(head)
+            version = http_framing.parse_request_line(start_line)[2]
+            request_body = http_framing.body_framer(headers)
+        except ValueError:
+            client.sendall(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            return False, b''
+        
+        if self.two_proxy:
+            # 使用第二层代理（请求保留完整 URL，因为是发给代理的）
+            target = (self.two_proxy['host'], self.two_proxy['port'])
+        else:
+            # 直接连接目标
+            target = (host, port)
+        
+        # 是否已向客户端写出响应（写出之后出错只能关闭连接，不能再发 502）
+        progress = {'sent': False}
+        try:
+            # 已读到的请求体与请求头合并为一帧发送
+            n = request_body.feed(buffer)
+            first_send = request + buffer[:n]
+            buffer = buffer[n:]
+            # 请求体随请求头一次发完时，复用的隧道失效可以安全重试
+            retryable = request_body.done
             
-        except Exception as e:
-            client.sendall(b'HTTP/1.1 502 Bad Gateway\r\n\r\n')
+            conn, reused = self._upstream_conn(upstream, target)
+            try:
+                conn.send(first_send)
+                client_recv = lambda: _recv_quickack(client)
+                buffer = _relay_http_body(request_body, buffer, client_recv, conn.send)
+                result = self._relay_response(client, conn, method, progress)
+            except OSError:
+                if not (reused and retryable) or progress['sent']:
+                    raise
+                result = None
+            if result is None and reused and retryable:
+                # 复用的隧道已被对端关闭，换新隧道重试一次
+                self._close_upstream(upstream)
+                conn, _ = self._upstream_conn(upstream, target)
+                conn.send(first_send)
+                result = self._relay_response(client, conn, method, progress)
+            if result is None:
+                raise ConnectionError("上游在响应前关闭")
+        except Exception:
+            self._close_upstream(upstream)
+            if not progress['sent']:
+                try:
+                    client.sendall(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                except OSError:
+                    pass
+            return False, b''
+        
+        framed, reusable = result
+        if not (reusable and self.reuse_tunnels):
+            self._close_upstream(upstream)
+        return framed and http_framing.keep_alive(version, headers), buffer
+    
+    def _upstream_conn(self, upstream, target):
+        """
+        获取到 target 的上游连接（同一目标且仍存活时复用）
+        
+        Returns:
+            (conn, reused)
+        """
+        conn = upstream.get('conn')
+        if conn is not None:
+            if upstream['target'] == target and conn.is_reusable():
+                return conn, True
+            self._close_upstream(upstream)
+        conn = self._open_vless(*target)
+        upstream['conn'] = conn
+        upstream['target'] = target
+        return conn, False
+    
+    @staticmethod
+    def _close_upstream(upstream):
+        """关闭并清除上游连接"""
+        conn = upstream.pop('conn', None)
+        upstream.pop('target', None)
+        if conn is not None:
+            conn.close()
     
     def _relay_bidirectional(self, client, conn):
         """双向数据转发（使用线程）"""
@@ -575,77 +1029,60 @@ class LocalVlessProxy:
         conn.close()
     
     def _recv_ws_frame_safe(self, conn):
-        """安全地接收 WebSocket 帧"""
+        """
+        安全地接收 WebSocket 帧
+        
+        Returns:
+            数据 bytes；超时返回 b''（帧读取器保留已读数据，可继续读取）；
+            连接关闭或出错返回 None
+        """
         try:
-            sock = conn.sock
-            header = sock.recv(2)
-            if len(header) < 2:
-                return None
-            
-            opcode = header[0] & 0x0F
-            masked = (header[1] & 0x80) != 0
-            length = header[1] & 0x7F
-            
-            if length == 126:
-                length_bytes = sock.recv(2)
-                length = struct.unpack('>H', length_bytes)[0]
-            elif length == 127:
-                length_bytes = sock.recv(8)
-                length = struct.unpack('>Q', length_bytes)[0]
-            
-            if masked:
-                mask = sock.recv(4)
-            
-            data = b''
-            while len(data) < length:
-                chunk = sock.recv(min(length - len(data), 8192))
-                if not chunk:
-                    break
-                data += chunk
-            
-            if masked:
-                data = bytes([data[i] ^ mask[i % 4] for i in range(len(data))])
-            
-            if opcode == 0x08:
+            return conn.recv_frame()
+        except socket.timeout:
+            return b''
+        except Exception:
+            return None
+    
+    def _relay_response(self, client, conn, method, progress):
+        """
+        转发一个 HTTP 响应（按 Content-Length / chunked 判断结束，不依赖读超时）
+        
+        Args:
+            progress: 开始向客户端写出时置 progress['sent'] = True
+        
+        Returns:
+            (framed, reusable)：响应是否有明确边界（客户端连接可继续使用），
+            上游连接是否可复用；上游在响应前关闭时返回 None
+        """
+        buffer = b''
+        while True:
+            head, buffer = _read_http_head(conn.recv_frame, buffer)
+            if head is None:
+                if buffer:
+                    raise ConnectionError("上游在响应头结束前关闭")
                 return None
             
-            # 跳过 VLESS 响应头
-            if conn.first_response and len(data) >= 2:
-                addon_len = data[1]
-                data = data[2 + addon_len:]
-                conn.first_response = False
+            status_line, headers = http_framing.parse_head(head)
+            version, status = http_framing.parse_status_line(status_line)
+            progress['sent'] = True
+            client.sendall(head)
             
-            return data
-        except:
-            return b''
-    
-    def _relay_response(self, client, conn):
-        """转发 HTTP 响应"""
-        try:
-            # 读取响应
-            response = b''
-            while True:
-                data = conn.recv(8192)
-                if not data:
-                    break
-                response += data
-                client.sendall(data)
-                
-                # 检查是否完成
-                if b'\r\n\r\n' in response:
-                    # 简单处理：继续读取直到没有数据
-                    conn.sock.settimeout(0.5)
-                    try:
-                        while True:
-                            data = conn.recv(8192)
-                            if not data:
-                                break
-                            client.sendall(data)
-                    except socket.timeout:
-                        pass
-                    break
-        finally:
-            conn.close()
+            if status == 101:
+                # 协议升级（如 WebSocket）：改为双向转发，结束后关闭
+                if buffer:
+                    client.sendall(buffer)
+                self._relay_bidirectional(client, conn)
+                return False, False
+            if status >= 200:
+                break
+            # 1xx 中间响应，继续读取最终响应
+        
+        framer = http_framing.body_framer(headers, method=method, status=status)
+        leftover = _relay_http_body(framer, buffer, conn.recv_frame, client.sendall)
+        
+        framed = not framer.until_close
+        reusable = framed and not leftover and http_framing.keep_alive(version, headers)
+        return framed, reusable
     
     def stop(self):
         """停止代理服务器"""
@@ -666,3 +1103,35 @@ class LocalVlessProxy:
             return f"http://127.0.0.1:{self.port}"
         return None
 
+
+
+# 本地代理引擎：'thread'（每连接线程）或 'asyncio'（单事件循环）
+PROXY_ENGINES = ('thread', 'asyncio')
+DEFAULT_PROXY_ENGINE = 'thread'
+
+
+def create_local_proxy(ws_url, vless_uuid=None, two_proxy=None, engine=None, tunnel_pool=None,
+                       reuse_tunnels=True):
+    """
+    按引擎创建本地 VLESS 代理（start() / stop() / proxy_url 接口一致）
+
+    Args:
+        ws_url: edgetunnel WebSocket 地址
+        vless_uuid: VLESS UUID
+        two_proxy: 第二层代理
+        engine: 'thread' 或 'asyncio'，默认 DEFAULT_PROXY_ENGINE
+        tunnel_pool: 预热隧道池配置（仅 thread 引擎）
+        reuse_tunnels: keep-alive 连接上是否复用上游隧道
+
+    Returns:
+        LocalVlessProxy 或 AsyncLocalVlessProxy
+    """
+    engine = engine or DEFAULT_PROXY_ENGINE
+    if engine == 'thread':
+        return LocalVlessProxy(ws_url, vless_uuid, two_proxy=two_proxy,
+                               tunnel_pool=tunnel_pool, reuse_tunnels=reuse_tunnels)
+    if engine == 'asyncio':
+        from .vless_async import AsyncLocalVlessProxy
+        return AsyncLocalVlessProxy(ws_url, vless_uuid, two_proxy=two_proxy,
+                                    reuse_tunnels=reuse_tunnels)
+    raise ValueError(f"未知的代理引擎: {engine}，可选: {', '.join(PROXY_ENGINES)}")
@@ -0,0 +1,206 @@
+"""
+CFspider VLESS 本地代理生命周期管理
+
+统一管理 api 层使用的本地 VLESS 代理（LocalVlessProxy / AsyncLocalVlessProxy）：
+- 动态 IP 模式：同一 Workers 共用少量本地监听端口，每个 HTTP 请求 / CONNECT
+  仍新建上游隧道，出口 IP 语义不变；不再每个请求新建监听 socket 和 accept 线程
+- 固定 IP 模式：按 LRU + 空闲超时淘汰缓存的代理
+- 进程退出时（atexit）自动停止所有代理
+- 提供监听端口数、连接数、线程数统计
+
+Example:
+    >>> from cfspider.vless_manager import get_proxy_manager
+    >>> manager = get_proxy_manager()
+    >>> proxy = manager.acquire("wss://your-workers.dev/uuid", "uuid")
+    >>> try:
+    ...     print(proxy.proxy_url)
+    ... finally:
+    ...     manager.release(proxy)
+    >>> print(manager.stats())
+"""
+
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+from .vless_client import create_local_proxy
+
+
+class VlessProxyManager:
+    """
+    本地 VLESS 代理管理器
+
+    每个 (ws_url, uuid, two_proxy, engine, static_ip) 对应一个本地监听端口。
+    正在处理请求的代理不会被淘汰。
+    """
+
+    def __init__(self, max_proxies=32, idle_timeout=300, tunnel_pool=True):
+        """
+        初始化管理器
+
+        Args:
+            max_proxies: 同时保留的本地代理上限（超过时淘汰最久未使用的空闲代理）
+            idle_timeout: 空闲代理的存活时间（秒）
+            tunnel_pool: 预热隧道池配置，传给 thread 引擎（参见 LocalVlessProxy）
+        """
+        self.max_proxies = max_proxies
+        self.idle_timeout = idle_timeout
+        self.tunnel_pool = tunnel_pool
+
+        self._lock = threading.Lock()
+        # key -> [proxy, in_use, last_used]，按最近使用排序
+        self._proxies = OrderedDict()
+        self._keys = {}  # id(proxy) -> key
+
+        # 统计计数
+        self.created = 0
+        self.evicted = 0
+
+    def acquire(self, ws_url, vless_uuid=None, two_proxy=None, static_ip=False, engine=None):
+        """
+        获取一个已启动的本地代理，用完后必须调用 release()
+
+        Args:
+            ws_url: edgetunnel WebSocket 地址
+            vless_uuid: VLESS UUID
+            two_proxy: 第二层代理
+            static_ip: 固定 IP 模式（上游隧道在 keep-alive 连接上复用）；
+                       否则每个请求新建上游隧道
+            engine: 本地代理引擎，'thread' 或 'asyncio'
+
+        Returns:
+            LocalVlessProxy 或 AsyncLocalVlessProxy
+        """
+        key = (ws_url, vless_uuid, two_proxy or '', engine or '', bool(static_ip))
+        stale = []
+        with self._lock:
+            entry = self._proxies.get(key)
+            if entry is not None and not entry[0].running:
+                del self._proxies[key]
+                self._keys.pop(id(entry[0]), None)
+                entry = None
+
+            if entry is None:
+                proxy = create_local_proxy(
+                    ws_url, vless_uuid, two_proxy=two_proxy, engine=engine,
+                    tunnel_pool=self.tunnel_pool, reuse_tunnels=bool(static_ip),
+                )
+                proxy.start()
+                self.created += 1
+                entry = [proxy, 0, time.time()]
+                self._proxies[key] = entry
+                self._keys[id(proxy)] = key
+            else:
+                self._proxies.move_to_end(key)
+
+            entry[1] += 1
+            entry[2] = time.time()
+            stale = self._evict_locked(entry[2])
+
+        for proxy in stale:
+            _stop_quietly(proxy)
+        return entry[0]
+
+    def release(self, proxy):
+        """归还 acquire() 获取的代理"""
+        stale = []
+        with self._lock:
+            key = self._keys.get(id(proxy))
+            entry = self._proxies.get(key) if key is not None else None
+            if entry is not None and entry[0] is proxy:
+                entry[1] = max(0, entry[1] - 1)
+                entry[2] = time.time()
+            stale = self._evict_locked(time.time())
+
+        for proxy in stale:
+            _stop_quietly(proxy)
+
+    def _evict_locked(self, now):
+        """
+        淘汰空闲超时或超出数量上限的代理（需持有锁）
+
+        Returns:
+            需要在锁外停止的代理列表
+        """
+        stale = []
+        for key, entry in list(self._proxies.items()):
+            if entry[1] == 0 and now - entry[2] > self.idle_timeout:
+                stale.append(key)
+
+        # LRU：从最久未使用的空闲代理开始淘汰
+        excess = len(self._proxies) - len(stale) - self.max_proxies
+        if excess > 0:
+            for key, entry in self._proxies.items():
+                if excess <= 0:
+                    break
+                if entry[1] == 0 and key not in stale:
+                    stale.append(key)
+                    excess -= 1
+
+        proxies = []
+        for key in stale:
+            proxy = self._proxies.pop(key)[0]
+            self._keys.pop(id(proxy), None)
+            proxies.append(proxy)
+        self.evicted += len(proxies)
+        return proxies
+
+    def evict_idle(self):
+        """立即淘汰空闲超时的代理"""
+        with self._lock:
+            stale = self._evict_locked(time.time())
+        for proxy in stale:
+            _stop_quietly(proxy)
+
+    def stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: listeners（本地监听端口数，其中 static / dynamic 分别计数）、
+                  in_use（正在处理请求的代理数）、connections（本地代理上的活动连接数）、
+                  threads（进程存活线程数）、created、evicted
+        """
+        with self._lock:
+            entries = list(self._proxies.values())
+        return {
+            'listeners': sum(1 for e in entries if e[0].running),
+            'static': sum(1 for e in entries if e[0].reuse_tunnels),
+            'dynamic': sum(1 for e in entries if not e[0].reuse_tunnels),
+            'in_use': sum(1 for e in entries if e[1]),
+            'connections': sum(e[0].active_connections for e in entries),
+            'threads': threading.active_count(),
+            'created': self.created,
+            'evicted': self.evicted,
+        }
+
+    def close(self):
+        """停止所有代理"""
+        with self._lock:
+            proxies = [e[0] for e in self._proxies.values()]
+            self._proxies.clear()
+            self._keys.clear()
+        for proxy in proxies:
+            _stop_quietly(proxy)
+
+
+def _stop_quietly(proxy):
+    try:
+        proxy.stop()
+    except Exception:
+        pass
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_proxy_manager():
+    """获取全局代理管理器（首次调用时创建，并注册 atexit 清理）"""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = VlessProxyManager()
+            atexit.register(_default_manager.close)
+        return _default_manager
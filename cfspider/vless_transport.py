@@ -0,0 +1,293 @@
+"""
+CFspider 原生 asyncio VLESS 传输层（httpx）
+
+把 VLESS over WebSocket 隧道作为 httpcore 的网络后端，供 httpx.AsyncClient 直接使用：
+- 每个 httpcore 连接对应一条 VLESS 隧道，全部运行在调用方的事件循环中
+  （不需要辅助线程，也不需要本地回环监听端口）
+- HTTPS 目标的 TLS 在隧道之上通过 ssl.MemoryBIO 完成，支持 HTTP/2（ALPN）
+- 支持 two_proxy：通过隧道向第二层代理发送 CONNECT，HTTP / HTTPS 目标均可用
+
+Example:
+    >>> import httpx
+    >>> from cfspider.vless_transport import AsyncVlessTransport
+    >>> transport = AsyncVlessTransport("wss://your-workers.dev/uuid", "uuid", http2=True)
+    >>> async with httpx.AsyncClient(transport=transport) as client:
+    ...     r = await client.get("https://httpbin.org/ip")
+"""
+
+import asyncio
+import ssl
+
+import httpcore
+import httpx
+
+from .vless_async import AsyncVlessClient
+from .vless_client import parse_two_proxy, build_connect_request
+
+
+async def _wait(coro, timeout, exc_class):
+    """带超时执行，超时抛出对应的 httpcore 超时异常"""
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        raise exc_class("VLESS 隧道操作超时")
+
+
+class _TLSStream(httpcore.AsyncNetworkStream):
+    """在任意 AsyncNetworkStream 之上运行的 TLS 客户端（ssl.MemoryBIO）"""
+
+    def __init__(self, stream, ssl_context, server_hostname=None):
+        self._stream = stream
+        self._incoming = ssl.MemoryBIO()
+        self._outgoing = ssl.MemoryBIO()
+        self._ssl = ssl_context.wrap_bio(
+            self._incoming, self._outgoing,
+            server_side=False, server_hostname=server_hostname,
+        )
+
+    async def _retry(self, func, *args, timeout=None):
+        """执行 SSLObject 操作，按需收发底层数据直到完成"""
+        while True:
+            want_read = False
+            try:
+                result = func(*args)
+            except ssl.SSLWantReadError:
+                want_read = True
+
+            data = self._outgoing.read()
+            if data:
+                await self._stream.write(data, timeout)
+
+            if not want_read:
+                return result
+
+            data = await self._stream.read(65536, timeout)
+            if data:
+                self._incoming.write(data)
+            else:
+                self._incoming.write_eof()
+
+    async def handshake(self, timeout=None):
+        """执行 TLS 握手"""
+        try:
+            await self._retry(self._ssl.do_handshake, timeout=timeout)
+        except ssl.SSLError as exc:
+            raise httpcore.ConnectError(f"TLS 握手失败: {exc}")
+
+    async def read(self, max_bytes, timeout=None):
+        try:
+            return await self._retry(self._ssl.read, max_bytes, timeout=timeout)
+        except (ssl.SSLZeroReturnError, ssl.SSLEOFError):
+            return b''
+        except ssl.SSLError as exc:
+            raise httpcore.ReadError(str(exc))
+
+    async def write(self, buffer, timeout=None):
+        if not buffer:
+            return
+        try:
+            await self._retry(self._ssl.write, buffer, timeout=timeout)
+        except ssl.SSLError as exc:
+            raise httpcore.WriteError(str(exc))
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+    async def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        stream = _TLSStream(self, ssl_context, server_hostname)
+        await stream.handshake(timeout)
+        return stream
+
+    def get_extra_info(self, info):
+        if info == 'ssl_object':
+            return self._ssl
+        if info == 'is_readable':
+            return bool(self._incoming.pending) or self._stream.get_extra_info('is_readable')
+        return self._stream.get_extra_info(info)
+
+
+class VlessNetworkStream(httpcore.AsyncNetworkStream):
+    """单条 VLESS 隧道上的字节流"""
+
+    def __init__(self, conn, initial=b''):
+        """
+        Args:
+            conn: vless_async.AsyncVlessConnection
+            initial: 已从隧道读到、尚未交给上层的数据
+        """
+        self._conn = conn
+        self._buffer = initial
+        self._eof = False
+
+    async def read(self, max_bytes, timeout=None):
+        while not self._buffer:
+            if self._eof:
+                return b''
+            try:
+                data = await _wait(self._conn.recv(), timeout, httpcore.ReadTimeout)
+            except (ConnectionError, OSError) as exc:
+                raise httpcore.ReadError(str(exc))
+            if data is None:
+                self._eof = True
+                return b''
+            self._buffer = data
+
+        data = self._buffer[:max_bytes]
+        self._buffer = self._buffer[max_bytes:]
+        return data
+
+    async def write(self, buffer, timeout=None):
+        if not buffer:
+            return
+        try:
+            await _wait(self._conn.send(bytes(buffer)), timeout, httpcore.WriteTimeout)
+        except (ConnectionError, OSError) as exc:
+            raise httpcore.WriteError(str(exc))
+
+    async def aclose(self):
+        self._conn.close()
+        try:
+            await self._conn.writer.wait_closed()
+        except Exception:
+            pass
+
+    async def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        stream = _TLSStream(self, ssl_context, server_hostname)
+        await stream.handshake(timeout)
+        return stream
+
+    def get_extra_info(self, info):
+        if info == 'is_readable':
+            # 空闲连接上有数据或已关闭，说明不能再复用
+            return bool(self._buffer) or self._eof or self._conn.reader.at_eof()
+        if info in ('client_addr', 'server_addr'):
+            name = 'sockname' if info == 'client_addr' else 'peername'
+            return self._conn.writer.get_extra_info(name)
+        if info == 'vless_timings':
+            # 建立隧道的阶段耗时（connect / ws_handshake），供 metrics.PhaseTracer 读取
+            return self._conn.timings
+        return None
+
+
+class VlessNetworkBackend(httpcore.AsyncNetworkBackend):
+    """把 TCP 连接请求转换为 VLESS 隧道的 httpcore 网络后端"""
+
+    def __init__(self, ws_url, vless_uuid=None, two_proxy=None):
+        """
+        Args:
+            ws_url: edgetunnel WebSocket 地址
+            vless_uuid: VLESS UUID
+            two_proxy: 第二层代理，格式为 "host:port:user:pass" 或 "host:port"
+        """
+        self.client = AsyncVlessClient(ws_url, vless_uuid)
+        self.two_proxy = parse_two_proxy(two_proxy) if two_proxy else None
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            return await _wait(self._connect(host, port), timeout, httpcore.ConnectTimeout)
+        except httpcore.ConnectTimeout:
+            raise
+        except Exception as exc:
+            raise httpcore.ConnectError(f"VLESS 连接失败: {exc}")
+
+    async def _connect(self, host, port):
+        if not self.two_proxy:
+            conn = await self.client.aconnect(host, port)
+            return VlessNetworkStream(conn)
+
+        # 通过 VLESS 连接到第二层代理，再 CONNECT 到目标
+        proxy = self.two_proxy
+        conn = await self.client.aconnect(proxy['host'], proxy['port'])
+        try:
+            await conn.send(build_connect_request(host, port, proxy))
+            response = b''
+            while b'\r\n\r\n' not in response:
+                chunk = await conn.recv()
+                if chunk is None:
+                    raise ConnectionError("Second proxy connection failed")
+                response += chunk
+            head, _, leftover = response.partition(b'\r\n\r\n')
+            status_line = head.split(b'\r\n', 1)[0].decode('utf-8', errors='replace')
+            if '200' not in status_line:
+                raise ConnectionError(f"Second proxy CONNECT failed: {status_line}")
+        except BaseException:
+            conn.close()
+            raise
+        return VlessNetworkStream(conn, leftover)
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("VLESS 传输不支持 Unix socket")
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class AsyncVlessTransport(httpx.AsyncHTTPTransport):
+    """
+    基于 VLESS 隧道的 httpx 异步传输
+
+    与 httpx.AsyncHTTPTransport 相同的连接池 / HTTP/2 行为，
+    只是底层 TCP 连接由 VLESS 隧道提供。
+    """
+
+    def __init__(self, ws_url, vless_uuid=None, two_proxy=None, http2=False,
+                 verify=True, limits=None, retries=0):
+        """
+        初始化传输
+
+        Args:
+            ws_url: edgetunnel WebSocket 地址
+            vless_uuid: VLESS UUID
+            two_proxy: 第二层代理（可选）
+            http2: 是否启用 HTTP/2
+            verify: 是否校验目标站点证书（也可传入 ssl.SSLContext）
+            limits: httpx.Limits 连接池配置
+            retries: 建立连接失败时的重试次数
+        """
+        limits = limits or httpx.Limits()
+        super().__init__(http2=http2, limits=limits, retries=retries)
+
+        if isinstance(verify, ssl.SSLContext):
+            ssl_context = verify
+        elif verify:
+            ssl_context = None  # 使用 httpcore 默认证书
+        else:
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=ssl_context,
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            retries=retries,
+            network_backend=VlessNetworkBackend(ws_url, vless_uuid, two_proxy),
+        )
+
+
+async def resolve_vless_transport(cf_proxies, uuid=None, two_proxy=None, http2=False, **options):
+    """
+    解析 Workers 配置并创建 AsyncVlessTransport
+
+    Workers 配置发现是同步请求（结果有缓存），放到默认线程池中执行，不阻塞事件循环。
+
+    Args:
+        cf_proxies: Workers 地址，支持字符串或 WorkersManager 对象
+        uuid: VLESS UUID（可选）
+        two_proxy: 第二层代理（可选）
+        http2: 是否启用 HTTP/2
+        **options: 传给 AsyncVlessTransport 的其他参数
+
+    Returns:
+        AsyncVlessTransport
+    """
+    from .api import _resolve_vless_target
+
+    loop = asyncio.get_running_loop()
+    vless_url, uuid, two_proxy = await loop.run_in_executor(
+        None, _resolve_vless_target, cf_proxies, uuid, two_proxy
+    )
+    return AsyncVlessTransport(vless_url, uuid, two_proxy=two_proxy, http2=http2, **options)
@@ -0,0 +1,364 @@
+"""
+CFspider WebSocket 帧编解码模块
+
+VLESS 隧道使用的 WebSocket 二进制帧读写，供 VlessClient / LocalVlessProxy 共用：
+- 带缓冲的 recv_into 读取（预分配 bytearray/memoryview，不再逐个 recv(2)/recv(4) 读帧头，
+  也不再用 data += chunk 拼接负载）
+- 整块掩码（大整数 XOR；安装 NumPy 时大负载走向量化路径）
+- 帧头与负载通过 sendmsg 一次发出（SSL socket 不支持 sendmsg 时合并为一次 sendall）
+
+Example:
+    >>> from cfspider.ws_frame import FrameReader, send_frame
+    >>> send_frame(sock, b"hello")
+    >>> reader = FrameReader(sock)
+    >>> data = reader.read_message()
+    >>> 
+    >>> # asyncio 版本（基于 asyncio.StreamReader）
+    >>> data = await read_message_async(stream_reader)
+"""
+
+import asyncio
+import os
+import ssl
+import struct
+
+# WebSocket 操作码
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# 负载超过该长度且安装了 NumPy 时使用向量化掩码
+NUMPY_THRESHOLD = 64 * 1024
+
+# 默认读缓冲区大小
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+_struct_H = struct.Struct('!H')
+_struct_Q = struct.Struct('!Q')
+
+# 延迟导入 numpy（可选依赖，False 表示未安装）
+_numpy = None
+
+
+def _get_numpy():
+    """延迟加载 numpy，未安装时返回 None"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def mask_payload(data, mask: bytes) -> bytes:
+    """
+    对整块负载应用 WebSocket 掩码（掩码与解掩码是同一运算）
+
+    Args:
+        data: 负载（bytes / bytearray / memoryview）
+        mask: 4 字节掩码
+
+    Returns:
+        掩码后的 bytes
+    """
+    n = len(data)
+    if not n:
+        return b''
+
+    if n >= NUMPY_THRESHOLD:
+        np = _get_numpy()
+        if np is not None:
+            # 按 uint32 整字异或，尾部不足 4 字节的部分按字节处理
+            out = np.frombuffer(data, dtype=np.uint8).copy()
+            words = n >> 2
+            if words:
+                body = out[:words << 2].view(np.uint32)
+                body ^= np.frombuffer(mask, dtype=np.uint32)[0]
+            for i in range(words << 2, n):
+                out[i] ^= mask[i & 3]
+            return out.tobytes()
+
+    # 大整数异或：一次 C 级运算完成整块掩码
+    key = (mask * ((n >> 2) + 1))[:n]
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(key, 'little')).to_bytes(n, 'little')
+
+
+def build_header(length: int, opcode: int = OP_BINARY, mask: bytes = None) -> bytes:
+    """
+    构建 WebSocket 帧头（FIN=1）
+
+    Args:
+        length: 负载长度
+        opcode: 操作码，默认二进制帧
+        mask: 4 字节掩码（客户端发送时必须提供）
+
+    Returns:
+        帧头 bytes（含掩码）
+    """
+    first = 0x80 | opcode
+    mask_bit = 0x80 if mask else 0
+
+    if length <= 125:
+        header = bytes((first, mask_bit | length))
+    elif length <= 0xFFFF:
+        header = bytes((first, mask_bit | 126)) + _struct_H.pack(length)
+    else:
+        header = bytes((first, mask_bit | 127)) + _struct_Q.pack(length)
+
+    if mask:
+        header += mask
+    return header
+
+
+def encode_frame(data, opcode: int = OP_BINARY, masked: bool = True):
+    """
+    编码一个完整帧
+
+    Returns:
+        (header, payload) 元组，便于 sendmsg 分散写
+    """
+    mask = os.urandom(4) if masked else None
+    header = build_header(len(data), opcode, mask)
+    payload = mask_payload(data, mask) if mask else bytes(data)
+    return header, payload
+
+
+def sendmsg_all(sock, buffers):
+    """
+    将多个缓冲区作为一次写操作发送
+
+    普通 socket 使用 sendmsg 分散写（处理部分发送）；
+    SSL socket 不支持 sendmsg，合并后一次 sendall，保证一个 TLS 记录内发出。
+    """
+    if isinstance(sock, ssl.SSLSocket) or not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(buffers))
+        return
+
+    views = [memoryview(b) for b in buffers if len(b)]
+    while views:
+        sent = sock.sendmsg(views)
+        # 跳过已发送的部分
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if views and sent:
+            views[0] = views[0][sent:]
+
+
+def send_frame(sock, data, opcode: int = OP_BINARY, masked: bool = True):
+    """
+    发送一个 WebSocket 帧（帧头与负载一次发出）
+
+    Args:
+        sock: socket 或 SSL socket
+        data: 负载
+        opcode: 操作码，默认二进制帧
+        masked: 是否掩码（客户端 → 服务端必须掩码）
+    """
+    header, payload = encode_frame(data, opcode, masked)
+    sendmsg_all(sock, (header, payload))
+
+
+class FrameReader:
+    """
+    带缓冲的 WebSocket 帧读取器
+
+    通过 recv_into 把数据读入预分配的 bytearray，帧头和负载都在缓冲区内解析，
+    只有完整帧到达后才移动读指针。因此 recv 超时 / 非阻塞 socket 的
+    BlockingIOError 在帧中途抛出时，已读取的数据不会丢失，下次调用可继续。
+
+    Example:
+        >>> reader = FrameReader(sock)
+        >>> while True:
+        ...     data = reader.read_message()
+        ...     if data is None:
+        ...         break
+    """
+
+    def __init__(self, sock, buffer_size: int = DEFAULT_BUFFER_SIZE, readahead: bool = True):
+        """
+        初始化读取器
+
+        Args:
+            sock: socket 或 SSL socket
+            buffer_size: 初始缓冲区大小（遇到更大的帧会自动扩容）
+            readahead: 是否预读（False 时只读取当前帧所需字节，
+                       适合一次性读取、之后还要直接使用 socket 的场景）
+        """
+        self.sock = sock
+        self.readahead = readahead
+        self._buf = bytearray(buffer_size)
+        self._view = memoryview(self._buf)
+        self._start = 0  # 未消费数据起点
+        self._end = 0    # 已填充数据终点
+
+    @property
+    def pending(self) -> int:
+        """缓冲区中尚未消费的字节数"""
+        return self._end - self._start
+
+    def _reserve(self, need: int):
+        """确保从 _start 起至少有 need 字节的可写空间"""
+        if self._start + need <= len(self._buf):
+            return
+
+        avail = self._end - self._start
+        if need > len(self._buf):
+            # 扩容：已导出 memoryview 的 bytearray 不能改变大小，需要新建
+            new_buf = bytearray(max(need, len(self._buf) * 2))
+            new_buf[:avail] = self._view[self._start:self._end]
+            self._view.release()
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+        else:
+            # 压缩：把未消费数据移到缓冲区开头
+            self._buf[:avail] = self._buf[self._start:self._end]
+
+        self._start = 0
+        self._end = avail
+
+    def _fill(self, need: int) -> bool:
+        """
+        读取直到缓冲区中至少有 need 字节未消费数据
+
+        Returns:
+            False 表示对端已关闭
+        """
+        if self._end - self._start >= need:
+            return True
+
+        self._reserve(need)
+        while self._end - self._start < need:
+            if self.readahead:
+                stop = len(self._buf)
+            else:
+                stop = self._start + need
+            n = self.sock.recv_into(self._view[self._end:stop])
+            if not n:
+                return False
+            self._end += n
+        return True
+
+    def recv_frame(self):
+        """
+        读取一个完整帧
+
+        Returns:
+            (opcode, payload) 元组；对端关闭时返回 None
+        """
+        if not self._fill(2):
+            return None
+
+        buf = self._buf
+        start = self._start
+        opcode = buf[start] & 0x0F
+        masked = buf[start + 1] & 0x80
+        length = buf[start + 1] & 0x7F
+
+        header_len = 2
+        if length == 126:
+            header_len = 4
+            if not self._fill(header_len):
+                return None
+            start = self._start
+            length = _struct_H.unpack_from(self._buf, start + 2)[0]
+        elif length == 127:
+            header_len = 10
+            if not self._fill(header_len):
+                return None
+            start = self._start
+            length = _struct_Q.unpack_from(self._buf, start + 2)[0]
+
+        if masked:
+            header_len += 4
+
+        if not self._fill(header_len + length):
+            return None
+
+        # _fill 可能压缩 / 扩容缓冲区，重新读取起点
+        start = self._start
+        payload_start = start + header_len
+        payload = self._view[payload_start:payload_start + length]
+        if masked:
+            mask = bytes(self._view[payload_start - 4:payload_start])
+            payload = mask_payload(payload, mask)
+        else:
+            payload = bytes(payload)
+
+        self._start = payload_start + length
+        if self._start == self._end:
+            self._start = self._end = 0
+
+        return opcode, payload
+
+    def read_message(self):
+        """
+        读取下一个数据帧的负载（跳过 ping/pong 控制帧）
+
+        Returns:
+            负载 bytes；收到关闭帧或对端关闭时返回 None
+        """
+        while True:
+            frame = self.recv_frame()
+            if frame is None:
+                return None
+            opcode, payload = frame
+            if opcode == OP_CLOSE:
+                return None
+            if opcode in (OP_PING, OP_PONG):
+                continue
+            return payload
+
+
+async def read_frame_async(reader):
+    """
+    从 asyncio.StreamReader 读取一个完整帧
+
+    StreamReader 自带缓冲，readexactly 不会产生小块系统调用。
+
+    Returns:
+        (opcode, payload) 元组；对端关闭时返回 None
+    """
+    try:
+        head = await reader.readexactly(2)
+        opcode = head[0] & 0x0F
+        masked = head[1] & 0x80
+        length = head[1] & 0x7F
+
+        if length == 126:
+            length = _struct_H.unpack(await reader.readexactly(2))[0]
+        elif length == 127:
+            length = _struct_Q.unpack(await reader.readexactly(8))[0]
+
+        mask = await reader.readexactly(4) if masked else None
+        payload = await reader.readexactly(length) if length else b''
+    except asyncio.IncompleteReadError:
+        return None
+
+    if mask:
+        payload = mask_payload(payload, mask)
+    return opcode, payload
+
+
+async def read_message_async(reader):
+    """
+    读取下一个数据帧的负载（跳过 ping/pong 控制帧）
+
+    Returns:
+        负载 bytes；收到关闭帧或对端关闭时返回 None
+    """
+    while True:
+        frame = await read_frame_async(reader)
+        if frame is None:
+            return None
+        opcode, payload = frame
+        if opcode == OP_CLOSE:
+            return None
+        if opcode in (OP_PING, OP_PONG):
+            continue
+        return payload
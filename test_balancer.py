@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+多 Workers 负载均衡测试（本地模拟 Workers，不需要网络）
+
+两个本地 HTTP 服务模拟爬楼梯 Workers（/health 与 /proxy），
+cf_proxies 传入 [地址, WorkersManager] 的混合列表，确认请求都能经节点完成；
+均衡器按延迟加权，顺序请求可能集中在一个节点，只有 WorkersManager 的列表用于确认该节点可用。
+"""
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+import cfspider
+from cfspider.workers_manager import WorkersManager
+
+
+def start_fake_workers(name, hits):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, {'status': 'ok'})
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            hits[name] += 1
+            self._reply(200, {'worker': name, 'url': request['url']})
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def make_manager(url):
+    """创建指向本地地址的 WorkersManager（跳过 Cloudflare API 部署）"""
+    def fake_create(self):
+        self._url = url
+        self._healthy = True
+
+    with mock.patch.object(WorkersManager, '_create_worker', fake_create):
+        return WorkersManager('token', 'account', worker_name='local', mode='http')
+
+
+hits = {'a': 0, 'b': 0}
+url_a = start_fake_workers('a', hits)
+manager = make_manager(start_fake_workers('b', hits))
+workers = [url_a, manager]
+
+print("1. cfspider.get（地址 + WorkersManager）:")
+for i in range(20):
+    r = cfspider.get(f"https://example.com/{i}", cf_proxies=workers)
+    assert r.status_code == 200, r.status_code
+    assert r.json()['url'] == f"https://example.com/{i}"
+print(f"   请求分布: {hits}")
+assert hits['a'] + hits['b'] == 20, hits
+
+print("2. cfspider.batch（地址 + WorkersManager）:")
+hits.update(a=0, b=0)
+results = cfspider.batch([f"https://example.com/b{i}" for i in range(20)],
+                         cf_proxies=workers, concurrency=4, progress=False)
+assert all(item.success for item in results), [item.error for item in results]
+print(f"   成功: {len(results.successful)}，请求分布: {hits}")
+assert hits['a'] + hits['b'] == 20, hits
+
+print("3. cfspider.Session（地址 + WorkersManager）:")
+hits.update(a=0, b=0)
+with cfspider.Session(cf_proxies=workers) as session:
+    for i in range(10):
+        assert session.get(f"https://example.com/s{i}").status_code == 200
+print(f"   请求分布: {hits}")
+assert hits['a'] + hits['b'] == 10, hits
+
+print("4. 只有 WorkersManager 的列表:")
+hits.update(a=0, b=0)
+r = cfspider.get("https://example.com/m", cf_proxies=[manager])
+assert r.json()['worker'] == 'b', r.json()
+r = cfspider.get("https://example.com/m", cf_proxies=manager)
+assert r.json()['worker'] == 'b', r.json()
+print(f"   请求分布: {hits}")
+
+print("5. 均衡器统计:")
+for row in cfspider.get_balancer(workers).stats():
+    print(f"   {row['endpoint']}: {row['requests']} 次请求, 状态 {row['state']}")
+
+print("\nDone!")